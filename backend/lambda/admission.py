@@ -0,0 +1,172 @@
+# Admission control for quote submissions.
+# Every submission spends tokens from two keys: the submitter's email and the
+# client IP. Each key has LIMIT submissions per RATE_LIMIT_WINDOW_SECONDS, checked
+# in two tiers before submitQuote makes any other AWS call:
+#   local  - a token bucket per key in this container (capacity LIMIT, refilled
+#            at LIMIT per window), so a burst landing on one warm container is
+#            turned away without any AWS call
+#   shared - a fixed-window counter per key in the quote table, so the limit
+#            also holds across containers. All of a request's counters are
+#            bumped in one TransactWriteItems, each with a conditional ADD.
+#            Counter items live in their own partitions (email = rate#<key>#<window>)
+#            and DynamoDB TTL removes them once the window is over; they carry no
+#            createdAt, so the summary stream's filter drops their records. A key
+#            the counter turns away stays blocked in this container until its
+#            window ends, so a sustained burst costs one counter update per
+#            container and window rather than one per request.
+# Every key is checked before any is charged: a request one key turns away
+# spends no local token and no counter on the others.
+# A fixed window can admit up to 2 x LIMIT around a window boundary; the local
+# bucket keeps that to one container's worth.
+#
+# A rejected submission gets a 429 with Retry-After. Like the duplicate check,
+# the shared tier fails open: if DynamoDB cannot be reached the local tier decides.
+import math
+import os
+import time
+from collections import OrderedDict
+
+import awsClients
+import instrumentation
+
+ENABLED = os.environ.get('ADMISSION_CONTROL', 'false').lower() == 'true'
+# The shared tier needs dynamodb:UpdateItem on TABLE_NAME
+SHARED_TIER_ENABLED = os.environ.get('ADMISSION_SHARED', 'true').lower() == 'true'
+TABLE_NAME = os.environ.get('DYNAMODB_TABLE', 'InsuranceQuoteRequestsV3')
+
+WINDOW_SECONDS = int(os.environ.get('RATE_LIMIT_WINDOW_SECONDS', '60'))
+# Submissions per window; 0 turns the limit off for that kind of key
+LIMITS = {
+    'email': int(os.environ.get('RATE_LIMIT_PER_EMAIL', '5')),
+    'ip': int(os.environ.get('RATE_LIMIT_PER_IP', '30')),
+}
+# Buckets kept per container; the least recently used are dropped first
+LOCAL_KEYS = int(os.environ.get('RATE_LIMIT_LOCAL_KEYS', '10000'))
+
+COUNTER_PREFIX = 'rate#'
+COUNTER_SORT_KEY = 'rate'
+
+# The counter is bumped only while it is under the limit, so rejected
+# submissions do not push the key further over
+COUNTER_UPDATE = 'ADD hits :one SET expiresAt = if_not_exists(expiresAt, :expires)'
+COUNTER_CONDITION = 'attribute_not_exists(hits) OR hits < :limit'
+
+# key -> [tokens, monotonic time of the last refill, monotonic time the shared tier blocks it until]
+_buckets = OrderedDict()
+
+def clear():
+    _buckets.clear()
+
+def client_ip(event):
+    return (event.get('requestContext') or {}).get('http', {}).get('sourceIp')
+
+# (kind, key, limit) for every limit this request counts against
+def request_keys(event, body):
+    keys = []
+    email = body.get('email')
+    if isinstance(email, str) and email.strip() and LIMITS['email']:
+        keys.append(('email', email.strip().lower(), LIMITS['email']))
+    ip = client_ip(event)
+    if ip and LIMITS['ip']:
+        keys.append(('ip', ip, LIMITS['ip']))
+    return keys
+
+# The key's bucket, refilled up to now
+def _local_bucket(bucket_key, limit, now):
+    bucket = _buckets.get(bucket_key)
+    if bucket is None:
+        bucket = _buckets[bucket_key] = [float(limit), now, 0.0]
+        if len(_buckets) > LOCAL_KEYS:
+            _buckets.popitem(last=False)
+    else:
+        _buckets.move_to_end(bucket_key)
+        bucket[0] = min(float(limit), bucket[0] + (now - bucket[1]) * limit / WINDOW_SECONDS)
+        bucket[1] = now
+    return bucket
+
+# Returns the seconds until the bucket has a token, or 0 if it has one now.
+# Takes nothing; check() takes the tokens once every key has one.
+def _local_wait(bucket, limit, now):
+    if bucket[2] > now:
+        return bucket[2] - now
+    if bucket[0] >= 1:
+        return 0
+    return (1 - bucket[0]) * WINDOW_SECONDS / limit
+
+def counter_key(bucket_key, window_start):
+    return {'email': {'S': f"{COUNTER_PREFIX}{bucket_key}#{window_start}"}, 'quoteKey': {'S': COUNTER_SORT_KEY}}
+
+# Bumps the counters of every (bucket_key, limit) in one transaction, so
+# either all of them count this request or none does. Returns {bucket_key:
+# seconds until its window ends} for the keys over the limit, empty if admitted.
+# Another request's transaction on the same counter cancels this one with
+# TransactionConflict; that is retried once.
+def _take_shared(keys, now):
+    window_start = int(now) // WINDOW_SECONDS * WINDOW_SECONDS
+    window_end = window_start + WINDOW_SECONDS
+    actions = [{'Update': {
+        'TableName': TABLE_NAME,
+        'Key': counter_key(bucket_key, window_start),
+        'UpdateExpression': COUNTER_UPDATE,
+        'ConditionExpression': COUNTER_CONDITION,
+        'ExpressionAttributeValues': {
+            ':one': {'N': '1'},
+            ':limit': {'N': str(limit)},
+            ':expires': {'N': str(window_end)}
+        }
+    }} for bucket_key, limit in keys]
+    for attempt in range(2):
+        try:
+            awsClients.get_client('dynamodb').transact_write_items(TransactItems=actions)
+            return {}
+        except Exception as e:
+            reasons = []
+            if awsClients.is_client_error(e, 'TransactionCanceledException'):
+                reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons') or []]
+            over = {bucket_key: window_end - now
+                    for (bucket_key, _), code in zip(keys, reasons) if code == 'ConditionalCheckFailed'}
+            if over:
+                return over
+            if attempt or 'TransactionConflict' not in reasons:
+                print(f"Error updating rate counters: {e}")
+                instrumentation.metric('admissionErrors')
+                return {}
+    return {}
+
+# Returns None if the request may go ahead, else the whole seconds to send in
+# Retry-After. A request turned away by the local tier costs no AWS call.
+def check(event, body):
+    if not ENABLED:
+        return None
+    keys = request_keys(event, body)
+    if not keys:
+        return None
+
+    with instrumentation.phase('admission'):
+        now = time.monotonic()
+        buckets = [_local_bucket(f"{kind}#{key}", limit, now) for kind, key, limit in keys]
+        waits = [(_local_wait(bucket, limit, now), kind) for bucket, (kind, _, limit) in zip(buckets, keys)]
+        wait, kind = max(waits)
+        if wait:
+            instrumentation.metric('throttled')
+            instrumentation.metric('throttledLocal')
+            instrumentation.set_property('throttledBy', kind)
+            return max(1, math.ceil(wait))
+
+        if SHARED_TIER_ENABLED:
+            over = _take_shared([(f"{kind}#{key}", limit) for kind, key, limit in keys], time.time())
+            if over:
+                for bucket, (kind, key, _) in zip(buckets, keys):
+                    if f"{kind}#{key}" in over:
+                        bucket[2] = now + over[f"{kind}#{key}"]
+                instrumentation.metric('throttled')
+                instrumentation.metric('throttledShared')
+                instrumentation.set_property('throttledBy', ','.join(
+                    kind for kind, key, _ in keys if f"{kind}#{key}" in over))
+                return max(1, math.ceil(max(over.values())))
+
+        for bucket in buckets:
+            bucket[0] -= 1
+
+    instrumentation.metric('admitted')
+    return None
@@ -0,0 +1,87 @@
+# Lazily created, shared low-level AWS clients.
+# Handlers ask for a client only on the code path that needs it, so a request
+# rejected during validation never imports boto3 or builds a client. Clients are
+# cached per container, keep their TCP connections alive between invocations and
+# use plain DynamoDB attribute values instead of the heavier resource layer.
+import os
+import threading
+from decimal import Decimal
+
+MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '10'))
+CONNECT_TIMEOUT_SECONDS = float(os.environ.get('AWS_CONNECT_TIMEOUT_SECONDS', '2'))
+READ_TIMEOUT_SECONDS = float(os.environ.get('AWS_READ_TIMEOUT_SECONDS', '5'))
+
+_clients = {}
+
+# boto3's default session is not safe to build clients from concurrently
+_clients_lock = threading.Lock()
+
+def get_client(service_name):
+    client = _clients.get(service_name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(service_name)
+            if client is None:
+                import boto3
+                from botocore.config import Config
+
+                client = boto3.client(service_name, config=Config(
+                    max_pool_connections=MAX_POOL_CONNECTIONS,
+                    tcp_keepalive=True,
+                    connect_timeout=CONNECT_TIMEOUT_SECONDS,
+                    read_timeout=READ_TIMEOUT_SECONDS,
+                    retries={'mode': 'standard', 'max_attempts': 3}
+                ))
+                _clients[service_name] = client
+    return client
+
+# True for botocore ClientErrors, optionally only for one error code.
+# Checked structurally so callers do not need to import botocore.
+def is_client_error(error, code=None):
+    response = getattr(error, 'response', None)
+    if not isinstance(response, dict) or 'Error' not in response:
+        return False
+    return code is None or response['Error'].get('Code') == code
+
+# Python value -> DynamoDB attribute value
+def to_attribute(value):
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, float, Decimal)):
+        return {'N': str(value)}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, dict):
+        return {'M': {k: to_attribute(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [to_attribute(v) for v in value]}
+    raise TypeError(f"Unsupported DynamoDB value: {type(value).__name__}")
+
+def to_item(item):
+    return {k: to_attribute(v) for k, v in item.items()}
+
+# DynamoDB attribute value -> Python value; numbers come back as int or float
+def from_attribute(attribute):
+    (kind, value), = attribute.items()
+    if kind == 'S':
+        return value
+    if kind == 'N':
+        return int(value) if value.lstrip('-').isdigit() else float(value)
+    if kind == 'M':
+        return {k: from_attribute(v) for k, v in value.items()}
+    if kind == 'L':
+        return [from_attribute(v) for v in value]
+    if kind == 'BOOL':
+        return value
+    if kind == 'NULL':
+        return None
+    if kind == 'SS':
+        return set(value)
+    if kind == 'NS':
+        return {int(v) if v.lstrip('-').isdigit() else float(v) for v in value}
+    return value
+
+def from_item(item):
+    return {k: from_attribute(v) for k, v in item.items()}
@@ -1,65 +1,172 @@
 import json
+import base64
+import hashlib
+import os
+from urllib.parse import urlencode
 
-def calculate_auto_premium(details):
-    base = 500
-    if details.get('vehicleType', '').lower() == 'suv':
-        base += 100
-    if int(details.get('year', 2020)) < 2020:
-        base += 75
-    if 'accident' in details.get('drivingHistory', '').lower():
-        base += 150
-    return base
-
-def calculate_home_premium(details):
-    base = 400
-    if int(details.get('squareFootage', 0)) > 2000:
-        base += 100
-    if int(details.get('yearBuilt', 2025)) < 2000:
-        base += 100
-    if details.get('securitySystem', '').lower() == 'no':
-        base += 75
-    return base
-
-def calculate_life_premium(details):
-    base = 300
-    age = int(details.get('age', 0))
-    if age > 50:
-        base += 100
-    if details.get('smoker', '').lower() == 'yes':
-        base += 150
-    if details.get('health', '').lower() == 'poor':
-        base += 200
-    return base
+import instrumentation
+import premiumCache
+import rating
 
+BATCH_ROUTE = 'POST /calculate/batch'
+MAX_BATCH_ROWS = 100000
+
+# GET /calculatePremium?insuranceType=auto&year=2018&... is cacheable by the
+# browser and any CDN in front of the API. Rules changes take effect for cached
+# estimates after at most this long; submitted quotes are always re-rated.
+MAX_AGE_SECONDS = int(os.environ.get('PREMIUM_MAX_AGE_SECONDS', '3600'))
+
+def parse_batch_body(event):
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body).decode('utf-8')
+
+    # Either a JSON array or NDJSON (one applicant per line)
+    if body.lstrip().startswith('['):
+        return json.loads(body), []
+
+    rows = []
+    errors = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except ValueError:
+            errors.append({'index': len(rows), 'error': 'Invalid JSON'})
+            rows.append(None)
+    return rows, errors
+
+# A JSON body can carry any value here, and lists or objects are not hashable
+def is_insurance_type(value):
+    return isinstance(value, str) and value in rating.INSURANCE_TYPES
+
+# Rate [{'insuranceType': ..., 'details': {...}}, ...] in input order.
+# Returns (premiums, errors): premiums[i] is None for rows listed in errors.
+def rate_rows(rows):
+    raters = rating.RATERS
+    premiums = []
+    errors = []
+    for i, row in enumerate(rows):
+        try:
+            premiums.append(raters[row['insuranceType']](row.get('details', {})))
+        except (TypeError, KeyError, AttributeError, ValueError):
+            premiums.append(None)
+            if not isinstance(row, dict):
+                error = 'Row must be an object'
+            elif not is_insurance_type(row.get('insuranceType')):
+                error = 'Invalid insurance type'
+            else:
+                error = f"Invalid {row['insuranceType']} details"
+            errors.append({'index': i, 'error': error})
+    return premiums, errors
+
+# Deterministic cache key: the insurance type plus the rated fields as the rules
+# read them, so e.g. make/model or 'SUV' vs 'suv' do not split the cache
+def cache_key(insurance_type, details):
+    return urlencode((('insuranceType', insurance_type),) + rating.canonical_details(insurance_type, details))
+
+def premium_etag(key):
+    return '"' + hashlib.sha256(f'{rating.RULES_VERSION}|{key}'.encode('utf-8')).hexdigest()[:32] + '"'
+
+def parse_query(event):
+    params = dict(event.get('queryStringParameters') or {})
+    return params.pop('insuranceType', None), params
+
+def batch_handler(event, context):
+    try:
+        with instrumentation.phase('parse'):
+            rows, parse_errors = parse_batch_body(event)
+    except ValueError:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'Body must be a JSON array or NDJSON'})
+        }
+
+    if not isinstance(rows, list):
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'Body must be a JSON array or NDJSON'})
+        }
+
+    if len(rows) > MAX_BATCH_ROWS:
+        return {
+            'statusCode': 413,
+            'body': json.dumps({'error': f'Batch exceeds {MAX_BATCH_ROWS} rows'})
+        }
+
+    with instrumentation.phase('rating'):
+        premiums, errors = rate_rows(rows)
+    instrumentation.metric('rows', len(rows))
+    if parse_errors:
+        # Unparseable NDJSON lines were kept as None rows, report them as such
+        invalid = {error['index'] for error in parse_errors}
+        errors = sorted(parse_errors + [e for e in errors if e['index'] not in invalid],
+                        key=lambda error: error['index'])
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'count': len(rows),
+            'premiums': premiums,
+            'errors': errors
+        })
+    }
+
+@instrumentation.instrumented('calculatePremium')
 def lambda_handler(event, context):
     try:
-        body = json.loads(event['body'])
-        insurance_type = body.get('insuranceType')
-        details = body.get('details', {})
-        
-        if insurance_type == 'auto':
-            premium = calculate_auto_premium(details)
-        elif insurance_type == 'home':
-            premium = calculate_home_premium(details)
-        elif insurance_type == 'life':
-            premium = calculate_life_premium(details)
-        else:
+        if event.get('routeKey') == BATCH_ROUTE:
+            return batch_handler(event, context)
+
+        with instrumentation.phase('parse'):
+            if event.get('requestContext', {}).get('http', {}).get('method') == 'GET':
+                insurance_type, details = parse_query(event)
+                headers = {'Cache-Control': f'public, max-age={MAX_AGE_SECONDS}'}
+            else:
+                body = json.loads(event['body'])
+                insurance_type = body.get('insuranceType')
+                details = body.get('details', {})
+                headers = {}
+
+        if not is_insurance_type(insurance_type):
             return {
                 'statusCode': 400,
                 'body': json.dumps({'error': 'Invalid insurance type'})
             }
-        
+
+        try:
+            key = cache_key(insurance_type, details)
+        except (ValueError, TypeError, AttributeError):
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f'Invalid {insurance_type} details'})
+            }
+        headers['ETag'] = premium_etag(key)
+
+        # The premium depends only on the key, so a matching tag needs no rating
+        request_headers = event.get('headers') or {}
+        client_tags = [value.strip() for value in (request_headers.get('if-none-match') or '').split(',')]
+        if headers['ETag'] in client_tags:
+            instrumentation.metric('notModified')
+            return {'statusCode': 304, 'headers': headers, 'body': ''}
+
+        with instrumentation.phase('rating'):
+            premium = premiumCache.rate(insurance_type, details)
+
         return {
             'statusCode': 200,
+            'headers': headers,
             'body': json.dumps({
                 'insuranceType': insurance_type,
                 'premiumAmount': premium,
+                'cacheKey': key,
                 'message': f'Your estimated {insurance_type} insurance premium is ${premium}'
             })
         }
-        
+
     except Exception as e:
         return {
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
-        }
\ No newline at end of file
+        }
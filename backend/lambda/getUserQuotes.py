@@ -1,86 +1,397 @@
 import json
-import boto3
-from boto3.dynamodb.conditions import Key
-from decimal import Decimal
-
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('InsuranceQuoteRequestsV2')
-
-# Helper function to convert Decimal to int/float
-def decimal_to_number(obj):
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    elif isinstance(obj, dict):
-        return {k: decimal_to_number(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [decimal_to_number(v) for v in obj]
-    return obj
+import base64
+import csv
+import hashlib
+import io
+import os
+from datetime import datetime
 
+import awsClients
+import instrumentation
+import quoteSummaryStream
+import rating
+import warmup
+
+TABLE_NAME = os.environ.get('DYNAMODB_TABLE', 'InsuranceQuoteRequestsV3')
+
+# Per-user summary kept up to date by quoteSummaryStream; serves the dashboard
+# with one GetItem when no explicit page is requested
+SUMMARY_TABLE = quoteSummaryStream.SUMMARY_TABLE
+
+# The table's sort key is insuranceType#createdAt#quoteId, so one type's quotes
+# are a key range; this LSI (sort key createdAt) orders them across types
+CREATED_AT_INDEX = 'CreatedAtIndex'
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+EXPORT_ROUTE = 'GET /quotes/export'
+EXPORT_PAGE_SIZE = 1000
+EXPORT_FIELDS = ('insuranceType', 'premiumAmount', 'createdAt', 'details')
+EXPORT_CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Lambda responses are capped at 6 MB; stop before this many body bytes and
+# hand back a cursor
+MAX_EXPORT_BYTES = 5 * 1024 * 1024
+
+# Only read what the dashboard renders
+QUOTE_PROJECTION = '#type, premiumAmount, createdAt, details'
+# The export also reads the key attributes, so it can resume after any item
+EXPORT_PROJECTION = 'email, quoteKey, ' + QUOTE_PROJECTION
+EXPORT_KEY_ATTRIBUTES = ('email', 'quoteKey', 'createdAt')
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization,If-None-Match',
+    'Access-Control-Allow-Methods': 'GET,OPTIONS'
+}
+
+def encode_next_token(last_evaluated_key):
+    # LastEvaluatedKey only holds string key attributes for the table and index
+    raw = json.dumps(last_evaluated_key, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_next_token(token, user_email):
+    try:
+        start_key = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid nextToken')
+    # A cursor must never let one user page into another user's partition
+    if not isinstance(start_key, dict) or start_key.get('email') != {'S': user_email}:
+        raise ValueError('Invalid nextToken')
+    return start_key
+
+def parse_limit(value):
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+# type, since and until from the query string. since and until bound createdAt
+# and take ISO 8601 dates or timestamps.
+def parse_filters(params):
+    insurance_type = params.get('type')
+    if insurance_type is not None and insurance_type not in rating.INSURANCE_TYPES:
+        raise ValueError(f"type must be one of {', '.join(sorted(rating.INSURANCE_TYPES))}")
+    since = params.get('since')
+    until = params.get('until')
+    for name, value in (('since', since), ('until', until)):
+        if value is not None:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f'{name} must be an ISO 8601 date or timestamp')
+    if since and until and since >= until:
+        raise ValueError('since must be before until')
+    return insurance_type, since, until
+
+# createdAt is ASCII isoformat() text, every character of it below '~'. The
+# greatest such value that sorts before `value`, so an inclusive BETWEEN can
+# stop just short of it.
+def sorts_before(value):
+    return value[:-1] + chr(ord(value[-1]) - 1) + '~' * 64
+
+# Newest first. Every filter is part of the key condition, so a page reads
+# only the quotes it returns. Every filter combination selects the half-open
+# range since <= createdAt < until.
+def query_user_quotes(user_email, limit, start_key=None, insurance_type=None, since=None, until=None,
+                      projection=QUOTE_PROJECTION):
+    values = {':email': {'S': user_email}}
+    if insurance_type:
+        # One type's quotes sort between type# and type$ ('$' follows '#'). A
+        # quote created at until sorts as type#until#id, after :to.
+        sort_key = 'quoteKey'
+        values[':from'] = {'S': f"{insurance_type}#{since or ''}"}
+        values[':to'] = {'S': f"{insurance_type}#{until}" if until else f"{insurance_type}$"}
+        sort_condition = ' AND quoteKey BETWEEN :from AND :to'
+    else:
+        # A key condition allows one comparison on the sort key
+        sort_key = 'createdAt'
+        sort_condition = ''
+        if since:
+            values[':from'] = {'S': since}
+        if until:
+            values[':to'] = {'S': sorts_before(until) if since else until}
+        if since and until:
+            sort_condition = ' AND createdAt BETWEEN :from AND :to'
+        elif since:
+            sort_condition = ' AND createdAt >= :from'
+        elif until:
+            sort_condition = ' AND createdAt < :to'
+
+    params = {
+        'TableName': TABLE_NAME,
+        'KeyConditionExpression': 'email = :email' + sort_condition,
+        'ExpressionAttributeValues': values,
+        'ProjectionExpression': projection,
+        'ExpressionAttributeNames': {'#type': 'insuranceType'},
+        'ScanIndexForward': False,
+        'Limit': limit
+    }
+    if sort_key == 'createdAt':
+        params['IndexName'] = CREATED_AT_INDEX
+    if start_key:
+        params['ExclusiveStartKey'] = start_key
+    return awsClients.get_client('dynamodb').query(**params)
+
+# Returns the user's summary item, or None until it has been created
+def get_user_summary(user_email):
+    response = awsClients.get_client('dynamodb').get_item(
+        TableName=SUMMARY_TABLE,
+        Key={'email': {'S': user_email}}
+    )
+    item = response.get('Item')
+    return awsClients.from_item(item) if item else None
+
+def summary_quotes(summary):
+    quotes = [
+        {
+            'insuranceType': quote.get('insuranceType'),
+            'premiumAmount': quote.get('premiumAmount'),
+            'createdAt': quote.get('createdAt'),
+            'details': quote.get('details', {})
+        }
+        for name, quote in summary.items() if name.startswith(quoteSummaryStream.LATEST_PREFIX)
+    ]
+    quotes.sort(key=lambda quote: quote['createdAt'] or '', reverse=True)
+    return quotes
+
+def etag(body):
+    return '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"'
+
+# Serve a JSON body with an ETag, or 304 when the client already holds it
+def conditional_response(event, body):
+    tag = etag(body)
+    headers = dict(CORS_HEADERS)
+    headers['ETag'] = tag
+    headers['Cache-Control'] = 'private, no-cache'
+    headers['Access-Control-Expose-Headers'] = 'ETag'
+    request_headers = event.get('headers') or {}
+    client_tags = [value.strip() for value in (request_headers.get('if-none-match') or '').split(',')]
+    if tag in client_tags:
+        instrumentation.metric('notModified')
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    return {'statusCode': 200, 'headers': headers, 'body': body}
+
+# Encode a DynamoDB attribute value straight to JSON text. Numbers keep their
+# wire representation, so no Decimal or float conversion happens on export.
+def attribute_to_json(attribute):
+    (kind, value), = attribute.items()
+    if kind == 'S':
+        return json.dumps(value)
+    if kind == 'N':
+        return value
+    if kind == 'M':
+        return '{' + ','.join(f'{json.dumps(k)}:{attribute_to_json(v)}' for k, v in value.items()) + '}'
+    if kind == 'L':
+        return '[' + ','.join(attribute_to_json(v) for v in value) + ']'
+    if kind == 'BOOL':
+        return 'true' if value else 'false'
+    return 'null'
+
+def attribute_to_text(attribute):
+    (kind, value), = attribute.items()
+    if kind in ('S', 'N'):
+        return value
+    return attribute_to_json(attribute)
+
+# One export line per item
+def ndjson_line(item):
+    fields = [f'"{field}":{attribute_to_json(item[field])}' for field in EXPORT_FIELDS if field in item]
+    return '{' + ','.join(fields) + '}\n'
+
+def csv_row(item):
+    return [attribute_to_text(item[field]) if field in item else '' for field in EXPORT_FIELDS]
+
+# Returns a function rendering one CSV row as its line; it reuses one writer
+def csv_line_writer():
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def csv_line(values):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        return buffer.getvalue()
+    return csv_line
+
+# Page through the user's quotes, writing each item's line into the body as it
+# arrives, so only the body and one page of raw items are held at a time. An
+# item whose line would take the body past MAX_EXPORT_BYTES (UTF-8 bytes) is
+# left for the next call, which resumes right after the last item written.
+# Returns (body, size in bytes, nextStartKey).
+def export_quotes(user_email, export_format, start_key=None):
+    body = io.StringIO()
+    size = 0
+    item_line = ndjson_line
+    if export_format == 'csv':
+        csv_line = csv_line_writer()
+        item_line = lambda item: csv_line(csv_row(item))
+        if start_key is None:
+            header = csv_line(EXPORT_FIELDS)
+            body.write(header)
+            size += len(header)
+
+    last_key = start_key
+    while True:
+        response = query_user_quotes(user_email, EXPORT_PAGE_SIZE, start_key, projection=EXPORT_PROJECTION)
+        for item in response['Items']:
+            line = item_line(item)
+            # isascii() is a flag check, so only non-ASCII lines are encoded to count bytes
+            line_size = len(line) if line.isascii() else len(line.encode('utf-8'))
+            if size + line_size > MAX_EXPORT_BYTES:
+                return body.getvalue(), size, last_key
+            body.write(line)
+            size += line_size
+            last_key = {name: item[name] for name in EXPORT_KEY_ATTRIBUTES}
+
+        start_key = response.get('LastEvaluatedKey')
+        if not start_key:
+            return body.getvalue(), size, None
+
+def export_handler(event, user_email):
+    params = event.get('queryStringParameters') or {}
+    export_format = params.get('format', 'ndjson')
+    if export_format not in EXPORT_CONTENT_TYPES:
+        return {
+            'statusCode': 400,
+            'headers': CORS_HEADERS,
+            'body': json.dumps({'error': 'format must be ndjson or csv'})
+        }
+
+    try:
+        start_key = None
+        if params.get('nextToken'):
+            start_key = decode_next_token(params['nextToken'], user_email)
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'headers': CORS_HEADERS,
+            'body': json.dumps({'error': str(e)})
+        }
+
+    with instrumentation.phase('export'):
+        body, size, next_key = export_quotes(user_email, export_format, start_key)
+    instrumentation.metric('exportBytes', size)
+
+    headers = dict(CORS_HEADERS)
+    headers['Content-Type'] = EXPORT_CONTENT_TYPES[export_format]
+    headers['Content-Disposition'] = f'attachment; filename="quotes.{export_format}"'
+    headers['Access-Control-Expose-Headers'] = 'X-Next-Token'
+    if next_key:
+        # Export was cut at the response size limit; call again with this token
+        headers['X-Next-Token'] = encode_next_token(next_key)
+
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': body
+    }
+
+# Keep-warm (see warmup.py): the DynamoDB client and its connection
+def open_dynamodb():
+    awsClients.get_client('dynamodb').get_item(
+        TableName=SUMMARY_TABLE, Key={'email': {'S': warmup.PROBE_KEY}})
+
+WARMUP_STEPS = (open_dynamodb,)
+
+@instrumentation.instrumented('getUserQuotes')
 def lambda_handler(event, context):
+    if warmup.is_warmup_event(event):
+        return warmup.run(WARMUP_STEPS)
     try:
-        print(f"Event: {json.dumps(event)}")
-        
+        if instrumentation.DEBUG:
+            print(f"Event: {json.dumps(event)}")
+
         # Get user email from JWT token
         authorizer = event.get('requestContext', {}).get('authorizer', {})
         jwt_claims = authorizer.get('jwt', {}).get('claims', {})
         user_email = jwt_claims.get('email')
-        
-        print(f"User email from JWT: {user_email}")
-        
+
+        if instrumentation.DEBUG:
+            print(f"User email from JWT: {user_email}")
+
         if not user_email:
             return {
                 'statusCode': 401,
-                'headers': {
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-                    'Access-Control-Allow-Methods': 'GET,OPTIONS'
-                },
+                'headers': CORS_HEADERS,
                 'body': json.dumps({'error': 'Unauthorized - no email in token'})
             }
-        
-        # Query all quotes for this user
-        response = table.scan(
-            FilterExpression=Key('compositeKey').begins_with(user_email)
-        )
-        
-        print(f"DynamoDB response: {response}")
-        
-        quotes = []
-        for item in response['Items']:
-            quote = {
-                'insuranceType': item.get('insuranceType'),
-                'premiumAmount': item.get('premiumAmount'),
-                'createdAt': item.get('createdAt'),
-                'details': item.get('details', {})
+
+        if event.get('routeKey') == EXPORT_ROUTE:
+            return export_handler(event, user_email)
+
+        params = event.get('queryStringParameters') or {}
+        try:
+            limit = parse_limit(params.get('limit'))
+            insurance_type, since, until = parse_filters(params)
+            start_key = None
+            if params.get('nextToken'):
+                start_key = decode_next_token(params['nextToken'], user_email)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': CORS_HEADERS,
+                'body': json.dumps({'error': str(e)})
             }
-            # Convert Decimal objects to numbers
-            quotes.append(decimal_to_number(quote))
-        
-        print(f"Found {len(quotes)} quotes for user {user_email}")
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-                'Access-Control-Allow-Methods': 'GET,OPTIONS'
-            },
-            'body': json.dumps({
-                'quotes': quotes,
-                'userEmail': user_email
-            })
-        }
-        
+
+        # The dashboard's first load comes from the summary item when there is one
+        if not params.keys() & {'limit', 'nextToken', 'type', 'since', 'until'}:
+            with instrumentation.phase('summary'):
+                summary = get_user_summary(user_email)
+            if summary is not None:
+                with instrumentation.phase('serialize'):
+                    body = json.dumps({
+                        'quotes': summary_quotes(summary),
+                        'userEmail': user_email,
+                        'nextToken': None,
+                        'totalCount': summary.get('totalCount', 0),
+                        'lastUpdated': summary.get('lastUpdated')
+                    })
+                return conditional_response(event, body)
+
+        # Query one page of quotes for this user
+        with instrumentation.phase('query'):
+            response = query_user_quotes(user_email, limit, start_key, insurance_type, since, until)
+
+        with instrumentation.phase('serialize'):
+            quotes = []
+            for item in response['Items']:
+                item = awsClients.from_item(item)
+                quotes.append({
+                    'insuranceType': item.get('insuranceType'),
+                    'premiumAmount': item.get('premiumAmount'),
+                    'createdAt': item.get('createdAt'),
+                    'details': item.get('details', {})
+                })
+
+        next_token = None
+        if response.get('LastEvaluatedKey'):
+            next_token = encode_next_token(response['LastEvaluatedKey'])
+
+        instrumentation.metric('quotes', len(quotes))
+        if instrumentation.DEBUG:
+            print(f"Found {len(quotes)} quotes for user {user_email}")
+
+        return conditional_response(event, json.dumps({
+            'quotes': quotes,
+            'userEmail': user_email,
+            'nextToken': next_token
+        }))
+
     except Exception as e:
         print(f"Error: {str(e)}")
         import traceback
         print(f"Traceback: {traceback.format_exc()}")
         return {
             'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-                'Access-Control-Allow-Methods': 'GET,OPTIONS'
-            },
+            'headers': CORS_HEADERS,
             'body': json.dumps({'error': f'Internal server error: {str(e)}'})
-        }
\ No newline at end of file
+        }
+
+warmup.at_init(WARMUP_STEPS)
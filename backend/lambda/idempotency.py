@@ -0,0 +1,96 @@
+# Idempotency helpers for quote submissions.
+# submitQuote takes a lock on email#insuranceType with one conditional write
+# instead of reading first; a second submission of the same type while the lock
+# is held is a duplicate. Locks are items in their own partitions of the quote
+# table (email = lock#<email>#<type>), so a user's quote queries never see them,
+# and DynamoDB TTL removes them after DUPLICATE_WINDOW_SECONDS.
+#
+# Each stored quote is a new item keyed by its quote id, so a redelivered message
+# overwrites its own item with the same values and quoteWorker writes batches
+# without a condition. Single writes that need to know whether the quote was
+# already stored use STORE_CONDITION.
+import os
+import time
+
+import awsClients
+
+LOCK_PREFIX = 'lock#'
+LOCK_SORT_KEY = 'lock'
+
+# How long the same customer's quote of the same type counts as a duplicate
+DUPLICATE_WINDOW_SECONDS = int(os.environ.get('DUPLICATE_WINDOW_SECONDS', '900'))
+
+# Free, or a lock that has expired but not yet been swept by TTL
+RESERVE_CONDITION = 'attribute_not_exists(email) OR expiresAt < :now'
+
+# Quotes are written once
+STORE_CONDITION = 'attribute_not_exists(quoteKey)'
+
+def is_conditional_check_failure(error):
+    return awsClients.is_client_error(error, 'ConditionalCheckFailedException')
+
+def lock_key(composite_key):
+    return {'email': {'S': LOCK_PREFIX + composite_key}, 'quoteKey': {'S': LOCK_SORT_KEY}}
+
+def lock_item(composite_key, now):
+    item = lock_key(composite_key)
+    item['expiresAt'] = {'N': str(now + DUPLICATE_WINDOW_SECONDS)}
+    return item
+
+# Returns True if the key was reserved, False if it is already taken
+def reserve(dynamodb, table_name, composite_key):
+    now = int(time.time())
+    try:
+        dynamodb.put_item(
+            TableName=table_name,
+            Item=lock_item(composite_key, now),
+            ConditionExpression=RESERVE_CONDITION,
+            ExpressionAttributeValues={':now': {'N': str(now)}}
+        )
+        return True
+    except Exception as e:
+        if is_conditional_check_failure(e):
+            return False
+        raise
+
+# TransactWriteItems takes at most 100 actions
+MAX_TRANSACTION_KEYS = 100
+
+# Per-action codes of a cancelled transaction, or None for any other error
+def _cancellation_codes(error):
+    if not awsClients.is_client_error(error, 'TransactionCanceledException'):
+        return None
+    return [reason.get('Code') for reason in error.response.get('CancellationReasons') or []]
+
+# Reserve up to 100 keys with one TransactWriteItems call, each lock under
+# RESERVE_CONDITION. A transaction is all or nothing: when some keys are taken
+# it is cancelled, CancellationReasons marks them ConditionalCheckFailed, and
+# one more transaction reserves the rest. Returns the keys that were reserved.
+# Raises if the retry is cancelled too, or for any other error.
+def reserve_many(dynamodb, table_name, composite_keys):
+    if len(composite_keys) > MAX_TRANSACTION_KEYS:
+        raise ValueError(f"At most {MAX_TRANSACTION_KEYS} keys per reservation")
+    now = int(time.time())
+    keys = list(composite_keys)
+    for attempt in range(2):
+        if not keys:
+            break
+        try:
+            dynamodb.transact_write_items(TransactItems=[{'Put': {
+                'TableName': table_name,
+                'Item': lock_item(key, now),
+                'ConditionExpression': RESERVE_CONDITION,
+                'ExpressionAttributeValues': {':now': {'N': str(now)}}
+            }} for key in keys])
+            return keys
+        except Exception as e:
+            codes = _cancellation_codes(e)
+            if attempt or not codes or len(codes) != len(keys) \
+                    or not set(codes) <= {'None', 'ConditionalCheckFailed'}:
+                raise
+            keys = [key for key, code in zip(keys, codes) if code != 'ConditionalCheckFailed']
+    return []
+
+# Drop our lock so the customer can retry straight away
+def release(dynamodb, table_name, composite_key):
+    dynamodb.delete_item(TableName=table_name, Key=lock_key(composite_key))
@@ -0,0 +1,142 @@
+# Lightweight per-invocation instrumentation for the Lambda handlers.
+# @instrumented(name) wraps a handler; inside it, `with phase('rating'):` blocks
+# accumulate wall time per phase and metric() records counters. When the handler
+# returns, everything is written as one CloudWatch Embedded Metric Format (EMF)
+# JSON line, which CloudWatch turns into metrics without any PutMetricData calls.
+#
+# The invocation being measured lives in a context variable, so work handed to
+# a thread pool is only measured when submitted through bind(), and then always
+# lands on the invocation that submitted it.
+#
+# METRICS_SAMPLE_RATE (0..1) controls how many invocations are measured; unsampled
+# invocations skip the timing work entirely. LOG_LEVEL=DEBUG turns the verbose
+# request/response dumps back on; handlers guard them with `if DEBUG:` so the
+# default path never serializes them.
+import contextvars
+import functools
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+
+import warmup
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'InsuranceQuoteSystem')
+SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', '1'))
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+DEBUG = LOG_LEVEL == 'DEBUG'
+
+# Metric names ending in 'Ms' are timings, everything else is a count
+TIMING_SUFFIX = 'Ms'
+
+_current = contextvars.ContextVar('invocation', default=None)
+_cold_start = True
+
+class Invocation:
+    __slots__ = ('function_name', 'metrics', 'properties')
+
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self.metrics = {}
+        self.properties = {}
+
+def _unit(name):
+    return 'Milliseconds' if name.endswith(TIMING_SUFFIX) else 'Count'
+
+def _add(invocation, name, value):
+    invocation.metrics[name] = invocation.metrics.get(name, 0) + value
+
+# Add to a metric of the current invocation (no-op when it is not sampled)
+def metric(name, value=1):
+    invocation = _current.get()
+    if invocation is not None:
+        _add(invocation, name, value)
+
+# Attach a non-metric field (searchable in Logs Insights) to the EMF line
+def set_property(name, value):
+    invocation = _current.get()
+    if invocation is not None:
+        invocation.properties[name] = value
+
+# Time a block of the handler; repeated phases (e.g. per SQS record) add up.
+# The invocation is captured on entry, so a block that outlives it never
+# reports into the next one.
+@contextmanager
+def phase(name):
+    invocation = _current.get()
+    if invocation is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add(invocation, name + TIMING_SUFFIX, (time.perf_counter() - started) * 1000)
+
+# Wrap fn to run in the caller's context, for executor.submit(): its phases and
+# metrics then belong to the invocation that submitted it
+def bind(fn):
+    return functools.partial(contextvars.copy_context().run, fn)
+
+def emf_record(invocation, timestamp_ms=None):
+    metrics = invocation.metrics
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000) if timestamp_ms is None else timestamp_ms,
+            'CloudWatchMetrics': [{
+                'Namespace': NAMESPACE,
+                'Dimensions': [['FunctionName']],
+                'Metrics': [{'Name': name, 'Unit': _unit(name)} for name in metrics]
+            }]
+        },
+        'FunctionName': invocation.function_name
+    }
+    record.update(invocation.properties)
+    for name, value in metrics.items():
+        record[name] = round(value, 3) if isinstance(value, float) else value
+    return record
+
+def emit(invocation):
+    record = emf_record(invocation)
+    print(json.dumps(record, separators=(',', ':')))
+    return record
+
+def _sampled():
+    return SAMPLE_RATE >= 1 or random.random() < SAMPLE_RATE
+
+def instrumented(function_name):
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            global _cold_start
+            cold_start, _cold_start = _cold_start, False
+            # Keep-warm invocations are not requests; they only use up the cold start
+            if not _sampled() or warmup.is_warmup_event(event):
+                return handler(event, context)
+
+            invocation = Invocation(function_name)
+            invocation.properties['coldStart'] = cold_start
+            request_id = getattr(context, 'aws_request_id', None)
+            if request_id:
+                invocation.properties['requestId'] = request_id
+
+            token = _current.set(invocation)
+            started = time.perf_counter()
+            try:
+                response = handler(event, context)
+                if isinstance(response, dict) and 'statusCode' in response:
+                    invocation.properties['statusCode'] = response['statusCode']
+                return response
+            except Exception:
+                _add(invocation, 'errors', 1)
+                raise
+            finally:
+                _add(invocation, 'total' + TIMING_SUFFIX, (time.perf_counter() - started) * 1000)
+                _current.reset(token)
+                try:
+                    emit(invocation)
+                except Exception as e:
+                    print(f"Failed to emit metrics: {e}")
+        return wrapper
+    return decorator
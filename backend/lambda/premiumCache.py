@@ -0,0 +1,82 @@
+# Memoized premium rating keyed on lightly normalized applicant fields.
+# The key is built from the raw rated fields without evaluating any rule:
+# strings are lower-cased (the rules only ever compare them lower-cased) and
+# integer fields are bucketed, with bucket edges on the rule thresholds so a
+# bucket never straddles one. Repeated keys are served from a bounded
+# per-container LRU. Every key carries rating.RULES_VERSION, so changing the
+# rules invalidates it. There is no shared tier: a DynamoDB read costs far
+# more than rating a quote.
+#
+# The cache is off by default, and then rate is rating.rate itself, so callers
+# pay nothing for the layer. Turn it on with PREMIUM_CACHE_ENABLED once rating
+# does real work per quote.
+import os
+from collections import OrderedDict
+
+import rating
+
+CACHE_ENABLED = os.environ.get('PREMIUM_CACHE_ENABLED', 'false').lower() == 'true'
+CACHE_SIZE = int(os.environ.get('PREMIUM_CACHE_SIZE', '1024'))
+
+# Bucket width per integer field; fields not listed are keyed on their exact value
+BUCKET_WIDTHS = {'year': 5, 'yearBuilt': 10, 'squareFootage': 250, 'age': 5}
+
+_cache = OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+# One key part per surcharge rule. Integer buckets start at the threshold
+# (greater_than: value + 1), so both sides of it never share a bucket.
+def _key_part(rule):
+    if rule['op'] in ('equals', 'contains'):
+        return rule['field'], rule['default'], str.lower
+    width = BUCKET_WIDTHS.get(rule['field'], 1)
+    edge = rule['value'] + 1 if rule['op'] == 'greater_than' else rule['value']
+    return rule['field'], rule['default'], lambda value: (int(value) - edge) // width
+
+_KEY_PARTS = {insurance_type: tuple(_key_part(rule) for rule in table['surcharges'])
+              for insurance_type, table in rating.RULES.items()}
+
+# Raises KeyError for unknown types and AttributeError/TypeError/ValueError for
+# field values the rules cannot read
+def feature_key(insurance_type, details):
+    return (rating.RULES_VERSION, insurance_type) + tuple(
+        normalize(details.get(field, default)) for field, default, normalize in _KEY_PARTS[insurance_type])
+
+def stats():
+    lookups = _stats['hits'] + _stats['misses']
+    result = dict(_stats)
+    result['size'] = len(_cache)
+    result['hitRate'] = _stats['hits'] / lookups if lookups else 0.0
+    return result
+
+def clear():
+    _cache.clear()
+    for name in _stats:
+        _stats[name] = 0
+
+def _remember(key, premium):
+    _cache[key] = premium
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+        _stats['evictions'] += 1
+
+def cached_rate(insurance_type, details):
+    try:
+        key = feature_key(insurance_type, details)
+    except (KeyError, AttributeError, TypeError, ValueError):
+        # Nothing to cache: rating gives the same answer or raises the same error
+        return rating.rate(insurance_type, details)
+
+    premium = _cache.get(key)
+    if premium is not None:
+        _cache.move_to_end(key)
+        _stats['hits'] += 1
+        return premium
+
+    _stats['misses'] += 1
+    premium = rating.rate(insurance_type, details)
+    _remember(key, premium)
+    return premium
+
+# Drop-in replacement for rating.rate()
+rate = cached_rate if CACHE_ENABLED else rating.rate
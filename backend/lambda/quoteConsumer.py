@@ -0,0 +1,187 @@
+# SQS consumer core behind quoteWorker, which all three quote queues invoke.
+# Decodes each SQS record once (see quoteMessage), rates it with the rater
+# registered for its insurance type, writes the quotes as new history items with
+# BatchWriteItem, and reports only the records that actually failed back to the
+# queue. Quote keys come from the message, so a redelivered record overwrites
+# its own item with the same values rather than adding one.
+#
+# Quote table layout: partition key email, sort key quoteKey
+# (insuranceType#createdAt#quoteId), so a user's quotes of one type are stored
+# in time order; CreatedAtIndex (LSI on createdAt) orders them across types.
+import os
+import random
+import time
+import uuid
+from datetime import datetime
+from functools import partial
+
+import awsClients
+import idempotency
+import instrumentation
+import premiumCache
+import quoteMessage
+import rating
+
+TABLE_NAME = os.environ.get('DYNAMODB_TABLE', 'InsuranceQuoteRequestsV3')
+
+# BatchWriteItem accepts at most 25 put requests per call
+BATCH_WRITE_LIMIT = 25
+MAX_WRITE_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_MAX_SECONDS = 2.0
+
+# Rater registry: insurance type -> callable(details) returning the premium.
+# Every type in rating.RULES is registered at import; register_rater adds a type
+# or replaces its rater.
+RATERS = {}
+
+# Types the subscription filters accept under another name
+TYPE_ALIASES = {'vehicle': 'auto'}
+
+# Queue name (as in template.yaml) -> the type its subscription filter admits
+QUEUE_TYPES = {
+    'vehicle-insurance-quotes': 'auto',
+    'home-insurance-quotes': 'home',
+    'life-insurance-quotes': 'life',
+}
+
+def register_rater(insurance_type, rater):
+    RATERS[insurance_type] = rater
+
+for _insurance_type in sorted(rating.INSURANCE_TYPES):
+    register_rater(_insurance_type, partial(premiumCache.rate, _insurance_type))
+
+# The record's insurance type: the message's own, else (pre-v1 bodies without
+# one) the type of the queue it came from
+def resolve_type(record, message):
+    insurance_type = TYPE_ALIASES.get(message.insurance_type, message.insurance_type)
+    if insurance_type in RATERS:
+        return insurance_type
+    queue_type = QUEUE_TYPES.get(record.get('eventSourceARN', '').rsplit(':', 1)[-1])
+    if queue_type is None:
+        raise ValueError(f"No rater for insurance type {message.insurance_type!r}")
+    return queue_type
+
+def quote_key(insurance_type, created_at, quote_id):
+    return f"{insurance_type}#{created_at}#{quote_id}"
+
+def parse_record(record):
+    message = quoteMessage.decode(record['body'])
+    # Messages published without a quote id: derive it and the timestamp from
+    # the SQS message, which stay the same across redeliveries
+    if message.quote_id is None:
+        message.quote_id = record.get('messageId') or str(uuid.uuid4())
+        sent_at = record.get('attributes', {}).get('SentTimestamp')
+        created_at = datetime.utcfromtimestamp(int(sent_at) / 1000) if sent_at else datetime.utcnow()
+        message.created_at = created_at.isoformat()
+    return message
+
+def build_item(message, insurance_type, premium):
+    return {
+        'email': message.email or 'unknown',
+        'quoteKey': quote_key(insurance_type, message.created_at, message.quote_id),
+        'quoteId': message.quote_id,
+        'insuranceType': insurance_type,
+        'name': message.name,
+        'details': message.details,
+        'premiumAmount': premium,
+        'createdAt': message.created_at
+    }
+
+# Store one quote unless it is already stored. Returns False if it was.
+# process_batch writes without a condition; this is for single writes that need
+# to know whether the quote was there (scripts/replay_dlq.py).
+def store_item(item):
+    try:
+        awsClients.get_client('dynamodb').put_item(
+            TableName=TABLE_NAME,
+            Item=awsClients.to_item(item),
+            ConditionExpression=idempotency.STORE_CONDITION
+        )
+        return True
+    except Exception as e:
+        if idempotency.is_conditional_check_failure(e):
+            return False
+        raise
+
+def item_key(item):
+    return (item['email'], item['quoteKey'])
+
+def backoff_delay(attempt):
+    # Full jitter keeps retries from concurrent consumers spread out
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+# Write up to 25 put requests, retrying UnprocessedItems with jittered backoff.
+# Returns the keys that could not be written.
+def write_chunk(requests):
+    dynamodb = awsClients.get_client('dynamodb')
+    pending = requests
+    for attempt in range(MAX_WRITE_ATTEMPTS):
+        response = dynamodb.batch_write_item(RequestItems={TABLE_NAME: pending})
+        pending = response.get('UnprocessedItems', {}).get(TABLE_NAME, [])
+        if not pending:
+            return set()
+        if attempt < MAX_WRITE_ATTEMPTS - 1:
+            time.sleep(backoff_delay(attempt))
+
+    return {(request['PutRequest']['Item']['email']['S'], request['PutRequest']['Item']['quoteKey']['S'])
+            for request in pending}
+
+# Write {key: item} in chunks of 25 and return the keys that failed
+def write_items(items):
+    failed = set()
+    keys = list(items)
+    for start in range(0, len(keys), BATCH_WRITE_LIMIT):
+        chunk = keys[start:start + BATCH_WRITE_LIMIT]
+        try:
+            failed |= write_chunk([{'PutRequest': {'Item': awsClients.to_item(items[key])}} for key in chunk])
+        except Exception as e:
+            print(f"❌ Error writing quote batch: {e}")
+            failed.update(chunk)
+    return failed
+
+# Rate and store every record in an SQS batch, each dispatched on its own type.
+# Returns the partial batch response expected by ReportBatchItemFailures so only
+# failed records are retried.
+def process_batch(event):
+    failures = []
+    items = {}
+    message_ids = {}
+
+    for record in event['Records']:
+        message_id = record.get('messageId')
+        record_type = None
+        try:
+            with instrumentation.phase('parse'):
+                message = parse_record(record)
+                record_type = resolve_type(record, message)
+            with instrumentation.phase('rating'):
+                premium = RATERS[record_type](message.details)
+            item = build_item(message, record_type, premium)
+        except Exception as e:
+            print(f"❌ Error processing {record_type or 'unknown'} quote {message_id}: {e}")
+            failures.append(message_id)
+            continue
+
+        # The same quote may be delivered twice in one batch; BatchWriteItem
+        # rejects duplicate keys, so it is written once for both records
+        key = item_key(item)
+        items[key] = item
+        message_ids.setdefault(key, []).append(message_id)
+
+    with instrumentation.phase('store'):
+        failed_keys = write_items(items) if items else set()
+    for key in failed_keys:
+        print(f"❌ Error storing quote {key[0]} {key[1]}")
+        failures.extend(message_ids[key])
+    stored = len(items) - len(failed_keys)
+
+    instrumentation.metric('records', len(event['Records']))
+    instrumentation.metric('stored', stored)
+    instrumentation.metric('failures', len(failures))
+    if instrumentation.DEBUG:
+        print(f"✅ Stored {stored} quote(s), {len(failures)} failed")
+
+    return {
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failures]
+    }
@@ -0,0 +1,88 @@
+# Wire format for quote events published by submitQuote and read by the consumers.
+# v1 is a compact JSON object with one-letter keys and flat string details:
+#   {"v":1,"t":"auto","e":"jane@example.com","n":"Jane","d":{"year":"2019",...},
+#    "i":"<quote id>","c":"<createdAt>"}
+# "i" and "c" are set by submitQuote so every delivery of a message stores the
+# same history item; messages without them are still valid v1.
+# The SNS subscriptions use raw message delivery, so an SQS body is exactly this
+# object and each record is decoded and validated once, into a QuoteMessage.
+# Messages published before v1 (the full request body, optionally inside an SNS
+# notification envelope) are still accepted so queues and DLQs drain across a deploy.
+#
+# orjson is used when it is installed; otherwise the stdlib json module.
+import json
+
+try:
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    loads = orjson.loads
+except ImportError:
+    def dumps(obj):
+        return json.dumps(obj, separators=(',', ':'))
+
+    loads = json.loads
+
+SCHEMA_VERSION = 1
+
+class QuoteMessage:
+    __slots__ = ('insurance_type', 'email', 'name', 'details', 'quote_id', 'created_at')
+
+    def __init__(self, insurance_type, email, name, details, quote_id=None, created_at=None):
+        self.insurance_type = insurance_type
+        self.email = email
+        self.name = name
+        self.details = details
+        self.quote_id = quote_id
+        self.created_at = created_at
+
+# Accept flat details or the DynamoDB-style {'field': {'S': value}} the old
+# clients sent, and always return a flat dict
+def normalize_details(details):
+    if isinstance(details, str):
+        details = loads(details)
+    if not isinstance(details, dict):
+        raise ValueError('details must be an object')
+    for value in details.values():
+        if isinstance(value, dict):
+            return {k: v.get('S', '') if isinstance(v, dict) else v for k, v in details.items()}
+    return details
+
+def encode(body, quote_id=None, created_at=None):
+    message = {
+        'v': SCHEMA_VERSION,
+        't': body['insuranceType'],
+        'e': body.get('email'),
+        'n': body.get('name'),
+        'd': normalize_details(body.get('details') or {})
+    }
+    if quote_id is not None:
+        message['i'] = quote_id
+        message['c'] = created_at
+    return dumps(message)
+
+def decode(raw):
+    data = loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError('Quote message must be an object')
+
+    version = data.get('v')
+    if version == SCHEMA_VERSION:
+        insurance_type = data.get('t')
+        if not isinstance(insurance_type, str):
+            raise ValueError('Quote message has no insurance type')
+        details = data.get('d')
+        if not isinstance(details, dict):
+            raise ValueError('Quote message details must be an object')
+        return QuoteMessage(insurance_type, data.get('e'), data.get('n'), details,
+                            data.get('i'), data.get('c'))
+    if version is not None:
+        raise ValueError(f'Unsupported quote message version: {version}')
+
+    # Pre-v1: SNS notification envelope (raw delivery off) around the request body
+    if data.get('Type') == 'Notification' and 'Message' in data:
+        return decode(data['Message'])
+    return QuoteMessage(data.get('insuranceType'), data.get('email'), data.get('name'),
+                        normalize_details(data.get('details') or {}))
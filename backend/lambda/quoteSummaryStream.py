@@ -0,0 +1,153 @@
+# DynamoDB Streams processor that keeps one summary item per user in the summary
+# table: the latest quote of each insurance type, the total number of stored quotes
+# and when the summary last changed. getUserQuotes serves the dashboard from this
+# single item instead of querying and re-serializing every quote.
+#
+# Summary item layout (SUMMARY_TABLE, key email):
+#   latest#<type>   M  insuranceType, premiumAmount, createdAt, details of the latest quote
+#   totalCount      N
+#   lastUpdated     S
+# Quotes are written once, so only INSERT and REMOVE records change a summary.
+# A redelivered record must not be counted twice: each count change is a
+# transaction with an applied#<eventID> marker item (expired by TTL after the
+# stream's retention). The latest entry only ever moves to a newer createdAt, so
+# applying it twice is harmless. Quotes copied over by the V3 migration carry
+# migratedFrom and were already counted from the old table.
+import os
+import time
+from datetime import datetime
+
+import awsClients
+import instrumentation
+
+SUMMARY_TABLE = os.environ.get('SUMMARY_TABLE', 'InsuranceQuoteSummaries')
+QUOTE_TABLE = os.environ.get('DYNAMODB_TABLE', 'InsuranceQuoteRequestsV3')
+
+LATEST_PREFIX = 'latest#'
+APPLIED_PREFIX = 'applied#'
+
+# Stream records are retained for 24 hours; keep markers a little longer
+APPLIED_TTL_SECONDS = 2 * 24 * 3600
+
+SUMMARY_FIELDS = ('insuranceType', 'premiumAmount', 'createdAt', 'details')
+
+def is_stored_quote(image):
+    return bool(image) and 'email' in image and 'createdAt' in image and 'insuranceType' in image
+
+def summary_quote(image):
+    return {'M': {field: image[field] for field in SUMMARY_FIELDS if field in image}}
+
+def now_iso():
+    return datetime.utcnow().isoformat()
+
+# Move latest#<type> to this quote unless the summary already holds a newer one
+def update_latest(image):
+    dynamodb = awsClients.get_client('dynamodb')
+    try:
+        dynamodb.update_item(
+            TableName=SUMMARY_TABLE,
+            Key={'email': image['email']},
+            UpdateExpression='SET #latest = :quote, lastUpdated = :now',
+            ConditionExpression='attribute_not_exists(#latest) OR #latest.createdAt < :createdAt',
+            ExpressionAttributeNames={'#latest': LATEST_PREFIX + image['insuranceType']['S']},
+            ExpressionAttributeValues={
+                ':quote': summary_quote(image),
+                ':createdAt': image['createdAt'],
+                ':now': {'S': now_iso()}
+            }
+        )
+    except Exception as e:
+        if not awsClients.is_client_error(e, 'ConditionalCheckFailedException'):
+            raise
+
+# The removed quote was the latest of its type: fall back to the newest remaining one
+def replace_latest(image):
+    insurance_type = image['insuranceType']['S']
+    dynamodb = awsClients.get_client('dynamodb')
+    response = dynamodb.query(
+        TableName=QUOTE_TABLE,
+        KeyConditionExpression='email = :email AND begins_with(quoteKey, :type)',
+        ExpressionAttributeValues={':email': image['email'], ':type': {'S': insurance_type + '#'}},
+        ScanIndexForward=False,
+        Limit=1
+    )
+    values = {':removed': image['createdAt'], ':now': {'S': now_iso()}}
+    if response['Items']:
+        expression = 'SET #latest = :quote, lastUpdated = :now'
+        values[':quote'] = summary_quote(response['Items'][0])
+    else:
+        expression = 'SET lastUpdated = :now REMOVE #latest'
+    try:
+        dynamodb.update_item(
+            TableName=SUMMARY_TABLE,
+            Key={'email': image['email']},
+            UpdateExpression=expression,
+            ConditionExpression='#latest.createdAt = :removed',
+            ExpressionAttributeNames={'#latest': LATEST_PREFIX + insurance_type},
+            ExpressionAttributeValues=values
+        )
+    except Exception as e:
+        if not awsClients.is_client_error(e, 'ConditionalCheckFailedException'):
+            raise
+
+# Add delta to totalCount once per stream record. Returns False if this record
+# was already counted.
+def update_count(record, email, delta):
+    try:
+        awsClients.get_client('dynamodb').transact_write_items(TransactItems=[
+            {'Put': {
+                'TableName': SUMMARY_TABLE,
+                'Item': {
+                    'email': {'S': APPLIED_PREFIX + record['eventID']},
+                    'expiresAt': {'N': str(int(time.time()) + APPLIED_TTL_SECONDS)}
+                },
+                'ConditionExpression': 'attribute_not_exists(email)'
+            }},
+            {'Update': {
+                'TableName': SUMMARY_TABLE,
+                'Key': {'email': email},
+                'UpdateExpression': 'SET lastUpdated = :now ADD totalCount :delta',
+                'ExpressionAttributeValues': {':now': {'S': now_iso()}, ':delta': {'N': str(delta)}}
+            }}
+        ])
+        return True
+    except Exception as e:
+        reasons = getattr(e, 'response', {}).get('CancellationReasons') or []
+        if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+            return False
+        raise
+
+# Returns True if the record changed a summary
+def apply_record(record):
+    change = record['dynamodb']
+    event_name = record['eventName']
+    if event_name == 'INSERT':
+        image = change.get('NewImage')
+        if not is_stored_quote(image) or 'migratedFrom' in image:
+            return False
+        update_latest(image)
+        return update_count(record, image['email'], 1)
+    if event_name == 'REMOVE':
+        image = change.get('OldImage')
+        if not is_stored_quote(image):
+            return False
+        replace_latest(image)
+        return update_count(record, image['email'], -1)
+    return False
+
+@instrumentation.instrumented('quoteSummaryStream')
+def lambda_handler(event, context):
+    applied = 0
+    for record in event['Records']:
+        try:
+            with instrumentation.phase('update'):
+                if apply_record(record):
+                    applied += 1
+        except Exception as e:
+            print(f"❌ Error updating quote summary for {record.get('eventID')}: {e}")
+            # Records after a failure are retried in order from this one
+            return {'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]}
+
+    instrumentation.metric('records', len(event['Records']))
+    instrumentation.metric('applied', applied)
+    return {'batchItemFailures': []}
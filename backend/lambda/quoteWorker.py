@@ -0,0 +1,12 @@
+# Quote worker: the single SQS consumer for the auto, home and life queues.
+# One function subscribed to all three queues shares its warm environments and
+# DynamoDB connection pool across insurance types instead of keeping three of
+# each. Every record is dispatched on its insuranceType to the rater registered
+# in quoteConsumer (see quoteConsumer.register_rater). Batch size and batching
+# window are set per queue on the event sources in template.yaml.
+import instrumentation
+import quoteConsumer
+
+@instrumentation.instrumented('quoteWorker')
+def lambda_handler(event, context):
+    return quoteConsumer.process_batch(event)
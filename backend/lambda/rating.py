@@ -0,0 +1,151 @@
+# Shared premium rating engine used by every quote Lambda.
+# The auto/home/life rules live in one declarative table below. At import each
+# type's rules are compiled into a plain Python function with every rule inlined
+# as one if statement, the same code the hand-written premium functions had, so
+# rate() costs one dict lookup and one call over them. The rules are also
+# compiled into flat (field, default, normalize, test, amount) tuples for
+# features() and canonical_details().
+
+import hashlib
+import json
+
+# Each surcharge is applied when the applicant's field matches:
+#   equals       - lower-cased field equals value
+#   contains     - value appears in the lower-cased field
+#   greater_than - integer field is greater than value
+#   less_than    - integer field is less than value
+RULES = {
+    'auto': {
+        'base': 500,
+        'surcharges': [
+            {'field': 'vehicleType', 'op': 'equals', 'value': 'suv', 'default': '', 'amount': 100},
+            {'field': 'year', 'op': 'less_than', 'value': 2020, 'default': 2020, 'amount': 75},
+            {'field': 'drivingHistory', 'op': 'contains', 'value': 'accident', 'default': '', 'amount': 150}
+        ]
+    },
+    'home': {
+        'base': 400,
+        'surcharges': [
+            {'field': 'squareFootage', 'op': 'greater_than', 'value': 2000, 'default': 0, 'amount': 100},
+            {'field': 'yearBuilt', 'op': 'less_than', 'value': 2000, 'default': 2025, 'amount': 100},
+            {'field': 'securitySystem', 'op': 'equals', 'value': 'no', 'default': '', 'amount': 75}
+        ]
+    },
+    'life': {
+        'base': 300,
+        'surcharges': [
+            {'field': 'age', 'op': 'greater_than', 'value': 50, 'default': 0, 'amount': 100},
+            {'field': 'smoker', 'op': 'equals', 'value': 'yes', 'default': '', 'amount': 150},
+            {'field': 'health', 'op': 'equals', 'value': 'poor', 'default': '', 'amount': 200}
+        ]
+    }
+}
+
+def _compile_surcharge(rule):
+    op = rule['op']
+    value = rule['value']
+
+    if op == 'equals':
+        return str.lower, value.__eq__
+    if op == 'contains':
+        return str.lower, lambda field: value in field
+    if op == 'greater_than':
+        # int(x) > value  <=>  value < int(x)
+        return int, value.__lt__
+    if op == 'less_than':
+        return int, value.__gt__
+    raise ValueError(f"Unknown rating operator: {op}")
+
+# One surcharge rule as a predicate over the raw field value, applied exactly as
+# rate() applies it. Raises ValueError/TypeError for values rate() rejects.
+def surcharge_predicate(rule):
+    normalize, test = _compile_surcharge(rule)
+    return lambda value: test(normalize(value))
+
+def compile_rules(rules):
+    compiled = {}
+    for insurance_type, table in rules.items():
+        surcharges = []
+        for rule in table['surcharges']:
+            normalize, test = _compile_surcharge(rule)
+            surcharges.append((rule['field'], rule['default'], normalize, test, rule['amount']))
+        compiled[insurance_type] = (table['base'], tuple(surcharges))
+    return compiled
+
+# Each operator as an expression over the field's raw value, written the way the
+# original premium functions wrote it
+_OPERATOR_SOURCE = {
+    'equals': '{field}.lower() == {value!r}',
+    'contains': '{value!r} in {field}.lower()',
+    'greater_than': 'int({field}) > {value!r}',
+    'less_than': 'int({field}) < {value!r}',
+}
+
+# One function per insurance type with its rules unrolled. Field names and
+# values are embedded with repr(), so a rule table cannot inject code.
+def compile_raters(rules):
+    raters = {}
+    for insurance_type, table in rules.items():
+        lines = ['def rater(details):', f"    premium = {table['base']!r}"]
+        for rule in table['surcharges']:
+            if rule['op'] not in _OPERATOR_SOURCE:
+                raise ValueError(f"Unknown rating operator: {rule['op']}")
+            field = f"details.get({rule['field']!r}, {rule['default']!r})"
+            lines.append(f"    if {_OPERATOR_SOURCE[rule['op']].format(field=field, value=rule['value'])}:")
+            lines.append(f"        premium += {rule['amount']!r}")
+        lines.append('    return premium')
+        namespace = {}
+        exec(compile('\n'.join(lines), f'<rating {insurance_type}>', 'exec'), namespace)
+        raters[insurance_type] = namespace['rater']
+    return raters
+
+_COMPILED = compile_rules(RULES)
+# insurance type -> rater(details) returning the premium
+RATERS = compile_raters(RULES)
+
+INSURANCE_TYPES = frozenset(_COMPILED)
+
+# Changes whenever the rule table changes; caches of rated premiums key on it
+RULES_VERSION = hashlib.sha256(json.dumps(RULES, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+def rate(insurance_type, details):
+    try:
+        rater = RATERS[insurance_type]
+    except KeyError:
+        raise ValueError(f"Invalid insurance type: {insurance_type}")
+    return rater(details)
+
+# Canonical rating features: one predicate outcome per surcharge. Two applicants
+# with the same features always get the same premium under RULES_VERSION.
+def features(insurance_type, details):
+    try:
+        _, surcharges = _COMPILED[insurance_type]
+    except KeyError:
+        raise ValueError(f"Invalid insurance type: {insurance_type}")
+
+    return tuple(test(normalize(details.get(field, default)))
+                 for field, default, normalize, test, amount in surcharges)
+
+# The rated fields of an applicant as the rules read them, in rule order, with
+# defaults filled in. Unlike features() this keeps the values, so it can key an
+# HTTP cache: applicants with equal canonical details get the same premium.
+def canonical_details(insurance_type, details):
+    try:
+        _, surcharges = _COMPILED[insurance_type]
+    except KeyError:
+        raise ValueError(f"Invalid insurance type: {insurance_type}")
+
+    return tuple((field, str(normalize(details.get(field, default))))
+                 for field, default, normalize, test, amount in surcharges)
+
+# Rate an iterable of (insurance_type, details) pairs, preserving order
+def rate_many(quotes):
+    raters = RATERS
+    premiums = []
+    for insurance_type, details in quotes:
+        try:
+            rater = raters[insurance_type]
+        except KeyError:
+            raise ValueError(f"Invalid insurance type: {insurance_type}")
+        premiums.append(rater(details))
+    return premiums
@@ -2,120 +2,379 @@
 # This function receives a quote request, validates it, and publishes it to an SNS topic.
 # It expects the request body to contain an "insuranceType" field and other relevant details.
 import json
-import boto3
 import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from functools import partial
 
-sns = boto3.client('sns')
-dynamodb = boto3.resource('dynamodb')
+import admission
+import awsClients
+import idempotency
+import instrumentation
+import premiumCache
+import quoteMessage
+import rating
+import warmup
 
 # Get SNS Topic ARN from environment variable
 TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
+TABLE_NAME = os.environ.get('DYNAMODB_TABLE', 'InsuranceQuoteRequestsV3')
 
-def calculate_premium(insurance_type, details):
-    if insurance_type == 'auto':
-        base = 500
-        if details.get('vehicleType', '').lower() == 'suv':
-            base += 100
-        if int(details.get('year', 2020)) < 2020:
-            base += 75
-        if 'accident' in details.get('drivingHistory', '').lower():
-            base += 150
-        return base
-    elif insurance_type == 'home':
-        base = 400
-        if int(details.get('squareFootage', 0)) > 2000:
-            base += 100
-        if int(details.get('yearBuilt', 2025)) < 2000:
-            base += 100
-        if details.get('securitySystem', '').lower() == 'no':
-            base += 75
-        return base
-    elif insurance_type == 'life':
-        base = 300
-        age = int(details.get('age', 0))
-        if age > 50:
-            base += 100
-        if details.get('smoker', '').lower() == 'yes':
-            base += 150
-        if details.get('health', '').lower() == 'poor':
-            base += 200
-        return base
-    return 0
+# Fan-out mode overlaps the duplicate reservation with rating, message
+# serialization and SNS client set-up, and bounds each AWS call with a timeout
+FANOUT_ENABLED = os.environ.get('SUBMIT_FANOUT', 'false').lower() == 'true'
+DEDUPE_TIMEOUT_SECONDS = float(os.environ.get('DEDUPE_TIMEOUT_SECONDS', '0.5'))
+PUBLISH_TIMEOUT_SECONDS = float(os.environ.get('PUBLISH_TIMEOUT_SECONDS', '2'))
 
+# One request may carry several quotes: {"name", "email", "quotes": [{"insuranceType", "details"}, ...]}
+# SNS PublishBatch takes at most 10 entries, which bounds the request to 3 AWS calls
+MAX_QUOTES_PER_REQUEST = 10
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type",
+    "Access-Control-Allow-Methods": "POST, OPTIONS"
+}
+
+_executor = None
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=4)
+    return _executor
+
+# Reserve the key with one conditional write; a duplicate fails the condition.
+# Returns True/False, or None if the reservation itself failed.
+def reserve_quote(composite_key):
+    try:
+        with instrumentation.phase('dedupe'):
+            return idempotency.reserve(awsClients.get_client('dynamodb'), TABLE_NAME, composite_key)
+    except Exception as e:
+        # Fail open: a missed duplicate costs one extra history item
+        print(f"Error reserving quote key: {e}")
+        return None
+
+def release_quote(composite_key):
+    idempotency.release(awsClients.get_client('dynamodb'), TABLE_NAME, composite_key)
+
+# Done-callback for a reservation future whose quote will not be published
+def release_reserved(composite_key, reservation):
+    if reservation.cancelled() or reservation.result() is not True:
+        return
+    try:
+        release_quote(composite_key)
+    except Exception as e:
+        print(f"Error releasing quote key: {e}")
+
+# Calculate premium for immediate response and serialize the SNS message. The
+# quote id and timestamp are fixed here, so redeliveries store the same item.
+def prepare_quote(body, insurance_type):
+    details = body.get('details', {})
+    with instrumentation.phase('rating'):
+        premium = premiumCache.rate(insurance_type, details) if insurance_type in rating.INSURANCE_TYPES else 0
+    return premium, quoteMessage.encode(body, str(uuid.uuid4()), datetime.utcnow().isoformat())
+
+def publish_quote(message, insurance_type):
+    with instrumentation.phase('publish'):
+        awsClients.get_client('sns').publish(
+            TopicArn=TOPIC_ARN,
+            Message=message,
+            MessageAttributes={
+                'insuranceType': {
+                    'DataType': 'String',
+                    'StringValue': insurance_type
+                }
+            }
+        )
+
+def duplicate_message(insurance_type):
+    return f"We have already received your {insurance_type} insurance request and it's being processed. An agent will contact you within 24 hours to provide a customized quote."
+
+def duplicate_response(insurance_type):
+    return {
+        "statusCode": 200,
+        "headers": CORS_HEADERS,
+        "body": json.dumps({
+            "message": duplicate_message(insurance_type),
+            "submitted": False,
+            "insuranceType": insurance_type,
+            "duplicate": True
+        })
+    }
+
+def submitted_response(body, insurance_type, premium):
+    return {
+        "statusCode": 200,
+        "headers": CORS_HEADERS,
+        "body": json.dumps({
+            "message": f"{insurance_type.capitalize()} quote request submitted successfully!",
+            "premiumAmount": premium,
+            "insuranceType": insurance_type,
+            "customerName": body.get('name'),
+            "submitted": True
+        })
+    }
+
+# rate -> reserve -> publish, one after another. Rating goes first so a quote
+# that cannot be rated never holds the key.
+def submit_sequentially(body, insurance_type, composite_key):
+    premium, message = prepare_quote(body, insurance_type)
+
+    reserved = reserve_quote(composite_key)
+    if reserved is False:
+        instrumentation.metric('duplicates')
+        return duplicate_response(insurance_type)
+
+    # Publish to SNS for background processing
+    try:
+        publish_quote(message, insurance_type)
+    except Exception:
+        # Nothing was queued, so let the customer retry without waiting for the lock to expire
+        if reserved:
+            release_quote(composite_key)
+        raise
+    return submitted_response(body, insurance_type, premium)
+
+# The reservation runs on the pool while this thread rates the quote and the SNS
+# client is created; only the publish waits for the reservation's answer. The
+# critical path becomes max(reserve, rate + client) + publish instead of the sum.
+def submit_concurrently(body, insurance_type, composite_key):
+    executor = get_executor()
+    reservation = executor.submit(instrumentation.bind(reserve_quote), composite_key)
+    sns_ready = executor.submit(awsClients.get_client, 'sns')
+
+    try:
+        premium, message = prepare_quote(body, insurance_type)
+    except Exception:
+        # Nothing will be published, so free the key as soon as the reservation lands
+        reservation.add_done_callback(partial(release_reserved, composite_key))
+        raise
+
+    try:
+        reserved = reservation.result(timeout=DEDUPE_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        # Same as a failed reservation: fail open rather than keep the customer
+        # waiting. A reservation still queued behind a busy pool is dropped.
+        print(f"Quote key reservation timed out after {DEDUPE_TIMEOUT_SECONDS}s")
+        instrumentation.metric('dedupeTimeouts')
+        reservation.cancel()
+        reserved = None
+
+    if reserved is False:
+        instrumentation.metric('duplicates')
+        return duplicate_response(insurance_type)
+
+    # Only a head start: publish_quote creates the client itself if this never ran
+    if not sns_ready.cancel():
+        sns_ready.result()
+    publishing = executor.submit(instrumentation.bind(publish_quote), message, insurance_type)
+    try:
+        publishing.result(timeout=PUBLISH_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        # A publish that already started may still land, so keep the reservation;
+        # a retry is then reported as a duplicate instead of queueing the quote
+        # twice. One still queued is dropped, and nothing was sent for it.
+        print(f"SNS publish timed out after {PUBLISH_TIMEOUT_SECONDS}s")
+        instrumentation.metric('publishTimeouts')
+        if publishing.cancel() and reserved:
+            release_reserved(composite_key, reservation)
+        return {
+            "statusCode": 503,
+            "headers": {**CORS_HEADERS, "Retry-After": "1"},
+            "body": json.dumps({"message": "Quote service is busy, please try again"})
+        }
+    except Exception:
+        if reserved:
+            release_quote(composite_key)
+        raise
+    return submitted_response(body, insurance_type, premium)
+
+# Over the email or IP rate limit (see admission.py)
+def throttled_response(retry_after):
+    return {
+        "statusCode": 429,
+        "headers": {**CORS_HEADERS, "Retry-After": str(retry_after)},
+        "body": json.dumps({
+            "message": "Too many quote requests, please try again later",
+            "retryAfter": retry_after
+        })
+    }
+
+def bad_request(message):
+    return {
+        "statusCode": 400,
+        "headers": CORS_HEADERS,
+        "body": json.dumps({"message": message})
+    }
+
+# Publish up to 10 quotes with one PublishBatch call. Returns the indexes that failed.
+def publish_quotes(entries):
+    with instrumentation.phase('publish'):
+        response = awsClients.get_client('sns').publish_batch(
+            TopicArn=TOPIC_ARN,
+            PublishBatchRequestEntries=[{
+                'Id': str(index),
+                'Message': message,
+                'MessageAttributes': {
+                    # Same attribute as single publishes, so the subscription filters still route
+                    'insuranceType': {
+                        'DataType': 'String',
+                        'StringValue': insurance_type
+                    }
+                }
+            } for index, message, insurance_type in entries]
+        )
+    return {int(failure['Id']) for failure in response.get('Failed', [])}
+
+# Submit every quote in the request with a fixed number of AWS calls: one
+# TransactWriteItems to reserve the keys (two when some are taken), one
+# PublishBatch. Each quote is rated before anything is reserved, so a quote that
+# cannot be rated gets its own error result and never holds a lock. The email is
+# the request's: admission control and the duplicate locks are keyed on it, so a
+# quote carrying a different one is rejected rather than published under it.
+# Returns one result per quote, in request order.
+def submit_many(body):
+    quotes = body.get('quotes')
+    if not isinstance(quotes, list) or not quotes:
+        return bad_request("quotes must be a non-empty list")
+    if len(quotes) > MAX_QUOTES_PER_REQUEST:
+        return bad_request(f"At most {MAX_QUOTES_PER_REQUEST} quotes per request")
+
+    # Each quote is published like a single submission: shared fields plus its own
+    shared = {key: value for key, value in body.items() if key != 'quotes'}
+    results = [None] * len(quotes)
+    pending = {}
+    for index, quote in enumerate(quotes):
+        insurance_type = quote.get('insuranceType') if isinstance(quote, dict) else None
+        if not insurance_type or not isinstance(insurance_type, str):
+            results[index] = {"insuranceType": insurance_type, "submitted": False,
+                              "error": "Missing insuranceType"}
+            continue
+        if 'email' in quote and quote['email'] != shared.get('email'):
+            results[index] = {"insuranceType": insurance_type, "submitted": False,
+                              "error": "email must be given once, for the whole request"}
+            continue
+        composite_key = f"{shared.get('email')}#{insurance_type}"
+        if composite_key in pending:
+            # The same type twice in one request
+            results[index] = {"insuranceType": insurance_type, "submitted": False, "duplicate": True,
+                              "message": duplicate_message(insurance_type)}
+            continue
+        try:
+            premium, message = prepare_quote({**shared, **quote}, insurance_type)
+        except Exception as e:
+            print(f"Error rating quote {index}: {e}")
+            results[index] = {"insuranceType": insurance_type, "submitted": False,
+                              "error": "Could not rate quote, please check the details"}
+            continue
+        pending[composite_key] = (index, insurance_type, premium, message)
+
+    reserved = None
+    if pending:
+        try:
+            with instrumentation.phase('dedupe'):
+                reserved = set(idempotency.reserve_many(
+                    awsClients.get_client('dynamodb'), TABLE_NAME, list(pending)))
+        except Exception as e:
+            # Fail open like single submissions
+            print(f"Error reserving quote keys: {e}")
+
+    entries = []
+    premiums = {}
+    for composite_key, (index, insurance_type, premium, message) in pending.items():
+        if reserved is not None and composite_key not in reserved:
+            instrumentation.metric('duplicates')
+            results[index] = {"insuranceType": insurance_type, "submitted": False, "duplicate": True,
+                              "message": duplicate_message(insurance_type)}
+            continue
+        premiums[index] = premium
+        entries.append((index, message, insurance_type))
+
+    failed = set()
+    if entries:
+        try:
+            failed = publish_quotes(entries)
+        except Exception as e:
+            print(f"Error publishing quotes: {e}")
+            failed = {index for index, _, _ in entries}
+
+    dynamodb = awsClients.get_client('dynamodb') if failed and reserved else None
+    for index, _, insurance_type in entries:
+        if index in failed:
+            composite_key = f"{shared.get('email')}#{insurance_type}"
+            if reserved and composite_key in reserved:
+                # Nothing was queued for this quote, so free the key for a retry
+                idempotency.release(dynamodb, TABLE_NAME, composite_key)
+            results[index] = {"insuranceType": insurance_type, "submitted": False,
+                              "error": "Could not submit quote, please try again"}
+        else:
+            results[index] = {"insuranceType": insurance_type, "submitted": True,
+                              "premiumAmount": premiums[index],
+                              "message": f"{insurance_type.capitalize()} quote request submitted successfully!"}
+
+    instrumentation.metric('quotes', len(quotes))
+    return {
+        "statusCode": 200,
+        "headers": CORS_HEADERS,
+        "body": json.dumps({
+            "results": results,
+            "customerName": body.get('name'),
+            "submitted": sum(1 for result in results if result.get('submitted'))
+        })
+    }
+
+# Keep-warm (see warmup.py): both clients and their connections
+def open_dynamodb():
+    awsClients.get_client('dynamodb').get_item(
+        TableName=TABLE_NAME, Key={'email': {'S': warmup.PROBE_KEY}, 'quoteKey': {'S': warmup.PROBE_KEY}})
+
+def open_sns():
+    awsClients.get_client('sns').get_topic_attributes(TopicArn=TOPIC_ARN)
+
+WARMUP_STEPS = (open_dynamodb, open_sns)
+
+@instrumentation.instrumented('submitQuote')
 def lambda_handler(event, context):
+    if warmup.is_warmup_event(event):
+        return warmup.run(WARMUP_STEPS)
     try:
-        body = json.loads(event['body'])
-        print("Message body:", body)
+        with instrumentation.phase('parse'):
+            body = json.loads(event['body'])
+        if instrumentation.DEBUG:
+            print("Message body:", body)
 
         insurance_type = body.get("insuranceType")
-        if not insurance_type:
+        if not insurance_type and 'quotes' not in body:
             return {
                 "statusCode": 400,
                 "body": json.dumps({"message": "Missing insuranceType"})
             }
-        
+
         if not TOPIC_ARN:
             return {
                 "statusCode": 500,
                 "body": json.dumps({"message": "SNS Topic ARN not configured"})
             }
 
-        # Check for existing quote
+        # Before the duplicate check and the publish, so excess submissions cost nothing downstream
+        retry_after = admission.check(event, body)
+        if retry_after is not None:
+            return throttled_response(retry_after)
+
+        if 'quotes' in body:
+            return submit_many(body)
+
         composite_key = f"{body.get('email')}#{insurance_type}"
-        table = dynamodb.Table('InsuranceQuoteRequestsV2')
-        
-        try:
-            existing_item = table.get_item(Key={'compositeKey': composite_key})
-            if 'Item' in existing_item:
-                return {
-                    "statusCode": 200,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "POST, OPTIONS"
-                    },
-                    "body": json.dumps({
-                        "message": f"We have already received your {insurance_type} insurance request and it's being processed. An agent will contact you within 24 hours to provide a customized quote.",
-                        "submitted": False,
-                        "insuranceType": insurance_type,
-                        "duplicate": True
-                    })
-                }
-        except Exception as e:
-            print(f"Error checking for duplicates: {e}")
-        
-        # Calculate premium for immediate response
-        details = body.get('details', {})
-        premium = calculate_premium(insurance_type, details)
-        
-        # Publish to SNS for background processing
-        sns.publish(
-            TopicArn=TOPIC_ARN,
-            Message=json.dumps(body),
-            MessageAttributes={
-                'insuranceType': {
-                    'DataType': 'String',
-                    'StringValue': insurance_type
-                }
-            }
-        )
-        print("Quote request submitted.")
-        
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "POST, OPTIONS"
-            },
-            "body": json.dumps({
-                "message": f"{insurance_type.capitalize()} quote request submitted successfully!",
-                "premiumAmount": premium,
-                "insuranceType": insurance_type,
-                "customerName": body.get('name'),
-                "submitted": True
-            })
-        }
+        if FANOUT_ENABLED:
+            response = submit_concurrently(body, insurance_type, composite_key)
+        else:
+            response = submit_sequentially(body, insurance_type, composite_key)
+
+        if instrumentation.DEBUG:
+            print("Quote request submitted.")
+        return response
 
     except Exception as e:
         print("Error:", str(e))
@@ -123,3 +382,5 @@ def lambda_handler(event, context):
             "statusCode": 500,
             "body": json.dumps({"message": "Internal server error"})
         }
+
+warmup.at_init(WARMUP_STEPS)
@@ -1,10 +1,117 @@
 import json
-import boto3
+import hashlib
+import hmac
 import os
+import threading
+import time
 from datetime import datetime, timedelta
-from botocore.exceptions import ClientError
 
+import awsClients
+import instrumentation
+import warmup
+
+SECRET_NAME = os.environ.get('ACCESS_CODES_SECRET_NAME')
+
+# Access codes are cached per warm container. Within the TTL they are served
+# from memory; after it they are served stale while one background refresh runs,
+# and past MAX_STALE_SECONDS the next request refetches synchronously.
+ACCESS_CODES_TTL_SECONDS = int(os.environ.get('ACCESS_CODES_TTL_SECONDS', '300'))
+MAX_STALE_SECONDS = ACCESS_CODES_TTL_SECONDS * 2
+
+# The cache holds keyed digests of the codes, never the codes. The key is drawn
+# per container, so a digest lookup's timing says nothing about any code.
+_DIGEST_KEY = os.urandom(32)
+
+_cache = {'digests': None, 'fetchedAt': 0.0}
+_refresh_lock = threading.Lock()
+_refresh_thread = None
+
+_stats = {'hits': 0, 'misses': 0, 'fetches': 0, 'fetchErrors': 0, 'lastFetchMs': None}
+
+# Callable(metric_name, value) that receives cache and fetch metrics
+metrics_hook = instrumentation.metric
+
+def set_metrics_hook(hook):
+    global metrics_hook
+    metrics_hook = hook
+
+def cache_stats():
+    return dict(_stats)
+
+def _record(metric, value=1):
+    if metrics_hook:
+        try:
+            metrics_hook(metric, value)
+        except Exception as e:
+            print(f"Metrics hook failed: {e}")
+
+def get_secrets_client():
+    return awsClients.get_client('secretsmanager')
+
+def fetch_access_codes():
+    started = time.perf_counter()
+    try:
+        response = get_secrets_client().get_secret_value(SecretId=SECRET_NAME)
+    except Exception:
+        _stats['fetchErrors'] += 1
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _stats['fetches'] += 1
+        _stats['lastFetchMs'] = elapsed_ms
+        _record('SecretFetchLatencyMs', elapsed_ms)
+
+    codes = (code.strip() for code in response['SecretString'].split(','))
+    _cache['digests'] = frozenset(code_digest(code) for code in codes if code)
+    _cache['fetchedAt'] = time.monotonic()
+    return _cache['digests']
+
+def _background_refresh():
+    try:
+        fetch_access_codes()
+    except Exception as e:
+        # Keep serving the stale codes; the next stale read retries
+        print(f"Background access code refresh failed: {e}")
+
+def _start_background_refresh():
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return
+        _refresh_thread = threading.Thread(target=_background_refresh, daemon=True)
+        _refresh_thread.start()
+
+# The digests of the current access codes (see code_digest)
+def get_access_codes():
+    digests = _cache['digests']
+    age = time.monotonic() - _cache['fetchedAt']
+
+    if digests is None or age >= MAX_STALE_SECONDS:
+        _stats['misses'] += 1
+        _record('AccessCodeCacheMiss')
+        return fetch_access_codes()
+
+    _stats['hits'] += 1
+    _record('AccessCodeCacheHit')
+    if age >= ACCESS_CODES_TTL_SECONDS:
+        _start_background_refresh()
+    return digests
+
+def code_digest(code):
+    return hmac.new(_DIGEST_KEY, code.encode('utf-8'), hashlib.sha256).digest()
+
+# One keyed digest and one set lookup, however many codes are configured
+def is_valid_code(access_code, valid_digests):
+    return code_digest(access_code) in valid_digests
+
+# Keep-warm (see warmup.py): fetching the codes also builds the Secrets Manager
+# client and opens its connection
+WARMUP_STEPS = (get_access_codes,)
+
+@instrumentation.instrumented('validateAccess')
 def lambda_handler(event, context):
+    if warmup.is_warmup_event(event):
+        return warmup.run(WARMUP_STEPS)
     try:
         body_str = event.get('body', '')
         
@@ -19,7 +126,8 @@ def lambda_handler(event, context):
             }
         
         try:
-            body = json.loads(body_str)
+            with instrumentation.phase('parse'):
+                body = json.loads(body_str)
         except json.JSONDecodeError:
             return {
                 'statusCode': 400,
@@ -45,15 +153,13 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'Access code required'})
             }
         
-        secrets_client = boto3.client('secretsmanager')
-        secret_name = os.environ.get('ACCESS_CODES_SECRET_NAME')
-        
-        response = secrets_client.get_secret_value(SecretId=secret_name)
-        access_codes_string = response['SecretString']
-        
-        valid_codes = [code.strip() for code in access_codes_string.split(',')]
+        with instrumentation.phase('accessCodes'):
+            valid_digests = get_access_codes()
         
-        if access_code in valid_codes:
+        with instrumentation.phase('compare'):
+            is_valid = is_valid_code(access_code, valid_digests)
+
+        if is_valid:
             expiry_time = datetime.utcnow() + timedelta(minutes=5)
             
             return {
@@ -81,21 +187,16 @@ def lambda_handler(event, context):
                 })
             }
             
-    except ClientError:
+    except Exception as e:
+        # Secrets Manager errors mean the access codes secret is missing or unreadable
+        error = 'Access codes not configured' if awsClients.is_client_error(e) else 'Internal server error'
         return {
             'statusCode': 500,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({'error': 'Access codes not configured'})
+            'body': json.dumps({'error': error})
         }
-    except Exception:
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Internal server error'})
-        }
\ No newline at end of file
+
+warmup.at_init(WARMUP_STEPS)
@@ -0,0 +1,43 @@
+# Keep-warm support for the interactive handlers (submitQuote, validateAccess,
+# getUserQuotes). A warm-up runs a handler's WARMUP_STEPS: building its AWS
+# clients, opening their connections with one cheap call each and loading cached
+# config or secrets. No business logic runs and nothing is written.
+#
+# Warm-ups happen in two ways, chosen per function in template.yaml:
+# - a scheduled EventBridge rule invokes the handler with {"warmup": true};
+# - environments initialised for provisioned concurrency run the steps during
+#   init, before their first request arrives.
+import os
+import time
+
+EVENT_KEY = 'warmup'
+
+# GetItem on this key opens a DynamoDB connection; no item ever has it
+PROBE_KEY = 'warmup#probe'
+
+# Lambda sets this for provisioned-concurrency environments
+PROVISIONED = os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE') == 'provisioned-concurrency'
+
+def is_warmup_event(event):
+    return isinstance(event, dict) and event.get(EVENT_KEY) is True
+
+# Run the steps in order. A failing step is logged and skipped: a warm-up must
+# never break a container that could otherwise serve requests.
+def run(steps):
+    started = time.perf_counter()
+    failed = []
+    for step in steps:
+        try:
+            step()
+        except Exception as e:
+            print(f"Warm-up step {step.__name__} failed: {e}")
+            failed.append(step.__name__)
+    return {
+        'warmup': True,
+        'elapsedMs': round((time.perf_counter() - started) * 1000, 1),
+        'failed': failed
+    }
+
+def at_init(steps):
+    if PROVISIONED:
+        print(f"Provisioned-concurrency warm-up: {run(steps)}")
@@ -101,6 +101,7 @@ function redirectToQuotes() {
 function logout() {
     localStorage.removeItem('accessToken');
     localStorage.removeItem('idToken');
+    sessionStorage.removeItem('quotesCache');
     
     // Show confirmation and redirect
     alert('You have been logged out successfully.');
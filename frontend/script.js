@@ -282,6 +282,79 @@ if (form) {
 }
 
 // Instant quote calculation
+// Estimates use GET with a canonical query string (sorted fields, trimmed and
+// lower-cased values), so the browser's HTTP cache and any CDN in front of the
+// API can answer repeats. Within the page, results are memoized per query, so
+// asking again for a form the user has already priced does not call the API.
+const premiumMemo = new Map();
+
+// Read the insurance-specific fields of the form
+function collectQuoteDetails(type) {
+  const fieldLabels = {
+    auto: { vehicleType: "Vehicle Type", make: "Make", model: "Model", year: "Year", drivingHistory: "Driving History" },
+    life: { age: "Age", gender: "Gender", smoker: "Smoker Status", health: "Health Status", coverage: "Coverage Amount" },
+    home: { homeType: "Home Type", yearBuilt: "Year Built", constructionType: "Construction Type", squareFootage: "Square Footage", securitySystem: "Security System" }
+  };
+  const details = {};
+  const missingFields = [];
+
+  Object.entries(fieldLabels[type] || {}).forEach(([field, label]) => {
+    const input = document.getElementById(field);
+    if (!input?.value) {
+      missingFields.push(label);
+    } else {
+      details[field] = input.value;
+    }
+  });
+  return { details, missingFields };
+}
+
+function premiumQuery(type, details) {
+  const params = new URLSearchParams();
+  params.append("insuranceType", type);
+  Object.keys(details).sort().forEach(field => {
+    params.append(field, String(details[field]).trim().toLowerCase());
+  });
+  return params.toString();
+}
+
+function fetchPremium(type, details) {
+  const query = premiumQuery(type, details);
+  if (!premiumMemo.has(query)) {
+    const API_ENDPOINT = window.API_ENDPOINT || "https://1m8x9psbi2.execute-api.us-east-1.amazonaws.com";
+    const request = fetch(`${API_ENDPOINT}/calculatePremium?${query}`)
+      .then(response => {
+        // Only remember answers the server would give again
+        if (!response.ok) premiumMemo.delete(query);
+        return response.json();
+      })
+      .catch(err => {
+        premiumMemo.delete(query);
+        throw err;
+      });
+    premiumMemo.set(query, request);
+  }
+  return premiumMemo.get(query);
+}
+
+function showInstantQuote(result) {
+  if (result.premiumAmount) {
+    responseBox.innerHTML = `
+      <div style="background: #e3f2fd; padding: 15px; border-radius: 8px; border-left: 4px solid #2196f3;">
+        <h3 style="margin: 0 0 10px 0; color: #1565c0;">📊 Instant Quote Estimate</h3>
+        <p style="margin: 5px 0; font-size: 1.2em;"><strong>Estimated Premium:</strong> <span style="color: #1976d2; font-weight: bold;">$${result.premiumAmount}</span></p>
+        <p style="margin: 10px 0 0 0; font-size: 0.9em; color: #666;">This is an instant estimate. Submit your request for a detailed quote and processing.</p>
+      </div>
+    `;
+  } else {
+    responseBox.innerHTML = `
+      <div style="background: #ffebee; padding: 15px; border-radius: 8px; border-left: 4px solid #f44336;">
+        <p style="margin: 0; color: #c62828;">Unable to calculate premium. Please check your information.</p>
+      </div>
+    `;
+  }
+}
+
 if (getQuoteBtn) {
   getQuoteBtn.addEventListener("click", async function() {
     const type = typeSelect.value;
@@ -308,76 +381,7 @@ if (getQuoteBtn) {
     }
 
     // Validate insurance-specific fields
-    let missingFields = [];
-    let details = {};
-    
-    if (type === "auto") {
-      const vehicleType = document.getElementById("vehicleType");
-      const make = document.getElementById("make");
-      const model = document.getElementById("model");
-      const year = document.getElementById("year");
-      const drivingHistory = document.getElementById("drivingHistory");
-      
-      if (!vehicleType?.value) missingFields.push("Vehicle Type");
-      if (!make?.value) missingFields.push("Make");
-      if (!model?.value) missingFields.push("Model");
-      if (!year?.value) missingFields.push("Year");
-      if (!drivingHistory?.value) missingFields.push("Driving History");
-      
-      if (missingFields.length === 0) {
-        details = {
-          vehicleType: vehicleType.value,
-          make: make.value,
-          model: model.value,
-          year: year.value,
-          drivingHistory: drivingHistory.value
-        };
-      }
-    } else if (type === "life") {
-      const age = document.getElementById("age");
-      const gender = document.getElementById("gender");
-      const smoker = document.getElementById("smoker");
-      const health = document.getElementById("health");
-      const coverage = document.getElementById("coverage");
-      
-      if (!age?.value) missingFields.push("Age");
-      if (!gender?.value) missingFields.push("Gender");
-      if (!smoker?.value) missingFields.push("Smoker Status");
-      if (!health?.value) missingFields.push("Health Status");
-      if (!coverage?.value) missingFields.push("Coverage Amount");
-      
-      if (missingFields.length === 0) {
-        details = {
-          age: age.value,
-          gender: gender.value,
-          smoker: smoker.value,
-          health: health.value,
-          coverage: coverage.value
-        };
-      }
-    } else if (type === "home") {
-      const homeType = document.getElementById("homeType");
-      const yearBuilt = document.getElementById("yearBuilt");
-      const constructionType = document.getElementById("constructionType");
-      const squareFootage = document.getElementById("squareFootage");
-      const securitySystem = document.getElementById("securitySystem");
-      
-      if (!homeType?.value) missingFields.push("Home Type");
-      if (!yearBuilt?.value) missingFields.push("Year Built");
-      if (!constructionType?.value) missingFields.push("Construction Type");
-      if (!squareFootage?.value) missingFields.push("Square Footage");
-      if (!securitySystem?.value) missingFields.push("Security System");
-      
-      if (missingFields.length === 0) {
-        details = {
-          homeType: homeType.value,
-          yearBuilt: yearBuilt.value,
-          constructionType: constructionType.value,
-          squareFootage: squareFootage.value,
-          securitySystem: securitySystem.value
-        };
-      }
-    }
+    const { details, missingFields } = collectQuoteDetails(type);
 
     if (missingFields.length > 0) {
       responseBox.innerHTML = `
@@ -391,42 +395,8 @@ if (getQuoteBtn) {
     getQuoteBtn.disabled = true;
     getQuoteBtn.textContent = "Calculating...";
 
-    const baseData = {
-      name: name,
-      email: email,
-      insuranceType: type
-    };
-
-    const fullData = { ...baseData, details };
-
     try {
-      const API_ENDPOINT = window.API_ENDPOINT || "https://1m8x9psbi2.execute-api.us-east-1.amazonaws.com";
-      
-      const response = await fetch(`${API_ENDPOINT}/calculatePremium`, {
-        method: "POST",
-        headers: { 
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify(fullData),
-      });
-
-      const result = await response.json();
-
-      if (result.premiumAmount) {
-        responseBox.innerHTML = `
-          <div style="background: #e3f2fd; padding: 15px; border-radius: 8px; border-left: 4px solid #2196f3;">
-            <h3 style="margin: 0 0 10px 0; color: #1565c0;">📊 Instant Quote Estimate</h3>
-            <p style="margin: 5px 0; font-size: 1.2em;"><strong>Estimated Premium:</strong> <span style="color: #1976d2; font-weight: bold;">$${result.premiumAmount}</span></p>
-            <p style="margin: 10px 0 0 0; font-size: 0.9em; color: #666;">This is an instant estimate. Submit your request for a detailed quote and processing.</p>
-          </div>
-        `;
-      } else {
-        responseBox.innerHTML = `
-          <div style="background: #ffebee; padding: 15px; border-radius: 8px; border-left: 4px solid #f44336;">
-            <p style="margin: 0; color: #c62828;">Unable to calculate premium. Please check your information.</p>
-          </div>
-        `;
-      }
+      showInstantQuote(await fetchPremium(type, details));
     } catch (err) {
       console.error(err);
       responseBox.innerHTML = `
@@ -0,0 +1,160 @@
+"""Check that validateAccess fetches the access codes at most once per TTL window.
+
+validateAccess.get_secrets_client is replaced by a stub that serves the codes
+after --fetch-ms, counts each get_secret_value call and can fail or rotate the
+codes on demand. --invocations requests (mostly valid codes, some invalid) are
+spread evenly over --seconds with ACCESS_CODES_TTL_SECONDS set to --ttl. The
+script then checks:
+- every request got the right answer (200 or 401);
+- consecutive fetches started at least one TTL apart, so there was at most
+  one fetch per TTL window, including the stale-while-revalidate refreshes;
+- cache hits plus misses equal the invocations, as reported by both
+  cache_stats() and the metrics hook;
+- a rotated code is accepted within two TTLs, and a failing refresh keeps the
+  stale codes in service;
+- checking a code costs the same against 1 configured code as against
+  --many-codes: one keyed digest and one set lookup.
+The script exits non-zero if any check fails.
+
+Usage:
+    python scripts/access_code_cache_check.py --invocations 10000 --seconds 11 --ttl 1
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+VALID_CODES = ('alpha-7', 'bravo-3', 'charlie-9')
+
+class StubSecrets:
+    def __init__(self, fetch_ms):
+        self.fetch_ms = fetch_ms
+        self.codes = ','.join(VALID_CODES)
+        self.fail = False
+        self.fetches = []
+        self.lock = threading.Lock()
+
+    def get_secret_value(self, SecretId):
+        with self.lock:
+            self.fetches.append(time.monotonic())
+        time.sleep(self.fetch_ms / 1000)
+        if self.fail:
+            from botocore.exceptions import ClientError
+
+            raise ClientError({'Error': {'Code': 'InternalServiceError', 'Message': 'injected'}},
+                              'GetSecretValue')
+        return {'SecretString': self.codes}
+
+def invoke(validateAccess, code):
+    response = validateAccess.lambda_handler({'body': json.dumps({'accessCode': code})}, None)
+    return response['statusCode']
+
+def run_checks(args, validateAccess):
+    stub = StubSecrets(args.fetch_ms)
+    validateAccess.get_secrets_client = lambda: stub
+    hook_counts = {}
+    validateAccess.set_metrics_hook(lambda name, value=1: hook_counts.__setitem__(name, hook_counts.get(name, 0) + 1))
+    results = []
+
+    def check(name, condition, detail):
+        results.append((name, bool(condition), detail))
+
+    wrong = 0
+    interval = args.seconds / args.invocations
+    started = time.monotonic()
+    for n in range(args.invocations):
+        delay = started + n * interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        valid = n % 10 != 0
+        code = VALID_CODES[n % len(VALID_CODES)] if valid else f'wrong-{n}'
+        if invoke(validateAccess, code) != (200 if valid else 401):
+            wrong += 1
+    elapsed = time.monotonic() - started
+    # Let a refresh started by the last requests finish
+    time.sleep(args.fetch_ms / 1000 * 2)
+
+    fetches = list(stub.fetches)
+    gaps = [later - earlier for earlier, later in zip(fetches, fetches[1:])]
+    windows = int(elapsed // args.ttl) + 1
+    check('answers', wrong == 0, f"{wrong} of {args.invocations} wrong")
+    check('one fetch per TTL window', len(fetches) <= windows and all(gap >= args.ttl * 0.99 for gap in gaps),
+          f"{len(fetches)} fetches over {elapsed:.1f}s ({windows} windows), "
+          f"closest {min(gaps, default=0):.3f}s apart")
+    stats = validateAccess.cache_stats()
+    check('hit/miss accounting',
+          stats['hits'] + stats['misses'] == args.invocations
+          and hook_counts.get('AccessCodeCacheHit', 0) == stats['hits']
+          and hook_counts.get('AccessCodeCacheMiss', 0) == stats['misses']
+          and hook_counts.get('SecretFetchLatencyMs', 0) == stats['fetches'],
+          f"{stats['hits']} hits, {stats['misses']} misses, {stats['fetches']} fetches; hook {hook_counts}")
+
+    # Rotation: the new code must be accepted within two TTLs
+    stub.codes = 'delta-1'
+    deadline = time.monotonic() + args.ttl * 2 + args.fetch_ms / 1000 * 2
+    accepted_after = None
+    rotated = time.monotonic()
+    while time.monotonic() < deadline:
+        if invoke(validateAccess, 'delta-1') == 200:
+            accepted_after = time.monotonic() - rotated
+            break
+        time.sleep(args.ttl / 20)
+    check('rotation', accepted_after is not None,
+          f"accepted after {accepted_after:.2f}s" if accepted_after is not None else "not accepted within 2 TTLs")
+
+    # A failing refresh keeps the stale codes until MAX_STALE_SECONDS
+    stub.fail = True
+    time.sleep(args.ttl * 1.1)
+    status = invoke(validateAccess, 'delta-1')
+    time.sleep(args.fetch_ms / 1000 * 2)
+    status_after = invoke(validateAccess, 'delta-1')
+    check('stale codes on refresh failure', status == 200 and status_after == 200,
+          f"statuses {status}, {status_after}")
+
+    timings = {}
+    for count in (1, args.many_codes):
+        digests = frozenset(validateAccess.code_digest(f'code-{n}') for n in range(count))
+        started = time.perf_counter()
+        for n in range(20_000):
+            validateAccess.is_valid_code(f'code-{n % (count * 2)}', digests)
+        timings[count] = (time.perf_counter() - started) / 20_000 * 1e6
+    check('comparison cost independent of code count', timings[args.many_codes] < timings[1] * 2,
+          f"{timings[1]:.2f}µs with 1 code, {timings[args.many_codes]:.2f}µs with {args.many_codes}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--invocations', type=int, default=10_000)
+    parser.add_argument('--seconds', type=float, default=11, help='time to spread the invocations over')
+    parser.add_argument('--ttl', type=int, default=1, help='ACCESS_CODES_TTL_SECONDS for the run')
+    parser.add_argument('--fetch-ms', type=float, default=20, help='latency of each secret fetch')
+    parser.add_argument('--many-codes', type=int, default=10_000, help='configured codes for the comparison cost check')
+    args = parser.parse_args()
+
+    os.environ['ACCESS_CODES_TTL_SECONDS'] = str(args.ttl)
+    os.environ.setdefault('ACCESS_CODES_SECRET_NAME', 'access-codes-check')
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+    import validateAccess
+
+    # The handler logs failed refreshes
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as quiet:
+        sys.stdout = quiet
+        try:
+            results = run_checks(args, validateAccess)
+        finally:
+            sys.stdout = stdout
+
+    for name, passed, detail in results:
+        print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    failed = [name for name, passed, _ in results if not passed]
+    if failed:
+        sys.exit(f"{len(failed)} check(s) failed: {', '.join(failed)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""Downstream AWS calls from submitQuote under a 10x burst, with and without admission control.
+
+--clients submitters each have their own email and client IP. They send
+--base-rate submissions per second in total for --phase-seconds. Then they
+send --burst-factor times that for --phase-seconds (the burst), and the base
+rate again for --phase-seconds (recovery). Each request goes to a random one
+of --containers simulated warm containers, as Lambda would route it, and each container has its own local
+token buckets (admission.py).
+
+The same traffic runs three times against moto stand-ins for the topic,
+queues and quote table (scripts/loadtest.py's stack):
+- off: no admission control;
+- local: the per-container token buckets only;
+- shared: the local buckets plus the DynamoDB counter tier, as deployed.
+
+For each phase the report covers:
+- offered and admitted submissions;
+- 429s, by the tier that returned them;
+- downstream calls: duplicate-check writes, SNS publishes, and the admission
+  tier's own counter transactions;
+- downstream calls per second of the phase's real elapsed time, from its first
+  send to its last response or its scheduled end, whichever is later (moto
+  may fall behind the schedule during the burst);
+- the most submissions any email got through in one rate-limit window.
+Each moto transaction copies the tables, so with the shared tier moto serves
+roughly 10 submissions per second. A faster schedule falls behind: the
+offered rate drops and the limits no longer see a burst. The report gives
+the offered rate each phase achieved; keep the burst within what moto can
+offer. With the shared tier the last figure can never exceed --email-limit. The
+script exits non-zero if it does, whatever the burst size.
+
+It then checks that a key that turns a request away spends none of the
+other key's tokens. The checks run with the local tier only and with both
+tiers. First other emails use up one IP's limit. Then an email is sent
+--email-limit times from that IP and must be turned away every time. It then
+gets all --email-limit submissions through from another IP. With both tiers,
+each step runs in a fresh container, so only the shared counters carry over.
+The script exits non-zero if either check fails.
+
+Requires moto (pip install "moto[sns,sqs,dynamodb]").
+
+Usage:
+    python scripts/admission_burst.py --clients 4 --base-rate 1 --burst-factor 10 --containers 4
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import loadtest  # noqa: E402
+
+MODES = ('off', 'local', 'shared')
+PHASES = ('baseline', 'burst', 'recovery')
+
+def schedule(args):
+    """(phase, seconds after start, client) for every submission, in send order."""
+    sends = []
+    offset = 0.0
+    for phase in PHASES:
+        rate = args.base_rate * (args.burst_factor if phase == 'burst' else 1)
+        count = int(rate * args.phase_seconds)
+        sends.extend((phase, offset + n / rate, n % args.clients) for n in range(count))
+        offset += args.phase_seconds
+    return sends
+
+def empty_phase():
+    return {'offered': 0, 'admitted': 0, 'throttledLocal': 0, 'throttledShared': 0, 'dedupeWrites': 0,
+            'publishes': 0, 'counterUpdates': 0, 'downstreamCalls': 0, 'seconds': 0.0, 'offeredPerSecond': 0.0,
+            'downstreamPerSecond': 0.0}
+
+def run_mode(mode, args, submitQuote, admission, stats):
+    admission.ENABLED = mode != 'off'
+    admission.SHARED_TIER_ENABLED = mode == 'shared'
+    containers = [OrderedDict() for _ in range(args.containers)]
+    rng = random.Random(args.seed)
+    routing = random.Random(args.seed + 1)
+    types = list(loadtest.DETAIL_CHOICES)
+
+    phases = {phase: empty_phase() for phase in PHASES}
+    first_sent = {}
+    last_done = {}
+    admitted_per_window = {}
+    started = time.perf_counter()
+    for phase, due, client in schedule(args):
+        # Open loop, as in loadtest.py
+        delay = started + due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        # Each mode gets its own submitters, so counters and locks from an earlier mode do not carry over
+        body = loadtest.make_request(client, rng.choice(types), 0, rng)
+        body['email'] = f'client{client}@{mode}.burst.local'
+        event = {'body': json.dumps(body), 'requestContext': {'http': {'sourceIp': f'10.{MODES.index(mode)}.0.{client}'}}}
+
+        admission._buckets = routing.choice(containers)
+        calls = dict(stats['calls'])
+        window = int(time.time()) // admission.WINDOW_SECONDS
+        first_sent.setdefault(phase, time.perf_counter())
+        response = submitQuote.lambda_handler(event, None)
+        last_done[phase] = time.perf_counter()
+        made = {name: count - calls.get(name, 0) for name, count in stats['calls'].items()}
+
+        counts = phases[phase]
+        counts['offered'] += 1
+        counts['dedupeWrites'] += made.get('dynamodb.put_item', 0)
+        counts['publishes'] += made.get('sns.publish', 0)
+        counts['counterUpdates'] += made.get('dynamodb.transact_write_items', 0)
+        if response['statusCode'] == 429:
+            counts['throttledShared' if made.get('dynamodb.transact_write_items') else 'throttledLocal'] += 1
+        else:
+            counts['admitted'] += 1
+            key = (body['email'], window)
+            admitted_per_window[key] = admitted_per_window.get(key, 0) + 1
+    elapsed = time.perf_counter() - started
+
+    for n, (phase, counts) in enumerate(phases.items()):
+        if phase not in first_sent:
+            continue
+        scheduled_end = started + (n + 1) * args.phase_seconds
+        counts['seconds'] = round(max(scheduled_end, last_done[phase]) - first_sent[phase], 2)
+        counts['downstreamCalls'] = counts['dedupeWrites'] + counts['publishes'] + counts['counterUpdates']
+        counts['offeredPerSecond'] = round(counts['offered'] / counts['seconds'], 1)
+        counts['downstreamPerSecond'] = round(counts['downstreamCalls'] / counts['seconds'], 1)
+    return {
+        'phases': phases,
+        'maxAdmittedPerEmailWindow': max(admitted_per_window.values(), default=0),
+        'elapsedSeconds': round(elapsed, 1),
+    }
+
+def key_order_checks(args, admission):
+    """(name, passed, detail) per tier setup: an IP over its limit must not spend the email's tokens."""
+    results = []
+    window = admission.WINDOW_SECONDS
+    # No window boundary in the middle of a check
+    admission.WINDOW_SECONDS = 3600
+    admission.ENABLED = True
+    try:
+        for mode in ('local', 'shared'):
+            admission.SHARED_TIER_ENABLED = mode == 'shared'
+
+            def request(email, ip):
+                return admission.check({'requestContext': {'http': {'sourceIp': ip}}}, {'email': email})
+
+            shared_ip, other_ip = f'10.9.{MODES.index(mode)}.1', f'10.8.{MODES.index(mode)}.1'
+            admission._buckets = OrderedDict()
+            for n in range(args.ip_limit):
+                request(f'neighbour{n}@{mode}.order.local', shared_ip)
+            email = f'blocked@{mode}.order.local'
+            if mode == 'shared':
+                admission._buckets = OrderedDict()
+            turned_away = sum(request(email, shared_ip) is not None for _ in range(args.email_limit))
+            if mode == 'shared':
+                admission._buckets = OrderedDict()
+            admitted = sum(request(email, other_ip) is None for _ in range(args.email_limit))
+            results.append((f'{mode}: IP rejection spends no email tokens',
+                            turned_away == args.email_limit and admitted == args.email_limit,
+                            f"{turned_away}/{args.email_limit} turned away on the full IP, then "
+                            f"{admitted}/{args.email_limit} admitted from another IP"))
+    finally:
+        admission.WINDOW_SECONDS = window
+    return results
+
+def run(args):
+    region = 'us-east-1'
+    os.environ.setdefault('AWS_DEFAULT_REGION', region)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+    os.environ['RATE_LIMIT_WINDOW_SECONDS'] = str(args.window)
+    os.environ['RATE_LIMIT_PER_EMAIL'] = str(args.email_limit)
+    os.environ['RATE_LIMIT_PER_IP'] = str(args.ip_limit)
+    # A client resubmitting a type is not a duplicate after a second, so the
+    # duplicate check does not hide the burst from the downstream calls
+    os.environ['DUPLICATE_WINDOW_SECONDS'] = '1'
+
+    from moto import mock_aws
+
+    with mock_aws():
+        topic_arn, _, _ = loadtest.setup_stack(region)
+        os.environ['SNS_TOPIC_ARN'] = topic_arn
+
+        import admission
+        import awsClients
+        import submitQuote
+
+        submitQuote.TOPIC_ARN = topic_arn
+        stats = {'lock': threading.Lock(), 'calls': {}, 'writeUnits': 0}
+        for service_name in ('dynamodb', 'sns'):
+            awsClients._clients[service_name] = loadtest.CountingClient(
+                awsClients.get_client(service_name), service_name, stats)
+
+        results = {mode: run_mode(mode, args, submitQuote, admission, stats) for mode in args.modes.split(',')}
+        return results, key_order_checks(args, admission)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--base-rate', type=float, default=1, help='submissions per second outside the burst')
+    parser.add_argument('--burst-factor', type=float, default=10)
+    parser.add_argument('--phase-seconds', type=float, default=10)
+    parser.add_argument('--containers', type=int, default=4, help='warm submitQuote containers')
+    parser.add_argument('--window', type=int, default=5, help='rate-limit window in seconds')
+    parser.add_argument('--email-limit', type=int, default=5, help='submissions per email per window')
+    parser.add_argument('--ip-limit', type=int, default=30, help='submissions per IP per window')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as quiet:
+        sys.stdout = quiet
+        try:
+            results, checks = run(args)
+        finally:
+            sys.stdout = stdout
+
+    for mode, result in results.items():
+        print(f"{mode} (max {result['maxAdmittedPerEmailWindow']} per email per {args.window}s window, "
+              f"{result['elapsedSeconds']}s)")
+        for phase, counts in result['phases'].items():
+            print(f"  {phase:<9} offered {counts['offered']:>5} ({counts['offeredPerSecond']:>5}/s)  admitted {counts['admitted']:>5}  "
+                  f"429 local {counts['throttledLocal']:>5} shared {counts['throttledShared']:>5}  "
+                  f"publishes {counts['publishes']:>5}  dedupe {counts['dedupeWrites']:>5}  "
+                  f"counters {counts['counterUpdates']:>5}  downstream {counts['downstreamCalls']:>5} "
+                  f"in {counts['seconds']:>5.1f}s = {counts['downstreamPerSecond']:>6}/s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+    for name, passed, detail in checks:
+        print(f"{'✅' if passed else '❌'} {name}: {detail}")
+
+    shared = results.get('shared')
+    if shared and shared['maxAdmittedPerEmailWindow'] > args.email_limit:
+        sys.exit(f"An email got {shared['maxAdmittedPerEmailWindow']} submissions through one window "
+                 f"(limit {args.email_limit})")
+    failed = [name for name, passed, _ in checks if not passed]
+    if failed:
+        sys.exit(f"{len(failed)} check(s) failed: {', '.join(failed)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""Parallel-scan speedup of scripts/quote_analytics.py on a synthetic quote table.
+
+Fills a local table that has the V3 key schema with --items synthetic quotes.
+Quotes are spread over --users users, the three insurance types and a year of
+dates, and each is rated with rating.rate. The benchmark then scans the whole
+table with every --segments count (one worker process per segment) and
+reports items per second and the speedup over one segment. Every run must
+produce the same reports; the benchmark fails if one does not.
+
+Point it at DynamoDB Local (docker run -p 8000:8000 amazon/dynamodb-local)
+with --endpoint-url. Without one it starts a moto server (pip install
+"moto[server]"), which serves every request from one Python process, so its
+speedup flattens well before the client side does. The speedup can only be
+near-linear while the client machine has a core per worker and the endpoint
+keeps up.
+
+Usage:
+    python scripts/analytics_scan_benchmark.py --endpoint-url http://localhost:8000 \\
+        --items 1000000 --segments 1,2,4,8,16 --output analytics_scan.json
+    python scripts/analytics_scan_benchmark.py --items 50000 --segments 1,2,4
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import awsClients  # noqa: E402
+import quoteConsumer  # noqa: E402
+import quote_analytics  # noqa: E402
+import rating  # noqa: E402
+
+TABLE_NAME = 'AnalyticsBenchmarkQuotes'
+BATCH_SIZE = 25
+
+def start_moto_server():
+    import logging
+
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return server, f'http://{host}:{port}'
+
+def synthetic_details(rng, insurance_type):
+    if insurance_type == 'auto':
+        return {'vehicleType': rng.choice(('sedan', 'suv', 'truck')), 'year': str(rng.randint(2005, 2025)),
+                'drivingHistory': rng.choice(('clean', 'clean', 'one accident', 'speeding ticket'))}
+    if insurance_type == 'home':
+        return {'squareFootage': str(rng.randint(800, 4500)), 'yearBuilt': str(rng.randint(1950, 2024)),
+                'securitySystem': rng.choice(('yes', 'no'))}
+    return {'age': str(rng.randint(18, 80)), 'smoker': rng.choice(('no', 'no', 'no', 'yes')),
+            'health': rng.choice(('excellent', 'good', 'fair', 'poor'))}
+
+def synthetic_quotes(start, count, users, seed):
+    rng = random.Random(seed + start)
+    first_day = datetime(2025, 1, 1)
+    types = sorted(rating.INSURANCE_TYPES)
+    for number in range(start, start + count):
+        insurance_type = rng.choice(types)
+        details = synthetic_details(rng, insurance_type)
+        created_at = (first_day + timedelta(seconds=rng.randrange(365 * 86400))).isoformat()
+        quote_id = f'bench-{number}'
+        yield awsClients.to_item({
+            'email': f'user{number % users}@example.com',
+            'quoteKey': quoteConsumer.quote_key(insurance_type, created_at, quote_id),
+            'quoteId': quote_id,
+            'name': 'Benchmark Customer',
+            'insuranceType': insurance_type,
+            'details': details,
+            'premiumAmount': rating.rate(insurance_type, details),
+            'createdAt': created_at,
+        })
+
+def create_table(dynamodb):
+    try:
+        dynamodb.create_table(
+            TableName=TABLE_NAME, BillingMode='PAY_PER_REQUEST',
+            AttributeDefinitions=[{'AttributeName': 'email', 'AttributeType': 'S'},
+                                  {'AttributeName': 'quoteKey', 'AttributeType': 'S'}],
+            KeySchema=[{'AttributeName': 'email', 'KeyType': 'HASH'},
+                       {'AttributeName': 'quoteKey', 'KeyType': 'RANGE'}])
+    except Exception as e:
+        if not awsClients.is_client_error(e, 'ResourceInUseException'):
+            raise
+
+def load_chunk(dynamodb, start, count, users, seed):
+    items = list(synthetic_quotes(start, count, users, seed))
+    for offset in range(0, len(items), BATCH_SIZE):
+        request = {TABLE_NAME: [{'PutRequest': {'Item': item}} for item in items[offset:offset + BATCH_SIZE]]}
+        while request:
+            request = dynamodb.batch_write_item(RequestItems=request).get('UnprocessedItems')
+
+def load_table(items, users, seed, threads):
+    dynamodb = awsClients.get_client('dynamodb')
+    create_table(dynamodb)
+    chunk = 5000
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(load_chunk, dynamodb, start, min(chunk, items - start), users, seed)
+                       for start in range(0, items, chunk)]:
+            future.result()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--endpoint-url', help='DynamoDB endpoint; starts a moto server when omitted')
+    parser.add_argument('--items', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--segments', default='1,2,4,8,16', help='comma-separated segment counts')
+    parser.add_argument('--skip-load', action='store_true', help='reuse an already loaded table')
+    parser.add_argument('--load-threads', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    server = None
+    endpoint = args.endpoint_url
+    if endpoint is None:
+        server, endpoint = start_moto_server()
+    # Inherited by the scan workers, which build their own clients
+    os.environ['AWS_ENDPOINT_URL'] = endpoint
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'bench')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'bench')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    # Local endpoints can take far longer than DynamoDB to return a 1 MB page
+    os.environ.setdefault('AWS_READ_TIMEOUT_SECONDS', '120')
+
+    try:
+        if not args.skip_load:
+            started = time.perf_counter()
+            load_table(args.items, args.users, args.seed, args.load_threads)
+            print(f"Loaded {args.items} quotes in {time.perf_counter() - started:.1f}s")
+
+        results = []
+        baseline = None
+        expected = None
+        for segments in [int(value) for value in args.segments.split(',')]:
+            columns, stats, elapsed = quote_analytics.scan_table(TABLE_NAME, segments, segments)
+            reports = quote_analytics.build_reports(columns, 50)
+            if expected is None:
+                expected = reports
+            elif reports != expected:
+                sys.exit(f"{segments} segments produced different reports than {results[0]['segments']}")
+            baseline = baseline or elapsed
+            result = {
+                'segments': segments,
+                'items': stats['scanned'],
+                'pages': stats['pages'],
+                'seconds': round(elapsed, 2),
+                'itemsPerSecond': round(stats['scanned'] / elapsed),
+                'speedup': round(baseline / elapsed, 2),
+                'efficiency': round(baseline / elapsed / segments, 2),
+            }
+            results.append(result)
+            print(f"segments {segments:>3}  {result['seconds']:>8.2f}s  {result['itemsPerSecond']:>9} items/s  "
+                  f"speedup {result['speedup']:>5.2f}x  efficiency {result['efficiency']:.2f}")
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'items': args.items, 'cpus': os.cpu_count(), 'endpoint': args.endpoint_url or 'moto',
+                       'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
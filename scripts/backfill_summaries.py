@@ -0,0 +1,76 @@
+"""Build the per-user quote summaries from the quotes already stored.
+
+QuoteSummaryStreamLambda only sees changes made after the stream was enabled.
+Run this once after deploying it, so users with older quotes get a complete
+summary. The script scans the quote table, keeps the latest quote of each type
+per user, and writes each summary item in full, with the same layout
+quoteSummaryStream maintains. Re-running it rebuilds the summaries from
+scratch; run it while no quotes are being stored, since a quote stored during
+the scan may be counted both here and by the stream.
+
+Usage:
+    python scripts/backfill_summaries.py --table InsuranceQuoteRequestsV3 \\
+        --summary-table InsuranceQuoteSummaries
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import awsClients  # noqa: E402
+import quoteSummaryStream  # noqa: E402
+
+def scan_quotes(dynamodb, table_name):
+    params = {
+        'TableName': table_name,
+        'ProjectionExpression': 'email, #type, premiumAmount, createdAt, details',
+        'ExpressionAttributeNames': {'#type': 'insuranceType'},
+    }
+    while True:
+        response = dynamodb.scan(**params)
+        for item in response['Items']:
+            # Skips duplicate-submission locks and premium-cache items
+            if quoteSummaryStream.is_stored_quote(item):
+                yield item
+        if 'LastEvaluatedKey' not in response:
+            return
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def build_summaries(quotes):
+    summaries = {}
+    now = datetime.utcnow().isoformat()
+    for item in quotes:
+        email = item['email']['S']
+        summary = summaries.setdefault(email, {
+            'email': {'S': email}, 'totalCount': {'N': '0'}, 'lastUpdated': {'S': now}
+        })
+        summary['totalCount'] = {'N': str(int(summary['totalCount']['N']) + 1)}
+        name = quoteSummaryStream.LATEST_PREFIX + item['insuranceType']['S']
+        latest = summary.get(name)
+        if latest is None or latest['M']['createdAt']['S'] < item['createdAt']['S']:
+            summary[name] = quoteSummaryStream.summary_quote(item)
+    return summaries
+
+def write_summaries(dynamodb, summary_table, summaries):
+    items = list(summaries.values())
+    for start in range(0, len(items), 25):
+        request = {summary_table: [{'PutRequest': {'Item': item}} for item in items[start:start + 25]]}
+        while request:
+            request = dynamodb.batch_write_item(RequestItems=request).get('UnprocessedItems')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--table', default=quoteSummaryStream.QUOTE_TABLE)
+    parser.add_argument('--summary-table', default=quoteSummaryStream.SUMMARY_TABLE)
+    args = parser.parse_args()
+
+    dynamodb = awsClients.get_client('dynamodb')
+    summaries = build_summaries(scan_quotes(dynamodb, args.table))
+    write_summaries(dynamodb, args.summary_table, summaries)
+    print(f"Wrote {len(summaries)} user summaries to {args.summary_table}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Throughput of POST /calculate/batch rating: plain loop, NumPy columns and the original functions.
+
+Builds --rows random applicants in the row-oriented shape brokers upload, as
+one JSON array body. It then times each stage and alternative over the same
+rows:
+- decode: json.loads of the request body, which every variant pays;
+- baseline: a loop over the original calculate_*_premium functions (frozen in
+  scripts/rating_parity.py);
+- rate_rows: calculatePremium.rate_rows as deployed (the compiled rules in a
+  loop, with per-row error handling);
+- numpy: a column evaluator over rating.RULES. It gathers each rated field into
+  an array per type, evaluates each threshold as one vectorized comparison and
+  scatters the premiums back into input order. It handles only valid rows, so
+  it is a lower bound for a real implementation (pip install numpy);
+- handler: the whole batch_handler, from request body to response body.
+Every variant must produce the same premiums.
+
+Usage:
+    python scripts/bulk_rating_benchmark.py --rows 100000 --output bulk_rating.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import loadtest  # noqa: E402
+import rating  # noqa: E402
+import rating_parity  # noqa: E402
+
+def make_body(count, seed):
+    rng = random.Random(seed)
+    types = sorted(loadtest.DETAIL_CHOICES)
+    rows = []
+    for _ in range(count):
+        insurance_type = rng.choice(types)
+        rows.append({'insuranceType': insurance_type,
+                     'details': {field: rng.choice(values)
+                                 for field, values in loadtest.DETAIL_CHOICES[insurance_type].items()}})
+    return json.dumps(rows)
+
+def rate_baseline(rows):
+    return [rating_parity.BASELINE_RATERS[row['insuranceType']](row.get('details', {})) for row in rows]
+
+def rate_numpy(rows):
+    import numpy as np
+
+    premiums = np.zeros(len(rows), dtype=np.int64)
+    types = np.array([row['insuranceType'] for row in rows])
+    for insurance_type, table in rating.RULES.items():
+        positions = np.flatnonzero(types == insurance_type)
+        details = [rows[i].get('details', {}) for i in positions]
+        total = np.full(len(positions), table['base'], dtype=np.int64)
+        for rule in table['surcharges']:
+            values = [d.get(rule['field'], rule['default']) for d in details]
+            if rule['op'] in ('equals', 'contains'):
+                column = np.char.lower(np.array(values, dtype=str))
+                if rule['op'] == 'equals':
+                    hit = column == rule['value']
+                else:
+                    hit = np.char.find(column, rule['value']) >= 0
+            else:
+                column = np.array(values, dtype=str).astype(np.int64)
+                hit = column > rule['value'] if rule['op'] == 'greater_than' else column < rule['value']
+            total += hit * rule['amount']
+        premiums[positions] = total
+    return premiums.tolist()
+
+def timed(run, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per variant; the fastest is reported')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+    import calculatePremium
+
+    body = make_body(args.rows, args.seed)
+    rows, decode_seconds = timed(lambda: json.loads(body), args.repeat)
+    expected, baseline_seconds = timed(lambda: rate_baseline(rows), args.repeat)
+    results = {'decode': decode_seconds, 'baseline': baseline_seconds}
+
+    (premiums, errors), results['rate_rows'] = timed(lambda: calculatePremium.rate_rows(rows), args.repeat)
+    if premiums != expected or errors:
+        sys.exit("rate_rows disagrees with the baseline functions")
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("numpy is not installed; skipping the column evaluator")
+    else:
+        premiums, results['numpy'] = timed(lambda: rate_numpy(rows), args.repeat)
+        if premiums != expected:
+            sys.exit("The NumPy column evaluator disagrees with the baseline functions")
+
+    event = {'routeKey': calculatePremium.BATCH_ROUTE, 'body': body}
+    response, results['handler'] = timed(lambda: calculatePremium.batch_handler(event, None), args.repeat)
+    if json.loads(response['body'])['premiums'] != expected:
+        sys.exit("batch_handler disagrees with the baseline functions")
+
+    for name, seconds in results.items():
+        speedup = f"{baseline_seconds / seconds:5.2f}x baseline" if name not in ('decode', 'handler') else ''
+        print(f"{name:<10} {seconds:8.3f}s  {args.rows / seconds:>12,.0f} rows/s  {speedup}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rows': args.rows, 'seconds': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
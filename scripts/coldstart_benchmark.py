@@ -0,0 +1,254 @@
+"""Measure Lambda handler import time and first-invocation latency.
+
+Each sample runs in a fresh Python subprocess, the way a new Lambda execution
+environment would: the handler module is imported, then invoked twice with a
+sample event. A second pass runs ``python -X importtime`` to attribute the
+import cost to the modules a handler pulls in.
+
+The sample events only take code paths that need no AWS access (validation
+failures and pure computation), so the numbers isolate module and client
+start-up cost. Pass --event HANDLER=path.json to time another path.
+
+--warmup compares first-request latency of the interactive handlers with and
+without a keep-warm invocation ({"warmup": true}, see backend/lambda/warmup.py).
+Here the requests take their real AWS paths, against a local moto server
+(pip install "moto[server]") that the fresh processes reach via
+AWS_ENDPOINT_URL. Nothing is imported or connected before the timing starts.
+The server speaks plain HTTP, so the TLS handshake a real first call also
+pays is not included.
+
+Usage:
+    python scripts/coldstart_benchmark.py --runs 10 --output coldstart.json
+    python scripts/coldstart_benchmark.py --warmup --runs 10 --output warmup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+
+SAMPLE_EVENTS = {
+    'submitQuote': {'body': json.dumps({'email': 'bench@example.com'})},
+    'calculatePremium': {'body': json.dumps({
+        'insuranceType': 'auto',
+        'details': {'vehicleType': 'SUV', 'year': '2019', 'drivingHistory': 'clean'}
+    })},
+    'getUserQuotes': {'requestContext': {}},
+    'validateAccess': {'body': ''},
+    'quoteWorker': {'Records': []},
+}
+
+# --warmup: requests that reach DynamoDB, SNS and Secrets Manager. Each sample
+# submits under its own address, so none is answered as a duplicate.
+WARMUP_EMAIL = 'bench@example.com'
+UNIQUE = '%UNIQUE%'
+WARMUP_ACCESS_CODE = 'bench-code'
+WARMUP_EVENTS = {
+    'submitQuote': {'body': json.dumps({
+        'name': 'Bench', 'email': f'bench-{UNIQUE}@example.com', 'insuranceType': 'auto',
+        'details': {'vehicleType': 'SUV', 'year': '2019', 'drivingHistory': 'clean'}
+    })},
+    'validateAccess': {'body': json.dumps({'accessCode': WARMUP_ACCESS_CODE})},
+    'getUserQuotes': {'requestContext': {'authorizer': {'jwt': {'claims': {'email': WARMUP_EMAIL}}}}},
+}
+
+WARMUP_CHILD_SCRIPT = """
+import json, sys, time, uuid
+event = json.loads({event!r}.replace({unique!r}, uuid.uuid4().hex))
+sys.path.insert(0, {lambda_dir!r})
+module = __import__({handler!r})
+imported = time.perf_counter()
+if {warm!r}:
+    result = module.lambda_handler({{'warmup': True}}, None)
+    if result.get('failed'):
+        raise SystemExit('Warm-up failed: ' + ', '.join(result['failed']))
+warmed = time.perf_counter()
+module.lambda_handler(event, None)
+first = time.perf_counter()
+print(json.dumps({{
+    'warmupMs': (warmed - imported) * 1000,
+    'firstRequestMs': (first - warmed) * 1000
+}}))
+"""
+
+# Runs inside the child process; prints one JSON line of timings
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {lambda_dir!r})
+module = __import__({handler!r})
+imported = time.perf_counter()
+event = json.loads({event!r})
+module.lambda_handler(event, None)
+first = time.perf_counter()
+module.lambda_handler(event, None)
+second = time.perf_counter()
+print(json.dumps({{
+    'importMs': (imported - started) * 1000,
+    'firstInvokeMs': (first - imported) * 1000,
+    'warmInvokeMs': (second - first) * 1000
+}}))
+"""
+
+def child_env():
+    env = dict(os.environ)
+    # Clients can be built without credentials; nothing here calls AWS
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    env.setdefault('SNS_TOPIC_ARN', 'arn:aws:sns:us-east-1:000000000000:bench')
+    return env
+
+def run_sample(handler, event):
+    script = CHILD_SCRIPT.format(lambda_dir=LAMBDA_DIR, handler=handler, event=json.dumps(event))
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                            env=child_env(), check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+# Returns the heaviest modules by cumulative import time (microseconds)
+def import_profile(handler, top):
+    script = f"import sys; sys.path.insert(0, {LAMBDA_DIR!r}); import {handler}"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                            capture_output=True, text=True, env=child_env(), check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            cumulative_us = int(fields[1])
+        except ValueError:
+            continue  # column header
+        modules.append({'module': fields[2].strip(), 'cumulativeUs': cumulative_us})
+    modules.sort(key=lambda module: module['cumulativeUs'], reverse=True)
+    return modules[:top]
+
+# Tables, topic and secret the --warmup requests use, on a local moto server
+def start_warmup_stack():
+    import logging
+
+    import boto3
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    endpoint = f'http://{host}:{port}'
+    session = boto3.session.Session(aws_access_key_id='bench', aws_secret_access_key='bench',
+                                    region_name='us-east-1')
+
+    dynamodb = session.client('dynamodb', endpoint_url=endpoint)
+    dynamodb.create_table(
+        TableName='InsuranceQuoteRequestsV3', BillingMode='PAY_PER_REQUEST',
+        AttributeDefinitions=[{'AttributeName': 'email', 'AttributeType': 'S'},
+                              {'AttributeName': 'quoteKey', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'email', 'KeyType': 'HASH'},
+                   {'AttributeName': 'quoteKey', 'KeyType': 'RANGE'}])
+    dynamodb.create_table(
+        TableName='InsuranceQuoteSummaries', BillingMode='PAY_PER_REQUEST',
+        AttributeDefinitions=[{'AttributeName': 'email', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'email', 'KeyType': 'HASH'}])
+    dynamodb.put_item(TableName='InsuranceQuoteSummaries', Item={
+        'email': {'S': WARMUP_EMAIL}, 'totalCount': {'N': '1'}, 'lastUpdated': {'S': '2025-01-01T00:00:00'},
+        'latest#auto': {'M': {'insuranceType': {'S': 'auto'}, 'premiumAmount': {'N': '675'},
+                              'createdAt': {'S': '2025-01-01T00:00:00'}, 'details': {'M': {}}}}})
+    topic_arn = session.client('sns', endpoint_url=endpoint).create_topic(Name='bench')['TopicArn']
+    session.client('secretsmanager', endpoint_url=endpoint).create_secret(
+        Name='bench-access-codes', SecretString=WARMUP_ACCESS_CODE)
+
+    env = child_env()
+    env.update({
+        'AWS_ENDPOINT_URL': endpoint,
+        'AWS_ACCESS_KEY_ID': 'bench',
+        'AWS_SECRET_ACCESS_KEY': 'bench',
+        'SNS_TOPIC_ARN': topic_arn,
+        'ACCESS_CODES_SECRET_NAME': 'bench-access-codes',
+        'METRICS_SAMPLE_RATE': '0',
+    })
+    return server, env
+
+def run_warmup_sample(handler, warm, env):
+    script = WARMUP_CHILD_SCRIPT.format(lambda_dir=LAMBDA_DIR, handler=handler, warm=warm,
+                                        event=json.dumps(WARMUP_EVENTS[handler]), unique=UNIQUE)
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                            env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def warmup_comparison(args):
+    server, env = start_warmup_stack()
+    results = {'python': sys.version.split()[0], 'runs': args.runs, 'handlers': {}}
+    try:
+        for handler in args.handler or list(WARMUP_EVENTS):
+            cold = [run_warmup_sample(handler, False, env) for _ in range(args.runs)]
+            warm = [run_warmup_sample(handler, True, env) for _ in range(args.runs)]
+            timings = {
+                'coldFirstRequestMs': summarize([sample['firstRequestMs'] for sample in cold]),
+                'warmedFirstRequestMs': summarize([sample['firstRequestMs'] for sample in warm]),
+                'warmupMs': summarize([sample['warmupMs'] for sample in warm]),
+            }
+            results['handlers'][handler] = timings
+            print(f"{handler:18} first request cold {timings['coldFirstRequestMs']['median']:8.1f} ms   "
+                  f"after warm-up {timings['warmedFirstRequestMs']['median']:8.1f} ms   "
+                  f"(warm-up took {timings['warmupMs']['median']:.1f} ms)")
+    finally:
+        server.stop()
+    return results
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        'median': statistics.median(values),
+        'p95': values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))],
+        'min': values[0],
+        'max': values[-1]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='cold starts per handler')
+    parser.add_argument('--handler', action='append', help='handler module to measure (repeatable)')
+    parser.add_argument('--event', action='append', default=[], metavar='HANDLER=PATH',
+                        help='JSON event file to use for a handler')
+    parser.add_argument('--top-imports', type=int, default=10)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--warmup', action='store_true',
+                        help='compare first-request latency with and without a warm-up invocation')
+    args = parser.parse_args()
+
+    if args.warmup:
+        results = warmup_comparison(args)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"Results written to {args.output}")
+        return
+
+    events = dict(SAMPLE_EVENTS)
+    for override in args.event:
+        handler, path = override.split('=', 1)
+        with open(path) as f:
+            events[handler] = json.load(f)
+
+    results = {'python': sys.version.split()[0], 'runs': args.runs, 'handlers': {}}
+    for handler in args.handler or list(SAMPLE_EVENTS):
+        samples = [run_sample(handler, events[handler]) for _ in range(args.runs)]
+        results['handlers'][handler] = {
+            metric: summarize([sample[metric] for sample in samples])
+            for metric in ('importMs', 'firstInvokeMs', 'warmInvokeMs')
+        }
+        results['handlers'][handler]['heaviestImports'] = import_profile(handler, args.top_imports)
+
+        timings = results['handlers'][handler]
+        print(f"{handler:18} import {timings['importMs']['median']:8.1f} ms   "
+              f"first invoke {timings['firstInvokeMs']['median']:8.1f} ms   "
+              f"warm invoke {timings['warmInvokeMs']['median']:6.2f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Check quoteConsumer.process_batch against a moto quote table.
+
+Each check sends SQS batches through process_batch and asserts two things:
+the batchItemFailures it returns, and what ends up in the table. The
+checks cover:
+- a clean batch: every record stored, nothing reported;
+- malformed and untyped records: only those are reported, the rest stored;
+- writes DynamoDB keeps handing back as unprocessed: only those records are
+  reported, and retrying them stores them without touching the others;
+- redelivery of a stored batch, and a record delivered twice in one batch:
+  nothing reported, no new items, and the stored items unchanged.
+The script exits non-zero if any check fails.
+
+Requires moto (pip install "moto[dynamodb]").
+
+Usage:
+    python scripts/consumer_batch_check.py --records 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import loadtest  # noqa: E402
+
+REGION = 'us-east-1'
+QUEUE_ARN = f'arn:aws:sqs:{REGION}:123456789012:vehicle-insurance-quotes'
+
+class FailingWrites:
+    """Wraps the DynamoDB client; batch_write_item returns the emails in fail_emails as unprocessed."""
+
+    def __init__(self, client):
+        self._client = client
+        self.fail_emails = set()
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def batch_write_item(self, RequestItems):
+        (table_name, requests), = RequestItems.items()
+        left = [request for request in requests if request['PutRequest']['Item']['email']['S'] in self.fail_emails]
+        written = [request for request in requests if request not in left]
+        if written:
+            self._client.batch_write_item(RequestItems={table_name: written})
+        return {'UnprocessedItems': {table_name: left} if left else {}}
+
+def make_record(n, body):
+    return {
+        'messageId': f'msg-{n}',
+        'body': body,
+        'attributes': {'SentTimestamp': str(int(time.time() * 1000))},
+        'eventSource': 'aws:sqs',
+        'eventSourceARN': QUEUE_ARN,
+    }
+
+def quote_record(n, insurance_type='auto'):
+    import quoteMessage
+
+    details = {field: values[n % len(values)] for field, values in loadtest.DETAIL_CHOICES[insurance_type].items()}
+    body = {'name': f'Check {n}', 'email': f'user{n}@check.local', 'insuranceType': insurance_type,
+            'details': details}
+    return make_record(n, quoteMessage.encode(body, f'quote-{n}', f'2025-05-01T10:00:{n % 60:02d}'))
+
+def failed_ids(response):
+    return sorted(failure['itemIdentifier'] for failure in response['batchItemFailures'])
+
+def stored_quotes(dynamodb):
+    items = []
+    params = {'TableName': loadtest.TABLE_NAME}
+    while True:
+        response = dynamodb.scan(**params)
+        items += response['Items']
+        if 'LastEvaluatedKey' not in response:
+            return sorted(items, key=lambda item: (item['email']['S'], item['quoteKey']['S']))
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def count_quotes(dynamodb):
+    return len(stored_quotes(dynamodb))
+
+def run_checks(args):
+    import awsClients
+    import quoteConsumer
+
+    dynamodb = FailingWrites(awsClients.get_client('dynamodb'))
+    awsClients._clients['dynamodb'] = dynamodb
+    quoteConsumer.TABLE_NAME = loadtest.TABLE_NAME
+    results = []
+
+    def check(name, condition, detail):
+        results.append((name, bool(condition), detail))
+
+    types = ('auto', 'home', 'life')
+    clean = [quote_record(n, types[n % 3]) for n in range(args.records)]
+    response = quoteConsumer.process_batch({'Records': clean})
+    stored = count_quotes(dynamodb)
+    check('clean batch', not failed_ids(response) and stored == args.records,
+          f"{len(failed_ids(response))} reported, {stored}/{args.records} stored")
+
+    start = args.records
+    bad = [make_record(start, 'not json'),
+           make_record(start + 1, json.dumps({'v': 1, 't': 'auto', 'd': 'nope'})),
+           make_record(start + 2, json.dumps({'v': 9})),
+           # No insuranceType and a queue with no type: nothing can rate it
+           dict(make_record(start + 3, json.dumps({'email': 'x@check.local', 'details': {}})),
+                eventSourceARN=f'arn:aws:sqs:{REGION}:123456789012:unknown-queue')]
+    good = [quote_record(n) for n in range(start + 4, start + 4 + 5)]
+    response = quoteConsumer.process_batch({'Records': bad + good})
+    expected = sorted(record['messageId'] for record in bad)
+    stored_now = count_quotes(dynamodb)
+    check('malformed records', failed_ids(response) == expected and stored_now == stored + len(good),
+          f"reported {failed_ids(response)}, stored {stored_now - stored}/{len(good)}")
+    stored = stored_now
+
+    start += 9
+    batch = [quote_record(n) for n in range(start, start + 10)]
+    dynamodb.fail_emails = {f'user{start + 2}@check.local', f'user{start + 7}@check.local'}
+    response = quoteConsumer.process_batch({'Records': batch})
+    expected = [f'msg-{start + 2}', f'msg-{start + 7}']
+    stored_now = count_quotes(dynamodb)
+    check('write errors', failed_ids(response) == expected and stored_now == stored + 8,
+          f"reported {failed_ids(response)}, stored {stored_now - stored}/8")
+    stored = stored_now
+
+    # SQS redelivers only the reported records
+    dynamodb.fail_emails = set()
+    retry = [record for record in batch if record['messageId'] in expected]
+    response = quoteConsumer.process_batch({'Records': retry})
+    stored_now = count_quotes(dynamodb)
+    check('retry of failed writes', not failed_ids(response) and stored_now == stored + 2,
+          f"{len(failed_ids(response))} reported, stored {stored_now - stored}/2")
+    stored = stored_now
+
+    before = stored_quotes(dynamodb)
+    response = quoteConsumer.process_batch({'Records': clean + batch})
+    after = stored_quotes(dynamodb)
+    check('redelivery', not failed_ids(response) and after == before,
+          f"{len(failed_ids(response))} reported, {len(after) - len(before)} new items, "
+          f"{'unchanged' if after == before else 'changed'}")
+
+    twice = [quote_record(start + 10), dict(quote_record(start + 10), messageId='msg-again')]
+    response = quoteConsumer.process_batch({'Records': twice})
+    stored_now = count_quotes(dynamodb)
+    check('same record twice in a batch', not failed_ids(response) and stored_now == len(after) + 1,
+          f"{len(failed_ids(response))} reported, {stored_now - len(after)}/1 stored")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=50, help='records in the clean batch')
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', REGION)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+
+    from moto import mock_aws
+
+    # The consumer prints one line per failed record
+    stdout = sys.stdout
+    with mock_aws(), open(os.devnull, 'w') as quiet:
+        loadtest.setup_stack(REGION)
+        sys.stdout = quiet
+        try:
+            results = run_checks(args)
+        finally:
+            sys.stdout = stdout
+
+    for name, passed, detail in results:
+        print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    failed = [name for name, passed, _ in results if not passed]
+    if failed:
+        sys.exit(f"{len(failed)} check(s) failed: {', '.join(failed)}")
+
+if __name__ == '__main__':
+    main()
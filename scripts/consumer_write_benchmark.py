@@ -0,0 +1,129 @@
+"""Throughput of the consumer's BatchWriteItem writes against per-record conditional puts.
+
+quoteConsumer writes each SQS batch with BatchWriteItem in chunks of 25. Quote
+keys come from the message, so a redelivered record overwrites its own item
+with the same values and the writes need no condition. The per-record
+alternative stores each quote with its own conditional PutItem
+(idempotency.STORE_CONDITION). This benchmark measures what that condition
+would cost at SQS batch sizes of 10, 100 and 1000.
+
+DynamoDB is replaced by an in-process client that sleeps --call-ms per request
+plus --item-ms per item written. The benchmark therefore measures round trips
+rather than the network. For each batch size it runs the same records two ways:
+- per-item: the same parse and rating, then one conditional put per record;
+- batched: quoteConsumer.process_batch as deployed.
+--unprocessed is the fraction of each BatchWriteItem the client hands back as
+unprocessed, which is how DynamoDB answers when it throttles a batch.
+
+Usage:
+    python scripts/consumer_write_benchmark.py --sizes 10,100,1000 --call-ms 6 --item-ms 0.2
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import loadtest  # noqa: E402
+
+class DelayedDynamoDB:
+    def __init__(self, call_ms, item_ms, unprocessed, rng):
+        self.call_ms = call_ms
+        self.item_ms = item_ms
+        self.unprocessed = unprocessed
+        self.rng = rng
+        self.calls = 0
+
+    def _wait(self, items):
+        self.calls += 1
+        time.sleep((self.call_ms + self.item_ms * items) / 1000)
+
+    def put_item(self, **kwargs):
+        self._wait(1)
+        return {}
+
+    def batch_write_item(self, RequestItems):
+        (table_name, requests), = RequestItems.items()
+        self._wait(len(requests))
+        left = [request for request in requests if self.rng.random() < self.unprocessed]
+        return {'UnprocessedItems': {table_name: left} if left else {}}
+
+def records(count, rng):
+    import quoteMessage
+
+    batch = []
+    for n in range(count):
+        insurance_type = rng.choice(('auto', 'home', 'life'))
+        details = {field: rng.choice(values) for field, values in loadtest.DETAIL_CHOICES[insurance_type].items()}
+        body = {'name': f'Bench {n}', 'email': f'user{n}@bench.local', 'insuranceType': insurance_type,
+                'details': details}
+        batch.append({'messageId': f'msg-{n}', 'body': quoteMessage.encode(body, f'quote-{n}', '2025-05-01T10:00:00'),
+                      'attributes': {'SentTimestamp': '1746093600000'}})
+    return batch
+
+# The per-record alternative: same parse, dispatch and rating as process_batch,
+# then one conditional put per record
+def process_batch_per_item(event):
+    import quoteConsumer
+
+    failures = []
+    for record in event['Records']:
+        try:
+            message = quoteConsumer.parse_record(record)
+            insurance_type = quoteConsumer.resolve_type(record, message)
+            premium = quoteConsumer.RATERS[insurance_type](message.details)
+            quoteConsumer.store_item(quoteConsumer.build_item(message, insurance_type, premium))
+        except Exception:
+            failures.append(record['messageId'])
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failures]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,100,1000', help='comma-separated SQS batch sizes')
+    parser.add_argument('--call-ms', type=float, default=6, help='latency of each DynamoDB request')
+    parser.add_argument('--item-ms', type=float, default=0.2, help='added latency per item written')
+    parser.add_argument('--unprocessed', type=float, default=0.0,
+                        help='fraction of each BatchWriteItem returned as unprocessed')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+    import awsClients
+    import quoteConsumer
+
+    rng = random.Random(args.seed)
+    results = []
+    for size in [int(value) for value in args.sizes.split(',')]:
+        event = {'Records': records(size, rng)}
+        result = {'batchSize': size}
+        for label in ('per-item', 'batched'):
+            dynamodb = DelayedDynamoDB(args.call_ms, args.item_ms, args.unprocessed, rng)
+            awsClients._clients['dynamodb'] = dynamodb
+            started = time.perf_counter()
+            if label == 'per-item':
+                response = process_batch_per_item(event)
+            else:
+                response = quoteConsumer.process_batch(event)
+            elapsed = time.perf_counter() - started
+            if response['batchItemFailures']:
+                sys.exit(f"{label}: {len(response['batchItemFailures'])} records failed")
+            result[label] = {'seconds': round(elapsed, 3), 'recordsPerSecond': round(size / elapsed),
+                             'calls': dynamodb.calls}
+        result['speedup'] = round(result['per-item']['seconds'] / result['batched']['seconds'], 1)
+        results.append(result)
+        print(f"batch {size:>5}  per-item {result['per-item']['recordsPerSecond']:>7} rec/s "
+              f"({result['per-item']['calls']:>4} calls)  batched {result['batched']['recordsPerSecond']:>7} rec/s "
+              f"({result['batched']['calls']:>4} calls)  {result['speedup']}x")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'callMs': args.call_ms, 'itemMs': args.item_ms, 'unprocessed': args.unprocessed,
+                       'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
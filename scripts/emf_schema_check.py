@@ -0,0 +1,283 @@
+"""Check the CloudWatch EMF lines the handlers print, against moto.
+
+Every instrumented handler is invoked in-process with a representative event
+while stdout is captured. Each invocation must print exactly one line, and
+that line must be a valid Embedded Metric Format record:
+- _aws.Timestamp is an integer in milliseconds, close to now;
+- one CloudWatchMetrics directive with METRICS_NAMESPACE and the
+  [["FunctionName"]] dimension set, and FunctionName is a top-level string;
+- every declared metric has a Name and Unit, the Unit matches the name
+  (Milliseconds for names ending in "Ms", Count otherwise), names are unique,
+  there are at most 100, and each has a numeric top-level value;
+- the phases and counters the handler records, and totalMs, are all declared;
+- coldStart is a boolean that is true only on the first invocation,
+  requestId is the context's, and statusCode matches the HTTP response.
+Further checks cover:
+- a handler that raises still prints its line, with errors = 1;
+- a fan-out publish that outlives its submitQuote invocation (answered 503
+  on timeout) does not report its time into the next invocation;
+- unsampled invocations (METRICS_SAMPLE_RATE=0) and keep-warm pings print
+  nothing.
+The script exits non-zero if any check fails.
+
+Requires moto (pip install "moto[dynamodb,sns,sqs,secretsmanager]").
+
+Usage:
+    python scripts/emf_schema_check.py
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import loadtest  # noqa: E402
+
+REGION = 'us-east-1'
+QUEUE_ARN = f'arn:aws:sqs:{REGION}:123456789012:vehicle-insurance-quotes'
+ACCESS_CODE = 'emf-check-1'
+EMAIL = 'emf@check.local'
+
+# CloudWatch accepts at most 100 metrics per EMF directive
+MAX_METRICS = 100
+
+class Delayed:
+    """Wraps a client; each method named in delays sleeps that many seconds first."""
+
+    def __init__(self, client):
+        self._client = client
+        self.delays = {}
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        if name not in self.delays:
+            return method
+
+        def call(**kwargs):
+            time.sleep(self.delays[name])
+            return method(**kwargs)
+        return call
+
+class Context:
+    def __init__(self, request_id):
+        self.aws_request_id = request_id
+
+def http_event(body, route_key=None, claims=None, params=None):
+    event = {'body': json.dumps(body), 'requestContext': {'http': {'sourceIp': '203.0.113.7'}}}
+    if route_key:
+        event['routeKey'] = route_key
+    if claims:
+        event['requestContext']['authorizer'] = {'jwt': {'claims': claims}}
+    if params:
+        event['queryStringParameters'] = params
+    return event
+
+def quote_body(insurance_type='auto'):
+    details = {field: values[0] for field, values in loadtest.DETAIL_CHOICES[insurance_type].items()}
+    return {'name': 'EMF Check', 'email': EMAIL, 'insuranceType': insurance_type, 'details': details}
+
+def sqs_event():
+    import quoteMessage
+
+    return {'Records': [{'messageId': 'msg-1', 'eventSource': 'aws:sqs', 'eventSourceARN': QUEUE_ARN,
+                         'attributes': {'SentTimestamp': str(int(time.time() * 1000))},
+                         'body': quoteMessage.encode(quote_body(), 'quote-emf-1', '2025-05-01T10:00:00')}]}
+
+def stream_event():
+    image = {'email': {'S': EMAIL}, 'quoteKey': {'S': 'auto#2025-05-01T10:00:00#quote-emf-1'},
+             'createdAt': {'S': '2025-05-01T10:00:00'}, 'insuranceType': {'S': 'auto'},
+             'premiumAmount': {'N': '500'}}
+    return {'Records': [{'eventID': 'emf-event-1', 'eventName': 'INSERT',
+                         'dynamodb': {'NewImage': image, 'SequenceNumber': '1'}}]}
+
+# (module, label, event factory, metrics the invocation must declare, HTTP handler)
+CASES = [
+    ('submitQuote', 'single submission', lambda: http_event(quote_body()),
+     {'parseMs', 'dedupeMs', 'ratingMs', 'publishMs'}, True),
+    ('submitQuote', 'multi-quote submission',
+     lambda: http_event({'name': 'EMF Check', 'email': 'multi-' + EMAIL,
+                         'quotes': [{k: v for k, v in quote_body(t).items() if k in ('insuranceType', 'details')}
+                                    for t in ('home', 'life')]}),
+     {'parseMs', 'dedupeMs', 'ratingMs', 'publishMs'}, True),
+    ('calculatePremium', 'single premium', lambda: http_event(quote_body()), {'parseMs', 'ratingMs'}, True),
+    ('calculatePremium', 'batch premiums',
+     lambda: http_event([quote_body('home'), quote_body('life')], route_key='POST /calculate/batch'),
+     {'parseMs', 'ratingMs', 'rows'}, True),
+    ('quoteWorker', 'SQS batch', sqs_event, {'parseMs', 'ratingMs', 'storeMs', 'records', 'stored'}, False),
+    ('quoteSummaryStream', 'stream batch', stream_event, {'updateMs', 'records', 'applied'}, False),
+    ('getUserQuotes', 'quote history page',
+     lambda: http_event({}, claims={'email': EMAIL}, params={'limit': '5'}),
+     {'queryMs', 'serializeMs', 'quotes'}, True),
+    ('validateAccess', 'access code', lambda: http_event({'accessCode': ACCESS_CODE}),
+     {'parseMs', 'accessCodesMs', 'compareMs'}, True),
+]
+
+def invoke(handler, event, request_id):
+    output = io.StringIO()
+    response = error = None
+    with redirect_stdout(output):
+        try:
+            response = handler(event, Context(request_id))
+        except Exception as e:
+            error = e
+    return response, error, output.getvalue().splitlines()
+
+def schema_errors(line, function_name, namespace):
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None, ['not JSON']
+    problems = []
+    aws = record.get('_aws')
+    if not isinstance(aws, dict):
+        return record, ['no _aws object']
+    timestamp = aws.get('Timestamp')
+    if not isinstance(timestamp, int) or abs(timestamp - time.time() * 1000) > 60_000:
+        problems.append(f'bad Timestamp {timestamp!r}')
+    directives = aws.get('CloudWatchMetrics')
+    if not isinstance(directives, list) or len(directives) != 1:
+        return record, problems + ['expected one CloudWatchMetrics directive']
+    directive = directives[0]
+    if directive.get('Namespace') != namespace:
+        problems.append(f"Namespace {directive.get('Namespace')!r}")
+    if directive.get('Dimensions') != [['FunctionName']]:
+        problems.append(f"Dimensions {directive.get('Dimensions')!r}")
+    if record.get('FunctionName') != function_name:
+        problems.append(f"FunctionName {record.get('FunctionName')!r}")
+    metrics = directive.get('Metrics', [])
+    names = [entry.get('Name') for entry in metrics]
+    if len(set(names)) != len(names):
+        problems.append('duplicate metric names')
+    if len(metrics) > MAX_METRICS:
+        problems.append(f'{len(metrics)} metrics')
+    for entry in metrics:
+        name = entry.get('Name')
+        unit = 'Milliseconds' if str(name).endswith('Ms') else 'Count'
+        if entry.get('Unit') != unit:
+            problems.append(f"{name} has Unit {entry.get('Unit')!r}")
+        value = record.get(name)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            problems.append(f'{name} value {value!r}')
+    return record, problems
+
+def run_checks(namespace):
+    import instrumentation
+
+    results = []
+
+    def check(name, condition, detail):
+        results.append((name, bool(condition), detail))
+
+    first = True
+    for n, (module_name, label, make_event, expected, http) in enumerate(CASES):
+        module = __import__(module_name)
+        request_id = f'req-{n}'
+        response, error, lines = invoke(module.lambda_handler, make_event(), request_id)
+        cold_start, first = first, False
+        name = f'{module_name}: {label}'
+        if error is not None or len(lines) != 1:
+            check(name, False, f"error {error!r}, {len(lines)} line(s) printed: {lines[:3]}")
+            continue
+        record, problems = schema_errors(lines[0], module_name, namespace)
+        if record is not None and '_aws' in record:
+            declared = {entry['Name'] for entry in record['_aws']['CloudWatchMetrics'][0].get('Metrics', [])}
+            missing = (expected | {'totalMs'}) - declared
+            if missing:
+                problems.append(f'missing {sorted(missing)}')
+            if record.get('coldStart') is not cold_start:
+                problems.append(f"coldStart {record.get('coldStart')!r}")
+            if record.get('requestId') != request_id:
+                problems.append(f"requestId {record.get('requestId')!r}")
+            if http and record.get('statusCode') != response.get('statusCode'):
+                problems.append(f"statusCode {record.get('statusCode')!r} for a {response.get('statusCode')}")
+            detail = f"{len(declared)} metrics: {', '.join(sorted(declared))}"
+        else:
+            detail = ''
+        check(name, not problems, '; '.join(problems) or detail)
+
+    import quoteWorker
+
+    _, error, lines = invoke(quoteWorker.lambda_handler, {}, 'req-error')
+    record, problems = schema_errors(lines[0], 'quoteWorker', namespace) if len(lines) == 1 else (None, ['no line'])
+    detail = f"raised {type(error).__name__}, errors={record.get('errors') if record else None}"
+    check('handler error', error is not None and not problems and record.get('errors') == 1,
+          '; '.join([detail] + problems))
+
+    import awsClients
+    import submitQuote
+
+    # The first publish sleeps past PUBLISH_TIMEOUT_SECONDS and finishes while
+    # the second invocation waits on its slow reservation
+    sns = awsClients._clients['sns'] = Delayed(awsClients.get_client('sns'))
+    dynamodb = awsClients._clients['dynamodb'] = Delayed(awsClients.get_client('dynamodb'))
+    settings = submitQuote.FANOUT_ENABLED, submitQuote.PUBLISH_TIMEOUT_SECONDS
+    submitQuote.FANOUT_ENABLED, submitQuote.PUBLISH_TIMEOUT_SECONDS = True, 0.05
+    try:
+        sns.delays['publish'] = 0.3
+        slow, _, _ = invoke(submitQuote.lambda_handler, http_event(quote_body('home')), 'req-slow-publish')
+        sns.delays['publish'] = 0
+        dynamodb.delays['put_item'] = 0.4
+        _, _, lines = invoke(submitQuote.lambda_handler, http_event(quote_body('life')), 'req-next')
+    finally:
+        submitQuote.FANOUT_ENABLED, submitQuote.PUBLISH_TIMEOUT_SECONDS = settings
+        awsClients._clients['sns'] = sns._client
+        awsClients._clients['dynamodb'] = dynamodb._client
+    record = json.loads(lines[-1]) if lines else {}
+    check('phase outliving its invocation',
+          slow['statusCode'] == 503 and record.get('publishMs', 1000) < 150 and record.get('dedupeMs', 0) >= 400,
+          f"first answered {slow['statusCode']}; next publishMs={record.get('publishMs')}, "
+          f"dedupeMs={record.get('dedupeMs')}")
+
+    sample_rate, instrumentation.SAMPLE_RATE = instrumentation.SAMPLE_RATE, 0
+    try:
+        _, _, lines = invoke(submitQuote.lambda_handler, http_event(quote_body('home')), 'req-unsampled')
+    finally:
+        instrumentation.SAMPLE_RATE = sample_rate
+    check('unsampled invocation', not lines, f"{len(lines)} line(s) printed")
+
+    import warmup
+
+    _, _, lines = invoke(submitQuote.lambda_handler, {warmup.EVENT_KEY: True}, 'req-warmup')
+    check('keep-warm ping', not any('_aws' in line for line in lines), f"{len(lines)} line(s) printed")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', REGION)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ['METRICS_SAMPLE_RATE'] = '1'
+    os.environ['LOG_LEVEL'] = 'INFO'
+    os.environ['DYNAMODB_TABLE'] = loadtest.TABLE_NAME
+    os.environ['SUMMARY_TABLE'] = loadtest.SUMMARY_TABLE_NAME
+    os.environ['ACCESS_CODES_SECRET_NAME'] = 'emf-check-access-codes'
+
+    from moto import mock_aws
+
+    with mock_aws():
+        import boto3
+
+        topic_arn, _, _ = loadtest.setup_stack(REGION)
+        loadtest.setup_summary_table(REGION)
+        boto3.client('secretsmanager', region_name=REGION).create_secret(
+            Name=os.environ['ACCESS_CODES_SECRET_NAME'], SecretString=ACCESS_CODE)
+        os.environ['SNS_TOPIC_ARN'] = topic_arn
+        import instrumentation
+
+        results = run_checks(instrumentation.NAMESPACE)
+
+    for name, passed, detail in results:
+        print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    failed = [name for name, passed, _ in results if not passed]
+    if failed:
+        sys.exit(f"{len(failed)} check(s) failed: {', '.join(failed)}")
+
+if __name__ == '__main__':
+    main()
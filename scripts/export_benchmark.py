@@ -0,0 +1,192 @@
+"""Memory and latency of the quote export over one user's long history.
+
+One user gets --quotes synthetic quotes; some detail values carry non-ASCII
+text, so characters and UTF-8 bytes differ. The export is then followed
+through every nextToken, the way a client downloads it, once per format:
+- deployed: getUserQuotes.export_quotes, which writes each item's line into one
+  buffer and stops before the line that would pass MAX_EXPORT_BYTES;
+- chunks: the export as it was before, serializing whole pages into a list of
+  chunks, counting characters and checking the limit only after each page.
+For each call it reports the body size in bytes, the latency, and the peak
+memory allocated during the call (tracemalloc, in a second pass, since tracing
+slows the code down). It checks that every deployed body stays within
+MAX_EXPORT_BYTES and that the bodies together hold every quote exactly once,
+in order.
+
+DynamoDB is replaced by an in-process client that answers the export's Query
+pages from a list sorted like CreatedAtIndex, honouring Limit,
+ExclusiveStartKey and ProjectionExpression, and sleeps --call-ms per page.
+moto would walk the whole table for each page. The benchmark therefore
+measures the export's own serialization and memory, not DynamoDB.
+
+Usage:
+    python scripts/export_benchmark.py --quotes 100000 --output export.json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import loadtest  # noqa: E402
+
+EMAIL = 'export@bench.local'
+TYPES = ('auto', 'home', 'life')
+# Free text the form accepts; a few values are not ASCII
+EXTRA_TEXT = ['', 'one accident in 2019', 'garage in Zürich', 'résumé on file', '東京 office']
+
+class PartitionClient:
+    """Serves Query pages of one partition in CreatedAtIndex order, newest first."""
+
+    def __init__(self, items, call_ms):
+        self.items = sorted(items, key=lambda item: (item['createdAt']['S'], item['quoteKey']['S']), reverse=True)
+        self.positions = {item['quoteKey']['S']: n for n, item in enumerate(self.items)}
+        self.call_ms = call_ms
+        self.calls = 0
+
+    def query(self, **params):
+        self.calls += 1
+        time.sleep(self.call_ms / 1000)
+        names = params.get('ExpressionAttributeNames', {})
+        projected = [names.get(name.strip(), name.strip()) for name in params['ProjectionExpression'].split(',')]
+        start = 0
+        if 'ExclusiveStartKey' in params:
+            start = self.positions[params['ExclusiveStartKey']['quoteKey']['S']] + 1
+        page = self.items[start:start + params['Limit']]
+        response = {'Items': [{name: item[name] for name in projected if name in item} for item in page],
+                    'Count': len(page)}
+        if start + len(page) < len(self.items):
+            last = page[-1]
+            response['LastEvaluatedKey'] = {name: last[name] for name in ('email', 'quoteKey', 'createdAt')}
+        return response
+
+def quote_items(count, rng):
+    items = []
+    for n in range(count):
+        insurance_type = TYPES[n % len(TYPES)]
+        created_at = f'20{15 + n % 10}-{n % 12 + 1:02d}-{n % 28 + 1:02d}T{n % 24:02d}:{n % 60:02d}:00.{n:06d}'
+        details = {field: {'S': rng.choice(values)} for field, values in loadtest.DETAIL_CHOICES[insurance_type].items()}
+        details['notes'] = {'S': rng.choice(EXTRA_TEXT)}
+        items.append({
+            'email': {'S': EMAIL},
+            'quoteKey': {'S': f'{insurance_type}#{created_at}#q{n}'},
+            'insuranceType': {'S': insurance_type},
+            'premiumAmount': {'N': str(rng.randrange(300, 2000))},
+            'createdAt': {'S': created_at},
+            'details': {'M': details},
+        })
+    return items
+
+# The export before the per-item limit: whole pages, characters, one list of chunks
+def export_chunks(getUserQuotes, user_email, export_format, start_key=None):
+    chunks = []
+    size = 0
+    first_page = start_key is None
+    while True:
+        response = getUserQuotes.query_user_quotes(user_email, getUserQuotes.EXPORT_PAGE_SIZE, start_key)
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if first_page:
+                writer.writerow(getUserQuotes.EXPORT_FIELDS)
+            for item in response['Items']:
+                writer.writerow([getUserQuotes.attribute_to_text(item[field]) if field in item else ''
+                                 for field in getUserQuotes.EXPORT_FIELDS])
+            chunk = buffer.getvalue()
+        else:
+            chunk = ''.join(getUserQuotes.ndjson_line(item) for item in response['Items'])
+        chunks.append(chunk)
+        size += len(chunk)
+        first_page = False
+        start_key = response.get('LastEvaluatedKey')
+        if not start_key or size >= getUserQuotes.MAX_EXPORT_BYTES:
+            body = ''.join(chunks)
+            return body, len(body.encode('utf-8')), start_key
+
+def follow(export, export_format, traced):
+    """Every call of one download: (body, bytes, seconds, peak bytes allocated)."""
+    calls = []
+    start_key = None
+    while True:
+        if traced:
+            tracemalloc.start()
+        started = time.perf_counter()
+        body, size, start_key = export(EMAIL, export_format, start_key)
+        seconds = time.perf_counter() - started
+        peak = 0
+        if traced:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        calls.append((body, size, seconds, peak))
+        if not start_key:
+            return calls
+
+def expected_lines(getUserQuotes, client, export_format):
+    if export_format != 'csv':
+        return [getUserQuotes.ndjson_line(item) for item in client.items]
+    csv_line = getUserQuotes.csv_line_writer()
+    return [csv_line(getUserQuotes.EXPORT_FIELDS)] + [csv_line(getUserQuotes.csv_row(item)) for item in client.items]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quotes', type=int, default=100_000)
+    parser.add_argument('--call-ms', type=float, default=0, help='latency of each Query page')
+    parser.add_argument('--formats', default='ndjson,csv')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+    import awsClients
+    import getUserQuotes
+
+    client = PartitionClient(quote_items(args.quotes, random.Random(args.seed)), args.call_ms)
+    awsClients._clients['dynamodb'] = client
+    variants = {
+        'deployed': getUserQuotes.export_quotes,
+        'chunks': lambda email, export_format, start_key: export_chunks(getUserQuotes, email, export_format,
+                                                                       start_key),
+    }
+
+    results = []
+    failures = []
+    for export_format in args.formats.split(','):
+        expected = ''.join(expected_lines(getUserQuotes, client, export_format))
+        for name, export in variants.items():
+            calls = follow(export, export_format, traced=False)
+            peaks = [peak for _, _, _, peak in follow(export, export_format, traced=True)]
+            body = ''.join(body for body, _, _, _ in calls)
+            largest = max(size for _, size, _, _ in calls)
+            result = {'format': export_format, 'variant': name, 'calls': len(calls),
+                      'totalBytes': sum(size for _, size, _, _ in calls), 'largestBodyBytes': largest,
+                      'secondsPerCall': [round(seconds, 3) for _, _, seconds, _ in calls],
+                      'peakMiBPerCall': [round(peak / 2 ** 20, 1) for peak in peaks]}
+            results.append(result)
+            print(f"{export_format:<6} {name:<8} {len(calls)} call(s), largest body {largest:>9,} bytes, "
+                  f"{sum(seconds for _, _, seconds, _ in calls):.2f}s total, "
+                  f"peak {max(result['peakMiBPerCall'])} MiB per call")
+            if name == 'deployed':
+                if largest > getUserQuotes.MAX_EXPORT_BYTES:
+                    failures.append(f"{export_format}: a body of {largest} bytes")
+                if body != expected:
+                    failures.append(f"{export_format}: the bodies do not hold every quote exactly once, in order")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(f"{len(failures)} check(s) failed")
+    print(f"✅ every body within {getUserQuotes.MAX_EXPORT_BYTES:,} bytes, every quote exported once")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Frozen copy of the per-type quote consumers from before quoteWorker.
+
+This is quoteConsumer.process_batch and the autoQuoteLambda, homeQuoteLambda
+and LifeQuoteLambda handlers as they were before the consumers were
+consolidated (commit f394caa), kept as the reference that
+scripts/worker_parity.py compares quoteWorker against. Each handler rated
+every record as its queue's type. Do not edit this file to follow changes in
+backend/lambda; a difference from it is what the parity check reports.
+
+The shared modules it imports (awsClients, idempotency, instrumentation,
+premiumCache, quoteMessage) are the current ones.
+"""
+import uuid
+from datetime import datetime
+
+import awsClients
+import idempotency
+import instrumentation
+import premiumCache
+import quoteMessage
+
+# worker_parity points this at its own table
+TABLE_NAME = 'InsuranceQuoteRequestsV3'
+
+def quote_key(insurance_type, created_at, quote_id):
+    return f"{insurance_type}#{created_at}#{quote_id}"
+
+def parse_record(record):
+    message = quoteMessage.decode(record['body'])
+    # Messages published without a quote id: derive it and the timestamp from
+    # the SQS message, which stay the same across redeliveries
+    if message.quote_id is None:
+        message.quote_id = record.get('messageId') or str(uuid.uuid4())
+        sent_at = record.get('attributes', {}).get('SentTimestamp')
+        created_at = datetime.utcfromtimestamp(int(sent_at) / 1000) if sent_at else datetime.utcnow()
+        message.created_at = created_at.isoformat()
+    return message
+
+def build_item(message, insurance_type, premium):
+    return {
+        'email': message.email or 'unknown',
+        'quoteKey': quote_key(insurance_type, message.created_at, message.quote_id),
+        'quoteId': message.quote_id,
+        'insuranceType': insurance_type,
+        'name': message.name,
+        'details': message.details,
+        'premiumAmount': premium,
+        'createdAt': message.created_at
+    }
+
+# Store one quote. Returns False if it was already stored, which makes
+# redelivered messages no-ops.
+def store_item(item):
+    try:
+        awsClients.get_client('dynamodb').put_item(
+            TableName=TABLE_NAME,
+            Item=awsClients.to_item(item),
+            ConditionExpression=idempotency.STORE_CONDITION
+        )
+        return True
+    except Exception as e:
+        if idempotency.is_conditional_check_failure(e):
+            return False
+        raise
+
+# Rate and store every record in an SQS batch. Returns the partial batch
+# response expected by ReportBatchItemFailures so only failed records are retried.
+def process_batch(event, insurance_type):
+    failures = []
+    stored = 0
+
+    for record in event['Records']:
+        message_id = record.get('messageId')
+        try:
+            with instrumentation.phase('parse'):
+                message = parse_record(record)
+            with instrumentation.phase('rating'):
+                premium = premiumCache.rate(insurance_type, message.details)
+            item = build_item(message, insurance_type, premium)
+
+            with instrumentation.phase('store'):
+                is_new = store_item(item)
+            if is_new:
+                stored += 1
+            else:
+                instrumentation.metric('duplicates')
+                print(f"⚠️ Duplicate {insurance_type} quote ignored: {item['email']} {item['quoteKey']}")
+
+        except Exception as e:
+            print(f"❌ Error processing {insurance_type} quote {message_id}: {e}")
+            failures.append(message_id)
+
+    instrumentation.metric('records', len(event['Records']))
+    instrumentation.metric('stored', stored)
+    instrumentation.metric('failures', len(failures))
+    if instrumentation.DEBUG:
+        print(f"✅ Stored {stored} {insurance_type} quote(s), {len(failures)} failed")
+
+    return {
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failures]
+    }
+
+@instrumentation.instrumented('autoQuoteLambda')
+def auto_handler(event, context):
+    return process_batch(event, 'auto')
+
+@instrumentation.instrumented('homeQuoteLambda')
+def home_handler(event, context):
+    return process_batch(event, 'home')
+
+@instrumentation.instrumented('LifeQuoteLambda')
+def life_handler(event, context):
+    return process_batch(event, 'life')
@@ -0,0 +1,551 @@
+"""Offline load test of the SNS -> SQS -> Lambda -> DynamoDB quote pipeline.
+
+The real handlers run in-process against moto stand-ins for the stack in
+infrastructure/template.yaml:
+- the Insurance-Quote-Requests topic;
+- the three queues, subscribed with the same insuranceType filter policies;
+- InsuranceQuoteRequestsV3, with its CreatedAtIndex LSI and TTL.
+
+Synthetic submissions are sent to submitQuote at a fixed open-loop rate.
+--pollers pollers per queue behave like the Lambda SQS event source. Each
+collects up to --batch-size messages within --batch-window seconds, invokes
+the queue's consumer, and deletes everything the consumer did not report in
+batchItemFailures.
+
+Consumers run as Lambda functions would. With --worker consolidated (the
+default, as deployed), all three queues invoke quoteWorker. With --worker
+per-type, each queue invokes its pre-consolidation handler, frozen in
+scripts/legacy_quote_consumer.py. Every function has its own
+pool of execution environments. An invocation reuses an idle environment of
+its function, or creates one, which is a cold start that sleeps
+--cold-start-ms. Environments idle for longer than --idle-expiry seconds are
+reclaimed. The report counts environments per function.
+
+The report covers:
+- submit latency;
+- end-to-end latency, from submit until the quote is stored;
+- stored quotes per second;
+- AWS calls made by the handlers;
+- estimated DynamoDB write units, computed from item sizes the way DynamoDB
+  bills them, including the LSI;
+- execution environments and cold starts per consumer function.
+
+moto adds its own overhead. Compare results between commits on the same
+machine; the absolute numbers are not production latencies.
+
+Requires moto (pip install "moto[sns,sqs,dynamodb]").
+
+Usage:
+    python scripts/loadtest.py --rate 50 --count 2000 --mix auto=5,home=3,life=2 \\
+        --duplicates 0.1 --payload-bytes 512 --output loadtest.json
+    python scripts/loadtest.py --worker per-type --pollers 3 --cold-start-ms 300 --idle-expiry 2
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+
+TABLE_NAME = 'InsuranceQuoteRequestsV3'
+SUMMARY_TABLE_NAME = 'InsuranceQuoteSummaries'
+TOPIC_NAME = 'Insurance-Quote-Requests'
+
+# queue name -> (legacy_quote_consumer handler, subscription filter policy), as in template.yaml
+QUEUES = {
+    'vehicle-insurance-quotes': ('auto_handler', ['auto', 'vehicle']),
+    'home-insurance-quotes': ('home_handler', ['home']),
+    'life-insurance-quotes': ('life_handler', ['life']),
+}
+
+# Realistic field values per type; roughly half the applicants hit each surcharge
+DETAIL_CHOICES = {
+    'auto': {
+        'vehicleType': ['sedan', 'SUV', 'truck', 'coupe'],
+        'year': ['2012', '2016', '2019', '2021', '2023'],
+        'drivingHistory': ['clean', 'one accident', 'speeding ticket', 'clean'],
+    },
+    'home': {
+        'squareFootage': ['1200', '1800', '2400', '3200'],
+        'yearBuilt': ['1975', '1998', '2005', '2018'],
+        'securitySystem': ['yes', 'no'],
+    },
+    'life': {
+        'age': ['25', '34', '47', '58', '66'],
+        'smoker': ['no', 'yes', 'no'],
+        'health': ['excellent', 'good', 'fair', 'poor'],
+    },
+}
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        insurance_type, weight = part.split('=')
+        if insurance_type not in DETAIL_CHOICES:
+            raise argparse.ArgumentTypeError(f"Unknown insurance type: {insurance_type}")
+        mix[insurance_type] = float(weight)
+    return mix
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def latency_summary(seconds):
+    ms = [value * 1000 for value in seconds]
+    return {
+        'count': len(ms),
+        'p50': percentile(ms, 0.50),
+        'p95': percentile(ms, 0.95),
+        'p99': percentile(ms, 0.99),
+        'mean': statistics.fmean(ms) if ms else None,
+        'max': max(ms) if ms else None,
+    }
+
+# DynamoDB item size as billed: attribute name bytes plus value bytes
+def attribute_size(attribute):
+    (kind, value), = attribute.items()
+    if kind == 'S':
+        return len(value.encode('utf-8'))
+    if kind == 'N':
+        return (len(value.lstrip('-').replace('.', '')) + 1) // 2 + 1
+    if kind == 'M':
+        return 3 + sum(len(k.encode('utf-8')) + 1 + attribute_size(v) for k, v in value.items())
+    if kind == 'L':
+        return 3 + sum(1 + attribute_size(v) for v in value)
+    return 1
+
+def item_size(item):
+    return sum(len(name.encode('utf-8')) + attribute_size(value) for name, value in item.items())
+
+def write_units(size):
+    return max(1, math.ceil(size / 1024))
+
+INDEX_ATTRIBUTES = ('email', 'quoteKey', 'createdAt', 'insuranceType', 'premiumAmount', 'details')
+
+def put_units(item):
+    units = write_units(item_size(item))
+    # Items carrying createdAt are also written to CreatedAtIndex
+    if 'createdAt' in item:
+        units += write_units(item_size({k: v for k, v in item.items() if k in INDEX_ATTRIBUTES}))
+    return units
+
+def batch_put_units(request_items):
+    return sum(put_units(request['PutRequest']['Item'])
+               for requests in request_items.values() for request in requests if 'PutRequest' in request)
+
+class CountingClient:
+    """Wraps a boto3 client, counting calls and estimating write units."""
+
+    def __init__(self, client, service_name, stats):
+        self._client = client
+        self._service_name = service_name
+        self._stats = stats
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        if not callable(method):
+            return method
+
+        def call(**kwargs):
+            key = f"{self._service_name}.{name}"
+            with self._stats['lock']:
+                self._stats['calls'][key] = self._stats['calls'].get(key, 0) + 1
+                if name == 'put_item':
+                    self._stats['writeUnits'] += put_units(kwargs['Item'])
+                elif name == 'delete_item':
+                    self._stats['writeUnits'] += 1
+            response = method(**kwargs)
+            if name == 'batch_write_item':
+                # Only the puts DynamoDB processed are billed; the rest are retried
+                unprocessed = response.get('UnprocessedItems') or {}
+                units = batch_put_units(kwargs['RequestItems']) - batch_put_units(unprocessed)
+                with self._stats['lock']:
+                    self._stats['writeUnits'] += units
+            return response
+        return call
+
+# InsuranceQuoteRequestsV3 as in template.yaml
+def create_quote_table(dynamodb):
+    dynamodb.create_table(
+        TableName=TABLE_NAME,
+        BillingMode='PAY_PER_REQUEST',
+        AttributeDefinitions=[
+            {'AttributeName': 'email', 'AttributeType': 'S'},
+            {'AttributeName': 'quoteKey', 'AttributeType': 'S'},
+            {'AttributeName': 'createdAt', 'AttributeType': 'S'},
+        ],
+        KeySchema=[
+            {'AttributeName': 'email', 'KeyType': 'HASH'},
+            {'AttributeName': 'quoteKey', 'KeyType': 'RANGE'},
+        ],
+        LocalSecondaryIndexes=[{
+            'IndexName': 'CreatedAtIndex',
+            'KeySchema': [
+                {'AttributeName': 'email', 'KeyType': 'HASH'},
+                {'AttributeName': 'createdAt', 'KeyType': 'RANGE'},
+            ],
+            'Projection': {
+                'ProjectionType': 'INCLUDE',
+                'NonKeyAttributes': ['insuranceType', 'premiumAmount', 'details'],
+            },
+        }],
+    )
+    dynamodb.update_time_to_live(
+        TableName=TABLE_NAME,
+        TimeToLiveSpecification={'Enabled': True, 'AttributeName': 'expiresAt'},
+    )
+
+def setup_stack(region):
+    import boto3
+
+    create_quote_table(boto3.client('dynamodb', region_name=region))
+    sns = boto3.client('sns', region_name=region)
+    sqs = boto3.client('sqs', region_name=region)
+    topic_arn = sns.create_topic(Name=TOPIC_NAME)['TopicArn']
+
+    queues = {}
+    for queue_name, (consumer, filter_values) in QUEUES.items():
+        queue_url = sqs.create_queue(QueueName=queue_name)['QueueUrl']
+        queue_arn = sqs.get_queue_attributes(
+            QueueUrl=queue_url, AttributeNames=['QueueArn'])['Attributes']['QueueArn']
+        sns.subscribe(
+            TopicArn=topic_arn,
+            Protocol='sqs',
+            Endpoint=queue_arn,
+            Attributes={
+                'FilterPolicy': json.dumps({'insuranceType': filter_values}),
+                'RawMessageDelivery': 'true',
+            },
+        )
+        queues[queue_name] = queue_url
+
+    return topic_arn, queues, sqs
+
+# QuoteSummaryTable, for checks that run quoteSummaryStream
+def setup_summary_table(region):
+    import boto3
+
+    dynamodb = boto3.client('dynamodb', region_name=region)
+    dynamodb.create_table(
+        TableName=SUMMARY_TABLE_NAME,
+        BillingMode='PAY_PER_REQUEST',
+        AttributeDefinitions=[{'AttributeName': 'email', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'email', 'KeyType': 'HASH'}],
+    )
+    dynamodb.update_time_to_live(
+        TableName=SUMMARY_TABLE_NAME,
+        TimeToLiveSpecification={'Enabled': True, 'AttributeName': 'expiresAt'},
+    )
+
+def make_request(n, insurance_type, payload_bytes, rng):
+    details = {field: rng.choice(values) for field, values in DETAIL_CHOICES[insurance_type].items()}
+    body = {
+        'name': f'Load Test {n}',
+        'email': f'user{n}@loadtest.local',
+        'insuranceType': insurance_type,
+        'details': details,
+    }
+    padding = payload_bytes - len(json.dumps(body))
+    if padding > 0:
+        details['notes'] = 'x' * padding
+    return body
+
+class FunctionEnvironments:
+    """Execution environments of one consumer function, reused while warm."""
+
+    def __init__(self, name, cold_start, idle_expiry):
+        self.name = name
+        self.cold_start = cold_start
+        self.idle_expiry = idle_expiry
+        self.lock = threading.Lock()
+        self.idle = []  # last-used times of idle environments, most recent last
+        self.created = 0
+        self.invocations = 0
+        self.busy = 0
+        self.peak = 0
+
+    def invoke(self, handler, event):
+        with self.lock:
+            now = time.perf_counter()
+            if self.idle_expiry:
+                self.idle = [last_used for last_used in self.idle if now - last_used <= self.idle_expiry]
+            cold = not self.idle
+            if cold:
+                self.created += 1
+            else:
+                self.idle.pop()
+            self.invocations += 1
+            self.busy += 1
+            self.peak = max(self.peak, self.busy)
+        try:
+            if cold and self.cold_start:
+                time.sleep(self.cold_start)
+            return handler(event, None)
+        finally:
+            with self.lock:
+                self.busy -= 1
+                self.idle.append(time.perf_counter())
+
+    def summary(self):
+        return {'environments': self.created, 'invocations': self.invocations, 'peakConcurrency': self.peak}
+
+class Poller(threading.Thread):
+    """Delivers SQS batches to a consumer handler like the Lambda event source."""
+
+    def __init__(self, sqs, queue_url, queue_arn, handler, environments, decode, batch_size, batch_window,
+                 results, stop):
+        super().__init__(daemon=True)
+        self.sqs = sqs
+        self.decode = decode
+        self.queue_url = queue_url
+        self.queue_arn = queue_arn
+        self.handler = handler
+        self.environments = environments
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.results = results
+        self.stop = stop
+
+    def receive_batch(self):
+        messages = []
+        deadline = time.perf_counter() + self.batch_window
+        while len(messages) < self.batch_size:
+            response = self.sqs.receive_message(
+                QueueUrl=self.queue_url,
+                MaxNumberOfMessages=min(10, self.batch_size - len(messages)),
+            )
+            messages.extend(response.get('Messages', []))
+            if time.perf_counter() >= deadline or self.stop.is_set():
+                break
+            if not response.get('Messages'):
+                time.sleep(0.005)
+        return messages
+
+    def run(self):
+        while not self.stop.is_set():
+            messages = self.receive_batch()
+            if not messages:
+                continue
+
+            event = {'Records': [{
+                'messageId': message['MessageId'],
+                'receiptHandle': message['ReceiptHandle'],
+                'body': message['Body'],
+                'eventSource': 'aws:sqs',
+                'eventSourceARN': self.queue_arn,
+            } for message in messages]}
+
+            response = self.environments.invoke(self.handler, event)
+            finished = time.perf_counter()
+
+            failed = {failure['itemIdentifier'] for failure in response.get('batchItemFailures', [])}
+            done = [message for message in messages if message['MessageId'] not in failed]
+            if done:
+                self.sqs.delete_message_batch(QueueUrl=self.queue_url, Entries=[
+                    {'Id': str(i), 'ReceiptHandle': message['ReceiptHandle']}
+                    for i, message in enumerate(done)
+                ])
+
+            with self.results['lock']:
+                self.results['batches'].append(len(messages))
+                self.results['failedRecords'] += len(failed)
+                for message in done:
+                    quote = self.decode(message['Body'])
+                    self.results['stored'][f"{quote.email}#{quote.insurance_type}"] = finished
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=LAMBDA_DIR).stdout.strip()
+    except Exception:
+        return None
+
+def run(args):
+    region = 'us-east-1'
+    os.environ.setdefault('AWS_DEFAULT_REGION', region)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    # Keep the per-invocation metric lines out of the report unless asked for
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '1' if args.emf else '0')
+
+    from moto import mock_aws
+
+    with mock_aws():
+        topic_arn, queues, sqs = setup_stack(region)
+        os.environ['SNS_TOPIC_ARN'] = topic_arn
+
+        sys.path.insert(0, LAMBDA_DIR)
+        import awsClients
+        import quoteMessage
+        import submitQuote
+
+        submitQuote.TOPIC_ARN = topic_arn
+        stats = {'lock': threading.Lock(), 'calls': {}, 'writeUnits': 0}
+        for service_name in ('dynamodb', 'sns'):
+            awsClients._clients[service_name] = CountingClient(
+                awsClients.get_client(service_name), service_name, stats)
+
+        results = {'lock': threading.Lock(), 'stored': {}, 'batches': [], 'failedRecords': 0}
+        stop = threading.Event()
+        pollers = []
+        functions = {}
+        for queue_name, (consumer, _) in QUEUES.items():
+            if args.worker == 'consolidated':
+                consumer = 'quoteWorker'
+                handler = __import__(consumer).lambda_handler
+            else:
+                import legacy_quote_consumer
+
+                handler = getattr(legacy_quote_consumer, consumer)
+            if consumer not in functions:
+                functions[consumer] = FunctionEnvironments(consumer, args.cold_start_ms / 1000, args.idle_expiry)
+            queue_arn = sqs.get_queue_attributes(
+                QueueUrl=queues[queue_name], AttributeNames=['QueueArn'])['Attributes']['QueueArn']
+            for _ in range(args.pollers):
+                poller = Poller(sqs, queues[queue_name], queue_arn, handler, functions[consumer],
+                                quoteMessage.decode, args.batch_size, args.batch_window, results, stop)
+                poller.start()
+                pollers.append(poller)
+
+        rng = random.Random(args.seed)
+        types = list(args.mix)
+        weights = [args.mix[t] for t in types]
+        submitted = {}
+        submit_latency = []
+        duplicates_rejected = 0
+        errors = 0
+
+        interval = 1.0 / args.rate
+        started = time.perf_counter()
+        for n in range(args.count):
+            # Open loop: requests are due on a fixed schedule, however slow the last one was
+            due = started + n * interval
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            if submitted and rng.random() < args.duplicates:
+                # Resubmit an earlier applicant and type
+                body = rng.choice(list(submitted.values()))[0]
+            else:
+                body = make_request(n, rng.choices(types, weights)[0], args.payload_bytes, rng)
+
+            sent = time.perf_counter()
+            response = submitQuote.lambda_handler({'body': json.dumps(body)}, None)
+            submit_latency.append(time.perf_counter() - sent)
+
+            key = f"{body['email']}#{body['insuranceType']}"
+            payload = json.loads(response['body'])
+            if response['statusCode'] != 200:
+                errors += 1
+            elif payload.get('duplicate'):
+                duplicates_rejected += 1
+            else:
+                submitted[key] = (body, sent)
+        submit_finished = time.perf_counter()
+
+        # Wait for the consumers to drain what was accepted
+        deadline = time.perf_counter() + args.drain_timeout
+        while time.perf_counter() < deadline:
+            with results['lock']:
+                if len(results['stored']) >= len(submitted):
+                    break
+            time.sleep(0.01)
+        stop.set()
+        for poller in pollers:
+            poller.join(timeout=5)
+
+        end_to_end = [results['stored'][key] - sent
+                      for key, (_, sent) in submitted.items() if key in results['stored']]
+        last_stored = max(results['stored'].values(), default=submit_finished)
+        elapsed = last_stored - started
+        calls = dict(sorted(stats['calls'].items()))
+
+    return {
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'config': {
+            'rate': args.rate, 'count': args.count, 'mix': args.mix,
+            'duplicates': args.duplicates, 'payloadBytes': args.payload_bytes,
+            'batchSize': args.batch_size, 'batchWindow': args.batch_window, 'seed': args.seed,
+            'worker': args.worker, 'pollers': args.pollers, 'coldStartMs': args.cold_start_ms,
+            'idleExpiry': args.idle_expiry,
+        },
+        'submitted': args.count,
+        'accepted': len(submitted),
+        'duplicatesRejected': duplicates_rejected,
+        'submitErrors': errors,
+        'stored': len(end_to_end),
+        'lost': len(submitted) - len(end_to_end),
+        'failedRecords': results['failedRecords'],
+        'elapsedSeconds': elapsed,
+        'achievedSubmitRate': args.count / (submit_finished - started),
+        'storedPerSecond': len(end_to_end) / elapsed if elapsed else None,
+        'submitLatencyMs': latency_summary(submit_latency),
+        'endToEndLatencyMs': latency_summary(end_to_end),
+        'meanBatchSize': statistics.fmean(results['batches']) if results['batches'] else None,
+        'awsCalls': calls,
+        'awsCallsPerSubmission': sum(calls.values()) / args.count,
+        'estimatedWriteUnits': stats['writeUnits'],
+        'writeUnitsPerStoredQuote': stats['writeUnits'] / len(end_to_end) if end_to_end else None,
+        'functions': {name: environments.summary() for name, environments in functions.items()},
+        'environments': sum(environments.created for environments in functions.values()),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=float, default=50, help='submissions per second')
+    parser.add_argument('--count', type=int, default=1000, help='total submissions')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('auto=1,home=1,life=1'),
+                        help='insurance type weights, e.g. auto=5,home=3,life=2')
+    parser.add_argument('--duplicates', type=float, default=0.0,
+                        help='fraction of submissions that repeat an earlier applicant')
+    parser.add_argument('--payload-bytes', type=int, default=256,
+                        help='pad each request body to about this many bytes')
+    parser.add_argument('--batch-size', type=int, default=10, help='SQS event source BatchSize')
+    parser.add_argument('--batch-window', type=float, default=0.05,
+                        help='seconds to wait while filling a batch')
+    parser.add_argument('--worker', choices=('consolidated', 'per-type'), default='consolidated',
+                        help='one quoteWorker for all queues, or the frozen pre-consolidation handler per queue')
+    parser.add_argument('--pollers', type=int, default=1, help='concurrent pollers per queue')
+    parser.add_argument('--cold-start-ms', type=float, default=0,
+                        help='delay added to each new execution environment\'s first invocation')
+    parser.add_argument('--idle-expiry', type=float, default=0,
+                        help='seconds before an idle environment is reclaimed (0 = never)')
+    parser.add_argument('--drain-timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--emf', action='store_true', help='keep the handlers\' EMF metric lines')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = run(args)
+
+    e2e = results['endToEndLatencyMs']
+    print(f"submitted {results['submitted']}  accepted {results['accepted']}  "
+          f"duplicates {results['duplicatesRejected']}  stored {results['stored']}  lost {results['lost']}")
+    print(f"submit p50 {results['submitLatencyMs']['p50']:.1f} ms  "
+          f"p99 {results['submitLatencyMs']['p99']:.1f} ms")
+    if e2e['count']:
+        print(f"end-to-end p50 {e2e['p50']:.1f} ms  p95 {e2e['p95']:.1f} ms  p99 {e2e['p99']:.1f} ms")
+    print(f"{results['storedPerSecond']:.1f} quotes/s  "
+          f"{results['awsCallsPerSubmission']:.2f} AWS calls/submission  "
+          f"{results['estimatedWriteUnits']} est. WCU")
+    for name, function in results['functions'].items():
+        print(f"{name}: {function['environments']} environment(s), {function['invocations']} invocations, "
+              f"peak concurrency {function['peakConcurrency']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Per-record parse cost of quote messages in the SQS consumers.
+
+Compares the pre-v1 consumer path with quoteMessage.decode. The pre-v1 path
+decodes the SQS body into the SNS envelope, decodes the envelope's Message, may
+decode string details again, then flattens DynamoDB-style details. The decode
+cases are:
+- a v1 message with raw delivery;
+- a v1 message still inside an SNS envelope;
+- a legacy full body in an envelope.
+
+Each is timed with the stdlib json module and, if installed, with orjson.
+Payloads are the frontend's real auto, home and life forms.
+
+Usage:
+    python scripts/message_parse_benchmark.py --records 100000 --output parse.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+
+# What script.js submits for each form
+BODIES = [
+    {'name': 'Jane Doe', 'email': 'jane.doe@example.com', 'insuranceType': 'auto',
+     'details': {'vehicleType': 'SUV', 'make': 'Toyota', 'model': 'RAV4', 'year': '2018',
+                 'drivingHistory': 'one accident'}},
+    {'name': 'Sam Lee', 'email': 'sam.lee@example.com', 'insuranceType': 'home',
+     'details': {'homeType': 'single-family', 'yearBuilt': '1994', 'constructionType': 'brick',
+                 'squareFootage': '2400', 'securitySystem': 'no'}},
+    {'name': 'Ana Ruiz', 'email': 'ana.ruiz@example.com', 'insuranceType': 'life',
+     'details': {'age': '52', 'gender': 'female', 'smoker': 'no', 'health': 'good',
+                 'coverage': '500000'}},
+]
+
+def sns_envelope(message):
+    # The notification SNS wraps a message in when raw delivery is off
+    return json.dumps({
+        'Type': 'Notification',
+        'MessageId': '2d8f7f9e-3b7a-5d0e-9a8a-1c2b3d4e5f60',
+        'TopicArn': 'arn:aws:sns:us-east-1:123456789012:Insurance-Quote-Requests',
+        'Message': message,
+        'Timestamp': '2025-01-01T12:00:00.000Z',
+        'SignatureVersion': '1',
+        'Signature': 'x' * 344,
+        'SigningCertURL': 'https://sns.us-east-1.amazonaws.com/SimpleNotificationService-0000.pem',
+        'UnsubscribeURL': 'https://sns.us-east-1.amazonaws.com/?Action=Unsubscribe&SubscriptionArn=x',
+        'MessageAttributes': {'insuranceType': {'Type': 'String', 'Value': 'auto'}}
+    })
+
+# The consumer's parse_record before the v1 format
+def legacy_parse(body):
+    sns_envelope = json.loads(body)
+    message = json.loads(sns_envelope['Message'])
+    raw_details = message.get('details', {})
+    if isinstance(raw_details, str):
+        raw_details = json.loads(raw_details)
+    if not all(isinstance(v, str) for v in raw_details.values()):
+        raw_details = {k: v.get('S', '') for k, v in raw_details.items()}
+    return message, raw_details
+
+def time_per_record(parse, bodies, records):
+    started = time.perf_counter()
+    for i in range(records):
+        parse(bodies[i % len(bodies)])
+    return (time.perf_counter() - started) / records * 1e6
+
+def use_stdlib(quoteMessage):
+    quoteMessage.loads = json.loads
+    quoteMessage.dumps = lambda obj: json.dumps(obj, separators=(',', ':'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    sys.path.insert(0, LAMBDA_DIR)
+    legacy_bodies = [sns_envelope(json.dumps(body)) for body in BODIES]
+
+    results = {'records': args.records, 'microsecondsPerRecord': {}}
+    timings = results['microsecondsPerRecord']
+    timings['legacy envelope, stdlib'] = time_per_record(legacy_parse, legacy_bodies, args.records)
+
+    import quoteMessage
+    backends = ['orjson', 'stdlib'] if quoteMessage.loads is not json.loads else ['stdlib']
+
+    for backend in backends:
+        if backend == 'stdlib':
+            use_stdlib(quoteMessage)
+        v1_bodies = [quoteMessage.encode(body) for body in BODIES]
+        timings[f'v1 raw, {backend}'] = time_per_record(quoteMessage.decode, v1_bodies, args.records)
+        timings[f'v1 in envelope, {backend}'] = time_per_record(
+            quoteMessage.decode, [sns_envelope(body) for body in v1_bodies], args.records)
+        timings[f'legacy envelope via decode, {backend}'] = time_per_record(
+            quoteMessage.decode, legacy_bodies, args.records)
+        results.setdefault('bytesPerRecord', {
+            'legacy envelope': sum(map(len, legacy_bodies)) / len(BODIES),
+            'v1 raw': sum(map(len, v1_bodies)) / len(BODIES),
+        })
+
+    baseline = timings['legacy envelope, stdlib']
+    for name, micros in timings.items():
+        print(f"{name:36} {micros:7.2f} us/record  {baseline / micros:5.2f}x")
+    for name, size in results['bytesPerRecord'].items():
+        print(f"{name:36} {size:7.0f} bytes")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
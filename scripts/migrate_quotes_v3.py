@@ -0,0 +1,137 @@
+"""Copy stored quotes from InsuranceQuoteRequestsV2 into the V3 history table.
+
+V2 keeps one item per email#insuranceType. V3 keys every quote by email and
+quoteKey (insuranceType#createdAt#quoteId). Segments of the V2 table are
+scanned in parallel with Segment/TotalSegments. Each stored quote is written
+with BatchWriteItem, keeping every attribute except compositeKey, and
+in-flight markers and premium-cache items are skipped. The quoteKey is built
+from the item's own createdAt and quoteId, so re-running the migration
+rewrites the same items instead of adding new ones.
+
+Migrated items carry migratedFrom. The summary stream skips them, because the
+quote summaries already counted them from V2. A stack that never ran
+scripts/backfill_summaries.py should run it against V3 once this is done.
+
+Usage:
+    python scripts/migrate_quotes_v3.py --segments 8 --rate 200
+    python scripts/migrate_quotes_v3.py --dry-run
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import awsClients  # noqa: E402
+import quoteConsumer  # noqa: E402
+import quoteSummaryStream  # noqa: E402
+
+SOURCE_TABLE = 'InsuranceQuoteRequestsV2'
+BATCH_SIZE = 25
+MAX_BATCH_ATTEMPTS = 8
+
+def v3_item(item):
+    # Quotes stored before quoteId existed get an id derived from their V2 key
+    quote_id = item.get('quoteId', {}).get('S') or str(uuid.uuid5(uuid.NAMESPACE_URL, item['compositeKey']['S']))
+    migrated = {name: value for name, value in item.items() if name != 'compositeKey'}
+    migrated['quoteId'] = {'S': quote_id}
+    migrated['quoteKey'] = {'S': quoteConsumer.quote_key(
+        item['insuranceType']['S'], item['createdAt']['S'], quote_id)}
+    migrated['migratedFrom'] = {'S': SOURCE_TABLE}
+    return migrated
+
+class Migration:
+    def __init__(self, args):
+        self.args = args
+        self.dynamodb = awsClients.get_client('dynamodb')
+        self.lock = threading.Lock()
+        self.counts = {'scanned': 0, 'migrated': 0, 'skipped': 0}
+        # Items written per second across all segments; 0 means unlimited
+        self.interval = 1 / args.rate if args.rate else 0
+        self.next_write = time.monotonic()
+
+    def count(self, name, value):
+        with self.lock:
+            self.counts[name] += value
+
+    def throttle(self, items):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_write)
+            self.next_write = start + items * self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def write(self, items):
+        self.throttle(len(items))
+        request = {self.args.target: [{'PutRequest': {'Item': item}} for item in items]}
+        for attempt in range(MAX_BATCH_ATTEMPTS):
+            request = self.dynamodb.batch_write_item(RequestItems=request).get('UnprocessedItems')
+            if not request:
+                return
+            time.sleep(0.05 * 2 ** attempt)
+        raise RuntimeError(f"UnprocessedItems left after {MAX_BATCH_ATTEMPTS} attempts")
+
+    def migrate_segment(self, segment):
+        params = {
+            'TableName': self.args.source,
+            'Segment': segment,
+            'TotalSegments': self.args.segments,
+        }
+        pending = []
+        while True:
+            response = self.dynamodb.scan(**params)
+            items = response['Items']
+            quotes = [v3_item(item) for item in items if quoteSummaryStream.is_stored_quote(item)]
+            self.count('scanned', len(items))
+            self.count('skipped', len(items) - len(quotes))
+
+            pending.extend(quotes)
+            while len(pending) >= BATCH_SIZE:
+                self.flush(pending[:BATCH_SIZE])
+                del pending[:BATCH_SIZE]
+
+            if 'LastEvaluatedKey' not in response:
+                break
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        if pending:
+            self.flush(pending)
+
+    def flush(self, items):
+        if not self.args.dry_run:
+            self.write(items)
+        self.count('migrated', len(items))
+
+    def run(self):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.segments) as pool:
+            for future in [pool.submit(self.migrate_segment, segment)
+                           for segment in range(self.args.segments)]:
+                future.result()
+        return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=SOURCE_TABLE)
+    parser.add_argument('--target', default=quoteConsumer.TABLE_NAME)
+    parser.add_argument('--segments', type=int, default=8, help='parallel scan segments (one thread each)')
+    parser.add_argument('--rate', type=float, default=0, help='max items written per second (0 = unlimited)')
+    parser.add_argument('--dry-run', action='store_true', help='scan and convert without writing')
+    args = parser.parse_args()
+
+    migration = Migration(args)
+    elapsed = migration.run()
+    counts = migration.counts
+    action = 'Would migrate' if args.dry_run else 'Migrated'
+    print(f"Scanned {counts['scanned']}  {action.lower()} {counts['migrated']}  "
+          f"skipped {counts['skipped']}  in {elapsed:.1f}s with {args.segments} segments")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Check multi-quote submissions: constant AWS calls, per-quote errors and parallel duplicates, against moto.
+
+submitQuote.submit_many handles {"quotes": [...]} requests. All AWS calls go
+through loadtest.CountingClient. The script checks:
+- constant calls: 1, 3 and 10 fresh quotes each take one TransactWriteItems
+  and one PublishBatch;
+- taken keys: with 2 of 10 types already locked, the request takes two
+  TransactWriteItems (the retry reserves the free 8) and one PublishBatch,
+  the 2 are reported as duplicates and the 8 are submitted;
+- a quote that cannot be rated: the request still answers 200, that quote
+  has an error result and no lock, the others are submitted, and the
+  corrected quote goes through on its own;
+- a quote with its own email: that quote has an error result and takes no
+  lock under either email, and the others are submitted;
+- --requests identical 3-quote requests sent in parallel: each type is
+  submitted exactly once across all of them.
+The script exits non-zero if any check fails.
+
+moto applies each request on the calling thread without a per-item lock.
+DynamoDB serializes transactions on the items they touch, so the table client
+here runs one transact_write_items at a time.
+
+Requires moto (pip install "moto[dynamodb,sns,sqs]").
+
+Usage:
+    python scripts/multi_quote_check.py --requests 50
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import loadtest  # noqa: E402
+
+REGION = 'us-east-1'
+# Types with no consumer are rated 0 and filtered out by the subscriptions,
+# which is enough to fill a 10-quote request with distinct keys
+TYPES = ('auto', 'home', 'life', 'boat', 'pet', 'travel', 'renters', 'flood', 'umbrella', 'bike')
+
+class SerializedTransactions:
+    """Wraps the DynamoDB client; one transact_write_items at a time."""
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def transact_write_items(self, **kwargs):
+        with self._lock:
+            return self._client.transact_write_items(**kwargs)
+
+def quote(insurance_type, **details):
+    choices = loadtest.DETAIL_CHOICES.get(insurance_type, {})
+    return {'insuranceType': insurance_type,
+            'details': {**{field: values[0] for field, values in choices.items()}, **details}}
+
+def submit(submitQuote, email, quotes):
+    response = submitQuote.lambda_handler({'body': json.dumps({'name': 'Multi Check', 'email': email,
+                                                               'quotes': quotes})}, None)
+    if response['statusCode'] != 200:
+        return response['statusCode'], []
+    return 200, json.loads(response['body'])['results']
+
+def outcome(result):
+    if result.get('submitted'):
+        return 'submitted'
+    return 'duplicate' if result.get('duplicate') else 'error'
+
+def run_checks(args, stats):
+    import awsClients
+    import idempotency
+    import submitQuote
+
+    dynamodb = awsClients._clients['dynamodb']
+    results = []
+
+    def check(name, condition, detail):
+        results.append((name, bool(condition), detail))
+
+    def calls_during(run):
+        with stats['lock']:
+            stats['calls'].clear()
+        value = run()
+        with stats['lock']:
+            return value, dict(stats['calls'])
+
+    def lock_held(email, insurance_type):
+        return 'Item' in dynamodb.get_item(TableName=loadtest.TABLE_NAME, ConsistentRead=True,
+                                           Key=idempotency.lock_key(f'{email}#{insurance_type}'))
+
+    for count in (1, 3, 10):
+        email = f'calls-{count}@check.local'
+        (status, answers), calls = calls_during(
+            lambda: submit(submitQuote, email, [quote(t) for t in TYPES[:count]]))
+        outcomes = [outcome(result) for result in answers]
+        check(f'{count} quote(s): constant calls',
+              status == 200 and outcomes == ['submitted'] * count
+              and calls == {'dynamodb.transact_write_items': 1, 'sns.publish_batch': 1},
+              f"status {status}, {outcomes.count('submitted')}/{count} submitted, calls {calls}")
+
+    email = 'taken@check.local'
+    submit(submitQuote, email, [quote('home'), quote('pet')])
+    (status, answers), calls = calls_during(lambda: submit(submitQuote, email, [quote(t) for t in TYPES]))
+    outcomes = [outcome(result) for result in answers]
+    expected = ['duplicate' if t in ('home', 'pet') else 'submitted' for t in TYPES]
+    check('taken keys', status == 200 and outcomes == expected
+          and calls == {'dynamodb.transact_write_items': 2, 'sns.publish_batch': 1},
+          f"status {status}, outcomes {outcomes}, calls {calls}")
+
+    email = 'unrateable@check.local'
+    status, answers = submit(submitQuote, email, [quote('auto', year='nineteen'), quote('home'), quote('life')])
+    outcomes = [outcome(result) for result in answers]
+    held = lock_held(email, 'auto')
+    retry_status, retry = submit(submitQuote, email, [quote('auto')])
+    check('quote that cannot be rated',
+          status == 200 and outcomes == ['error', 'submitted', 'submitted'] and not held
+          and retry_status == 200 and [outcome(result) for result in retry] == ['submitted'],
+          f"status {status}, outcomes {outcomes}, auto lock {'held' if held else 'free'}, "
+          f"retry {[outcome(result) for result in retry]}")
+
+    email = 'shared@check.local'
+    other = 'other@check.local'
+    status, answers = submit(submitQuote, email, [dict(quote('auto'), email=other), quote('home')])
+    outcomes = [outcome(result) for result in answers]
+    held = [address for address in (email, other) if lock_held(address, 'auto')]
+    check('quote with its own email', status == 200 and outcomes == ['error', 'submitted'] and not held,
+          f"status {status}, outcomes {outcomes}, auto locks held for {held or 'nobody'}")
+
+    email = 'parallel@check.local'
+    quotes = [quote(t) for t in ('auto', 'home', 'life')]
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        responses = list(pool.map(lambda _: submit(submitQuote, email, quotes), range(args.requests)))
+    submitted = {}
+    for status, answers in responses:
+        for result in answers:
+            if result.get('submitted'):
+                submitted[result['insuranceType']] = submitted.get(result['insuranceType'], 0) + 1
+    statuses = {status for status, _ in responses}
+    check('parallel identical requests', statuses == {200} and submitted == {'auto': 1, 'home': 1, 'life': 1},
+          f"statuses {sorted(statuses)}, submitted {submitted} across {args.requests} requests")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50, help='identical requests sent in parallel')
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', REGION)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+    os.environ['DYNAMODB_TABLE'] = loadtest.TABLE_NAME
+
+    from moto import mock_aws
+
+    # The handler prints one line per quote it cannot rate or reserve
+    stdout = sys.stdout
+    with mock_aws(), open(os.devnull, 'w') as quiet:
+        topic_arn, _, _ = loadtest.setup_stack(REGION)
+        os.environ['SNS_TOPIC_ARN'] = topic_arn
+        import awsClients
+
+        stats = {'lock': threading.Lock(), 'calls': {}, 'writeUnits': 0}
+        awsClients._clients['dynamodb'] = loadtest.CountingClient(
+            SerializedTransactions(awsClients.get_client('dynamodb')), 'dynamodb', stats)
+        awsClients._clients['sns'] = loadtest.CountingClient(awsClients.get_client('sns'), 'sns', stats)
+        sys.stdout = quiet
+        try:
+            results = run_checks(args, stats)
+        finally:
+            sys.stdout = stdout
+
+    for name, passed, detail in results:
+        print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    failed = [name for name, passed, _ in results if not passed]
+    if failed:
+        sys.exit(f"{len(failed)} check(s) failed: {', '.join(failed)}")
+
+if __name__ == '__main__':
+    main()
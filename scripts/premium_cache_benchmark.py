@@ -0,0 +1,129 @@
+"""Check that premiumCache's bucketed keys are exact, and time the cache on a skewed replay.
+
+Exactness: premiumCache.cached_rate must agree with rating.rate on two sets of
+inputs, giving the same premium or raising the same exception type:
+- every threshold-edge combination from scripts/rating_parity.py;
+- every integer within --sweep of each rule threshold, so every bucket edge
+  is tested on both sides.
+Each set is rated twice through the cache, once to fill it and once from it.
+
+Replay: --quotes requests drawn from --distinct applicants with a Zipf-like
+popularity (weight 1 / rank ** --skew). The replay times:
+- rating.rate, which is also premiumCache.rate while the cache is disabled;
+- premiumCache.feature_key on its own;
+- cached_rate with a PREMIUM_CACHE_SIZE LRU, reporting the hit rate.
+
+Usage:
+    python scripts/premium_cache_benchmark.py --quotes 200000 --distinct 20000 --skew 1.1
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import rating  # noqa: E402
+import rating_parity  # noqa: E402
+
+STRING_CHOICES = {
+    'vehicleType': ['sedan', 'SUV', 'suv', 'truck', 'Coupe'],
+    'drivingHistory': ['clean', 'one accident', 'Minor ACCIDENT', 'speeding ticket'],
+    'securitySystem': ['yes', 'no', 'No', 'YES'],
+    'smoker': ['yes', 'no', 'Yes'],
+    'health': ['good', 'poor', 'Excellent', 'POOR'],
+}
+INTEGER_RANGES = {'year': (1990, 2025), 'yearBuilt': (1900, 2025), 'squareFootage': (500, 6000),
+                  'age': (18, 90)}
+
+def outcome(rate, insurance_type, details):
+    try:
+        return rate(insurance_type, details)
+    except Exception as e:
+        return type(e).__name__
+
+def threshold_sweep(width):
+    for insurance_type, table in rating.RULES.items():
+        for rule in table['surcharges']:
+            if rule['op'] in ('greater_than', 'less_than'):
+                for value in range(rule['value'] - width, rule['value'] + width + 1):
+                    yield insurance_type, {rule['field']: value}
+                    yield insurance_type, {rule['field']: str(value)}
+
+def check_exactness(premiumCache, sweep):
+    cases = [(insurance_type, details) for insurance_type in rating_parity.BASELINE_RATERS
+             for details in rating_parity.edge_cases(insurance_type)]
+    cases.extend(threshold_sweep(sweep))
+    mismatches = []
+    for _ in range(2):
+        for insurance_type, details in cases:
+            expected = outcome(rating.rate, insurance_type, details)
+            actual = outcome(premiumCache.cached_rate, insurance_type, details)
+            if expected != actual:
+                mismatches.append((insurance_type, details, expected, actual))
+    return len(cases), mismatches
+
+def applicants(count, rng):
+    pool = []
+    for _ in range(count):
+        insurance_type = rng.choice(sorted(rating.RULES))
+        details = {}
+        for rule in rating.RULES[insurance_type]['surcharges']:
+            field = rule['field']
+            if field in INTEGER_RANGES:
+                details[field] = str(rng.randint(*INTEGER_RANGES[field]))
+            else:
+                details[field] = rng.choice(STRING_CHOICES[field])
+        pool.append((insurance_type, details))
+    return pool
+
+def replay(quotes, distinct, skew, seed):
+    rng = random.Random(seed)
+    pool = applicants(distinct, rng)
+    weights = list(itertools.accumulate(1 / rank ** skew for rank in range(1, distinct + 1)))
+    return rng.choices(pool, cum_weights=weights, k=quotes)
+
+def timed(run):
+    started = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quotes', type=int, default=200_000)
+    parser.add_argument('--distinct', type=int, default=20_000, help='distinct applicants in the replay')
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of applicant popularity')
+    parser.add_argument('--sweep', type=int, default=600, help='integers checked on each side of a threshold')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault('PREMIUM_CACHE_SIZE', '1024')
+    import premiumCache
+
+    cases, mismatches = check_exactness(premiumCache, args.sweep)
+    for insurance_type, details, expected, actual in mismatches[:20]:
+        print(f"❌ {insurance_type} {details}: rating {expected}, cache {actual}")
+    if mismatches:
+        sys.exit(f"{len(mismatches)} of {cases * 2} lookups differ")
+    print(f"✅ cached_rate matches rating.rate on {cases} cases, cold and warm")
+
+    quotes = replay(args.quotes, args.distinct, args.skew, args.seed)
+    premiumCache.clear()
+    rate, feature_key, cached_rate = rating.rate, premiumCache.feature_key, premiumCache.cached_rate
+    expected, rate_seconds = timed(lambda: [rate(t, d) for t, d in quotes])
+    _, key_seconds = timed(lambda: [feature_key(t, d) for t, d in quotes])
+    premiums, cached_seconds = timed(lambda: [cached_rate(t, d) for t, d in quotes])
+    if premiums != expected:
+        sys.exit("cached_rate disagrees with rating.rate on the replay")
+
+    stats = premiumCache.stats()
+    print(f"rating.rate  {args.quotes / rate_seconds:>10,.0f} quotes/s")
+    print(f"feature_key  {args.quotes / key_seconds:>10,.0f} keys/s")
+    print(f"cached_rate  {args.quotes / cached_seconds:>10,.0f} quotes/s  "
+          f"(hit rate {stats['hitRate']:.1%}, {stats['evictions']} evictions, LRU {premiumCache.CACHE_SIZE})")
+
+if __name__ == '__main__':
+    main()
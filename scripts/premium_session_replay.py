@@ -0,0 +1,210 @@
+"""Replay form-editing sessions against calculatePremium and count API calls.
+
+Each session is a timed list of form edits and "Get Instant Quote" clicks, e.g.
+one event per keystroke in a text field and one per select change, as a user
+fills in the quote form, prices it, and tweaks it to compare prices. script.js
+asks for an estimate only on a click. The same sessions are counted under:
+- clicks: one request per click, as script.js did before estimates were
+  cacheable (the baseline);
+- + memo: repeated canonical queries within the page are answered from
+  script.js's premiumMemo;
+- + HTTP cache: GET responses are reused by the browser for
+  PREMIUM_MAX_AGE_SECONDS, across page loads;
+- auto-estimate: for comparison, clicks plus an estimate whenever the user
+  pauses for PREMIUM_DEBOUNCE_MS with a complete form, with the memo and the
+  HTTP cache. Backend calls only; script.js does not do this.
+
+Requests that reach the backend under + HTTP cache are run through
+calculatePremium.lambda_handler as GET events. Each premium is checked against
+the POST path.
+
+Usage:
+    python scripts/premium_session_replay.py --seed 7 --output replay.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from urllib.parse import parse_qsl, urlencode
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+
+# Pause before an auto-estimate in the comparison behaviour
+PREMIUM_DEBOUNCE_MS = 400
+# Keep in step with frontend/script.js
+REQUIRED_FIELDS = {
+    'auto': ('vehicleType', 'make', 'model', 'year', 'drivingHistory'),
+    'life': ('age', 'gender', 'smoker', 'health', 'coverage'),
+    'home': ('homeType', 'yearBuilt', 'constructionType', 'squareFootage', 'securitySystem'),
+}
+
+# (action, field, value): 'type' enters text one keystroke at a time, 'erase'
+# deletes that many characters, 'select' picks an option, 'click' asks for an
+# estimate, 'pause' waits value ms
+SESSIONS = {
+    'auto': [
+        ('select', 'vehicleType', 'SUV'), ('type', 'make', 'Toyota'), ('type', 'model', 'RAV4'),
+        ('select', 'year', '2021'), ('type', 'drivingHistory', 'one accident in 2019'),
+        ('click', None, None), ('pause', None, 3000), ('select', 'vehicleType', 'Sedan'),
+        ('click', None, None), ('pause', None, 2000), ('select', 'vehicleType', 'SUV'),
+        ('select', 'year', '2023'), ('click', None, None), ('pause', None, 1500),
+        ('select', 'year', '2021'), ('erase', 'drivingHistory', 5), ('type', 'drivingHistory', ' 2019'),
+        ('click', None, None),
+    ],
+    'home': [
+        ('type', 'homeType', 'Single family'), ('select', 'yearBuilt', '2020'),
+        ('type', 'constructionType', 'Brick'), ('type', 'squareFootage', '2400'),
+        ('select', 'securitySystem', 'no'), ('click', None, None), ('pause', None, 2500),
+        ('select', 'securitySystem', 'yes'), ('click', None, None), ('pause', None, 2000),
+        ('erase', 'squareFootage', 4), ('type', 'squareFootage', '1800'), ('click', None, None),
+        ('pause', None, 2000), ('erase', 'squareFootage', 4), ('type', 'squareFootage', '2400'),
+        ('click', None, None),
+    ],
+    'life': [
+        ('type', 'age', '52'), ('select', 'gender', 'female'), ('select', 'smoker', 'no'),
+        ('type', 'health', 'good'), ('select', 'coverage', '250000'), ('click', None, None),
+        ('pause', None, 3000), ('select', 'coverage', '500000'), ('click', None, None),
+        ('pause', None, 2000), ('select', 'smoker', 'yes'), ('click', None, None),
+        ('pause', None, 2000), ('select', 'smoker', 'no'), ('erase', 'age', 2), ('type', 'age', '49'),
+        ('click', None, None), ('pause', None, 1500), ('erase', 'age', 2), ('type', 'age', '52'),
+        ('click', None, None),
+    ],
+}
+
+def edit_events(plan, rng):
+    """Expand a session plan into (time_ms, form_snapshot, is_click) events."""
+    now = 0
+    form = {}
+    events = []
+    for action, field, value in plan:
+        if action == 'pause':
+            now += value
+            continue
+        if action == 'click':
+            events.append((now, dict(form), True))
+            continue
+        # Moving to another field takes a moment
+        now += rng.randint(600, 1500)
+        if action == 'select':
+            form[field] = value
+            events.append((now, dict(form), False))
+        elif action == 'type':
+            for i, char in enumerate(value):
+                if i:
+                    now += rng.randint(80, 220)
+                form[field] = form.get(field, '') + char
+                events.append((now, dict(form), False))
+        elif action == 'erase':
+            for i in range(value):
+                if i:
+                    now += rng.randint(60, 120)
+                form[field] = form[field][:-1]
+                events.append((now, dict(form), False))
+    return events
+
+def complete(insurance_type, form):
+    return all(form.get(field) for field in REQUIRED_FIELDS[insurance_type])
+
+def premium_query(insurance_type, form):
+    # script.js premiumQuery(): type first, then sorted fields, trimmed and lower-cased
+    return urlencode([('insuranceType', insurance_type)] +
+                     [(field, str(form[field]).strip().lower()) for field in sorted(form)])
+
+def requested_queries(insurance_type, events):
+    """Queries asked for on clicks alone, and with auto-estimates on pauses, in order."""
+    clicks = []
+    auto = []
+    for i, (at, form, is_click) in enumerate(events):
+        if not complete(insurance_type, form):
+            continue
+        query = premium_query(insurance_type, form)
+        if is_click:
+            clicks.append(query)
+            auto.append(query)
+            continue
+        next_at = events[i + 1][0] if i + 1 < len(events) else None
+        if next_at is None or next_at - at >= PREMIUM_DEBOUNCE_MS:
+            auto.append(query)
+    return clicks, auto
+
+def backend_queries(queries, http_cache):
+    """Splits one page load's queries into those asked of the API (after the
+    memo) and those that reach the backend (after the HTTP cache)."""
+    memo = []
+    backend = []
+    for query in queries:
+        # premiumMemo lives as long as the page
+        if query in memo:
+            continue
+        memo.append(query)
+        if query in http_cache:
+            continue
+        http_cache.add(query)
+        backend.append(query)
+    return memo, backend
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--visits', type=int, default=2,
+                        help='page loads per session; later visits re-enter the same data')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+    sys.path.insert(0, LAMBDA_DIR)
+    import calculatePremium
+    import rating
+
+    rng = random.Random(args.seed)
+    http_cache = set()
+    auto_cache = set()
+    results = {'debounceMs': PREMIUM_DEBOUNCE_MS, 'sessions': {}}
+    totals = {'edits': 0, 'clicks': 0, 'memo': 0, 'httpCache': 0, 'autoEstimate': 0}
+
+    for insurance_type, plan in SESSIONS.items():
+        counts = {'edits': 0, 'clicks': 0, 'memo': 0, 'httpCache': 0, 'autoEstimate': 0}
+        for _ in range(args.visits):
+            events = edit_events(plan, rng)
+            clicks, auto = requested_queries(insurance_type, events)
+            memo, backend = backend_queries(clicks, http_cache)
+            counts['edits'] += sum(1 for event in events if not event[2])
+            counts['clicks'] += len(clicks)
+            counts['memo'] += len(memo)
+            counts['httpCache'] += len(backend)
+            counts['autoEstimate'] += len(backend_queries(auto, auto_cache)[1])
+
+            for query in backend:
+                params = dict(parse_qsl(query))
+                response = calculatePremium.lambda_handler({
+                    'routeKey': 'GET /calculatePremium',
+                    'requestContext': {'http': {'method': 'GET'}},
+                    'queryStringParameters': params,
+                }, None)
+                body = json.loads(response['body'])
+                insurance = params.pop('insuranceType')
+                expected = rating.rate(insurance, params)
+                if response['statusCode'] != 200 or body['premiumAmount'] != expected:
+                    sys.exit(f"Unexpected response for {query}: {response}")
+
+        results['sessions'][insurance_type] = counts
+        for name, value in counts.items():
+            totals[name] += value
+    results['total'] = totals
+
+    print(f"{'session':8} {'edits':>6} {'clicks':>7} {'+ memo':>7} {'+ HTTP cache':>13} {'auto-estimate':>14}")
+    for name, counts in list(results['sessions'].items()) + [('total', totals)]:
+        print(f"{name:8} {counts['edits']:6} {counts['clicks']:7} {counts['memo']:7} "
+              f"{counts['httpCache']:13} {counts['autoEstimate']:14}")
+    avoided = totals['clicks'] - totals['httpCache']
+    print(f"Backend invocations avoided: {avoided} of {totals['clicks']} clicks "
+          f"({avoided / totals['clicks']:.0%}); auto-estimate would make {totals['autoEstimate']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Read cost and latency of a dashboard load as the quote table grows, against a local DynamoDB stand-in.
+
+The table is InsuranceQuoteRequestsV3 as in template.yaml (partition key
+email, sort key quoteKey, CreatedAtIndex). --probe-users users get --history
+quotes each. Filler users, also with --history quotes each, then grow the
+table through every size in --sizes. At each size, each probe user's
+dashboard is read --loads times through getUserQuotes.query_user_quotes:
+- history: the first page of the whole history, newest first, on CreatedAtIndex;
+- type: the first page of one insurance type, a quoteKey range on the table.
+For each it reports the items read (ScannedCount), the read units, and the
+p50/p95 latency.
+
+Read units: with --endpoint-url, the ConsumedCapacity the endpoint reports.
+moto reports a fixed value, so in-process they are computed the way DynamoDB
+bills an eventually consistent Query: half a unit per started 4 KB of the
+items read on a page. The read units of the access path the query replaced
+are computed alongside: one Scan of the whole table, every page, filtered on
+the user's email. That is half a unit per 4 KB of everything stored.
+
+Stand-ins:
+- --endpoint-url points at DynamoDB Local
+  (docker run -p 8000:8000 amazon/dynamodb-local), which stores each partition
+  in key order like DynamoDB. Use it for latency.
+- Without it the script runs in-process against moto. moto answers every
+  Query by walking the whole table, so its latency grows with the table even
+  though the items and read units do not. moto holds about 1.5 GB per 300k
+  items (about 5 GB for 1M); size --sizes to the memory available.
+
+Usage:
+    python scripts/query_scaling_benchmark.py --sizes 10000,100000,1000000 --output query_scaling.json
+    python scripts/query_scaling_benchmark.py --endpoint-url http://localhost:8000
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import loadtest  # noqa: E402
+
+REGION = 'us-east-1'
+TYPES = ('auto', 'home', 'life')
+# BatchWriteItem accepts at most 25 put requests per call
+BATCH_WRITE_LIMIT = 25
+# Eventually consistent reads: half a read unit per 4 KB
+READ_UNIT_BYTES = 4096
+
+class CapacityClient:
+    """Wraps the DynamoDB client; asks every query for its consumed capacity and keeps the last response."""
+
+    def __init__(self, client):
+        self._client = client
+        self.last = None
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def query(self, **kwargs):
+        self.last = self._client.query(ReturnConsumedCapacity='TOTAL', **kwargs)
+        return self.last
+
+def quote_item(email, n, rng):
+    insurance_type = TYPES[n % len(TYPES)]
+    created_at = f'2025-{n % 12 + 1:02d}-{n % 28 + 1:02d}T{n % 24:02d}:00:{rng.randrange(60):02d}'
+    details = {field: {'S': rng.choice(values)} for field, values in loadtest.DETAIL_CHOICES[insurance_type].items()}
+    quote_id = f'{email}-{n}'
+    return {
+        'email': {'S': email},
+        'quoteKey': {'S': f'{insurance_type}#{created_at}#{quote_id}'},
+        'quoteId': {'S': quote_id},
+        'insuranceType': {'S': insurance_type},
+        'name': {'S': 'Scaling Benchmark'},
+        'details': {'M': details},
+        'premiumAmount': {'N': str(rng.randrange(300, 2000))},
+        'createdAt': {'S': created_at},
+    }
+
+def write_users(dynamodb, emails, history, rng):
+    """Writes history quotes for each email; returns the bytes written."""
+    written = 0
+    requests = []
+    for email in emails:
+        for n in range(history):
+            item = quote_item(email, n, rng)
+            written += loadtest.item_size(item)
+            requests.append({'PutRequest': {'Item': item}})
+    for start in range(0, len(requests), BATCH_WRITE_LIMIT):
+        pending = {loadtest.TABLE_NAME: requests[start:start + BATCH_WRITE_LIMIT]}
+        while pending:
+            pending = dynamodb.batch_write_item(RequestItems=pending).get('UnprocessedItems')
+    return written
+
+def read_units(response, measured):
+    if measured:
+        return response['ConsumedCapacity']['CapacityUnits']
+    size = sum(loadtest.item_size(item) for item in response['Items'])
+    return max(1, math.ceil(size / READ_UNIT_BYTES)) * 0.5
+
+def measure(client, probes, loads, measured):
+    import getUserQuotes
+
+    results = {}
+    for path, insurance_type in (('history', None), ('type', 'home')):
+        seconds, scanned, units = [], [], []
+        for _ in range(loads):
+            for email in probes:
+                started = time.perf_counter()
+                getUserQuotes.query_user_quotes(email, getUserQuotes.DEFAULT_PAGE_SIZE,
+                                                insurance_type=insurance_type)
+                seconds.append(time.perf_counter() - started)
+                scanned.append(client.last['ScannedCount'])
+                units.append(read_units(client.last, measured))
+        latency = loadtest.latency_summary(seconds)
+        results[path] = {'itemsRead': sum(scanned) / len(scanned), 'readUnits': sum(units) / len(units),
+                         'p50Ms': latency['p50'], 'p95Ms': latency['p95']}
+    return results
+
+def run(args):
+    import boto3
+
+    import awsClients
+
+    rng = random.Random(args.seed)
+    dynamodb = boto3.client('dynamodb', region_name=REGION, endpoint_url=args.endpoint_url)
+    loadtest.create_quote_table(dynamodb)
+    client = CapacityClient(dynamodb)
+    awsClients._clients['dynamodb'] = client
+
+    probes = [f'probe{n}@scaling.local' for n in range(args.probe_users)]
+    stored_bytes = write_users(dynamodb, probes, args.history, rng)
+    items = len(probes) * args.history
+    filler = 0
+    rows = []
+    for size in args.sizes:
+        users = max(0, size - items) // args.history
+        started = time.perf_counter()
+        stored_bytes += write_users(dynamodb, [f'filler{filler + n}@scaling.local' for n in range(users)],
+                                    args.history, rng)
+        filler += users
+        items += users * args.history
+        load_seconds = time.perf_counter() - started
+        row = {'items': items, 'loadSeconds': round(load_seconds, 1),
+               'scanReadUnits': math.ceil(stored_bytes / READ_UNIT_BYTES) * 0.5,
+               **measure(client, probes, args.loads, args.endpoint_url is not None)}
+        rows.append(row)
+        print(f"{items:,} items loaded in {load_seconds:.0f}s", file=sys.stderr)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=lambda text: [int(value) for value in text.split(',')],
+                        default=[10_000, 100_000, 1_000_000], help='table sizes in items')
+    parser.add_argument('--probe-users', type=int, default=5, help='users whose dashboard loads are measured')
+    parser.add_argument('--history', type=int, default=20, help='quotes per user')
+    parser.add_argument('--loads', type=int, default=2, help='dashboard loads per probe user and size')
+    parser.add_argument('--endpoint-url', help='DynamoDB Local or another DynamoDB-compatible endpoint')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', REGION)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+    os.environ['DYNAMODB_TABLE'] = loadtest.TABLE_NAME
+
+    if args.endpoint_url:
+        rows = run(args)
+    else:
+        from moto import mock_aws
+
+        with mock_aws():
+            rows = run(args)
+
+    print(f"{'items':>9}  {'history reads':>13} {'RU':>5} {'p50 ms':>8} {'p95 ms':>8}  "
+          f"{'type reads':>10} {'RU':>5} {'p50 ms':>8} {'p95 ms':>8}  {'scan path RU':>12}")
+    for row in rows:
+        history, by_type = row['history'], row['type']
+        print(f"{row['items']:>9,}  {history['itemsRead']:>13.0f} {history['readUnits']:>5.2f} "
+              f"{history['p50Ms']:>8.2f} {history['p95Ms']:>8.2f}  {by_type['itemsRead']:>10.0f} "
+              f"{by_type['readUnits']:>5.2f} {by_type['p50Ms']:>8.2f} {by_type['p95Ms']:>8.2f}  "
+              f"{row['scanReadUnits']:>12,.1f}")
+    if not args.endpoint_url:
+        print("moto walks the whole table for every Query; use --endpoint-url for latency")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': rows}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+"""Portfolio pricing reports over every stored quote.
+
+The quote table is read with a DynamoDB parallel scan. It is split into
+--segments (Segment/TotalSegments), which a pool of --workers processes scans.
+Each worker turns its rows into NumPy columns: insurance type, premium, day,
+and one flag per rating.RULES surcharge. The parent aggregates the columns
+once the scan is done:
+- premium_by_type: count, total, mean and percentiles per insurance type;
+- premium_histogram: quotes per --bucket wide premium band and type;
+- surcharge_rates: how often each surcharge applies, per type;
+- quotes_per_day: quotes stored per day and type.
+Each report is written to --output-dir as CSV, or as Parquet with
+--format parquet (pip install pyarrow).
+
+--rcu caps the read capacity the whole job consumes per second. The cap is
+split evenly across the workers, and each worker paces itself on the
+ConsumedCapacity its pages report. Against production, keep it well under the
+table's spare capacity.
+
+Requires numpy.
+
+Usage:
+    python scripts/quote_analytics.py --segments 16 --workers 8 --rcu 500 --output-dir reports
+    python scripts/quote_analytics.py --table InsuranceQuoteRequestsV2 --format parquet
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import awsClients  # noqa: E402
+import quoteSummaryStream  # noqa: E402
+import rating  # noqa: E402
+
+TYPES = tuple(sorted(rating.INSURANCE_TYPES))
+TYPE_CODES = {insurance_type: code for code, insurance_type in enumerate(TYPES)}
+
+# Surcharge flags are one column per rule position; types with fewer rules leave the rest False
+FLAG_COLUMNS = max(len(rules['surcharges']) for rules in rating.RULES.values())
+
+PERCENTILES = (50, 90, 99)
+
+REPORTS = ('premium_by_type', 'premium_histogram', 'surcharge_rates', 'quotes_per_day')
+
+def empty_columns():
+    return {
+        'type': np.empty(0, dtype=np.int8),
+        'premium': np.empty(0, dtype=np.float64),
+        'day': np.empty(0, dtype='datetime64[D]'),
+        'flags': np.empty((0, FLAG_COLUMNS), dtype=bool),
+    }
+
+# One row per stored quote, or None for quotes the rules cannot read
+def quote_row(item):
+    insurance_type = item['insuranceType']['S']
+    details = awsClients.from_attribute(item['details']) if 'details' in item else {}
+    try:
+        hits = rating.features(insurance_type, details)
+    except (ValueError, TypeError, AttributeError):
+        return None
+    flags = hits + (False,) * (FLAG_COLUMNS - len(hits))
+    return TYPE_CODES[insurance_type], float(item['premiumAmount']['N']), item['createdAt']['S'][:10], flags
+
+def quote_columns(rows):
+    if not rows:
+        return empty_columns()
+    types, premiums, days, flags = zip(*rows)
+    return {
+        'type': np.array(types, dtype=np.int8),
+        'premium': np.array(premiums, dtype=np.float64),
+        'day': np.array(days, dtype='datetime64[D]'),
+        'flags': np.array(flags, dtype=bool).reshape(len(rows), FLAG_COLUMNS),
+    }
+
+def merge_columns(parts):
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+# Scan one segment (runs in a worker process). rcu_per_second of 0 means unpaced.
+# row_of turns a stored quote into a row (None if unreadable); columns_of turns
+# the segment's rows into what the worker sends back. Both must be module-level
+# functions so the pool can pickle them.
+def scan_segment(table_name, segment, total_segments, rcu_per_second, row_of=quote_row, columns_of=quote_columns):
+    dynamodb = awsClients.get_client('dynamodb')
+    params = {
+        'TableName': table_name,
+        'Segment': segment,
+        'TotalSegments': total_segments,
+        'ProjectionExpression': 'email, #type, premiumAmount, createdAt, details',
+        'ExpressionAttributeNames': {'#type': 'insuranceType'},
+        'ReturnConsumedCapacity': 'TOTAL',
+    }
+    rows = []
+    stats = {'scanned': 0, 'skipped': 0, 'invalid': 0, 'consumedRcu': 0.0, 'pages': 0}
+    started = time.monotonic()
+    while True:
+        response = dynamodb.scan(**params)
+        stats['pages'] += 1
+        stats['scanned'] += len(response['Items'])
+        stats['consumedRcu'] += response.get('ConsumedCapacity', {}).get('CapacityUnits', 0)
+        for item in response['Items']:
+            # Duplicate-submission locks, premium-cache items and quotes never rated
+            if not quoteSummaryStream.is_stored_quote(item) or 'premiumAmount' not in item:
+                stats['skipped'] += 1
+                continue
+            row = row_of(item)
+            if row is None:
+                stats['invalid'] += 1
+            else:
+                rows.append(row)
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        if rcu_per_second:
+            # Stay at or below the budget: wait until the capacity used so far is "paid for"
+            wait = stats['consumedRcu'] / rcu_per_second - (time.monotonic() - started)
+            if wait > 0:
+                time.sleep(wait)
+
+    return columns_of(rows), stats
+
+# Scan the whole table. Returns (columns, stats, elapsed seconds).
+def scan_table(table_name, segments, workers, rcu=0, row_of=quote_row, columns_of=quote_columns,
+               merge=merge_columns):
+    workers = min(workers, segments)
+    rcu_per_worker = rcu / workers if rcu else 0
+    parts = []
+    totals = {'scanned': 0, 'skipped': 0, 'invalid': 0, 'consumedRcu': 0.0, 'pages': 0}
+    started = time.perf_counter()
+    # spawn: each worker builds its own boto3 client instead of inheriting the parent's
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(scan_segment, table_name, segment, segments, rcu_per_worker, row_of, columns_of)
+                   for segment in range(segments)]
+        for future in futures:
+            columns, stats = future.result()
+            parts.append(columns)
+            for name, value in stats.items():
+                totals[name] += value
+    elapsed = time.perf_counter() - started
+    return merge(parts), totals, elapsed
+
+def premium_by_type(columns):
+    rows = []
+    for code, insurance_type in enumerate(TYPES):
+        premiums = columns['premium'][columns['type'] == code]
+        if not premiums.size:
+            continue
+        percentiles = np.percentile(premiums, PERCENTILES)
+        rows.append({
+            'insuranceType': insurance_type,
+            'quotes': int(premiums.size),
+            'totalPremium': float(premiums.sum()),
+            'meanPremium': round(float(premiums.mean()), 2),
+            'minPremium': float(premiums.min()),
+            **{f'p{p}Premium': float(value) for p, value in zip(PERCENTILES, percentiles)},
+            'maxPremium': float(premiums.max()),
+        })
+    return rows
+
+def premium_histogram(columns, bucket):
+    rows = []
+    for code, insurance_type in enumerate(TYPES):
+        premiums = columns['premium'][columns['type'] == code]
+        bands, counts = np.unique(np.floor_divide(premiums, bucket) * bucket, return_counts=True)
+        rows.extend({
+            'insuranceType': insurance_type,
+            'premiumFrom': float(band),
+            'premiumTo': float(band + bucket),
+            'quotes': int(count),
+        } for band, count in zip(bands, counts))
+    return rows
+
+def surcharge_rates(columns):
+    rows = []
+    for code, insurance_type in enumerate(TYPES):
+        mask = columns['type'] == code
+        quotes = int(mask.sum())
+        if not quotes:
+            continue
+        hits = columns['flags'][mask].sum(axis=0)
+        for position, rule in enumerate(rating.RULES[insurance_type]['surcharges']):
+            rows.append({
+                'insuranceType': insurance_type,
+                'surcharge': f"{rule['field']} {rule['op']} {rule['value']}",
+                'amount': rule['amount'],
+                'quotes': quotes,
+                'hits': int(hits[position]),
+                'hitRate': round(float(hits[position]) / quotes, 4),
+            })
+    return rows
+
+def quotes_per_day(columns):
+    rows = []
+    for code, insurance_type in enumerate(TYPES):
+        days, counts = np.unique(columns['day'][columns['type'] == code], return_counts=True)
+        rows.extend({'day': str(day), 'insuranceType': insurance_type, 'quotes': int(count)}
+                    for day, count in zip(days, counts))
+    rows.sort(key=lambda row: (row['day'], row['insuranceType']))
+    return rows
+
+def build_reports(columns, bucket):
+    return {
+        'premium_by_type': premium_by_type(columns),
+        'premium_histogram': premium_histogram(columns, bucket),
+        'surcharge_rates': surcharge_rates(columns),
+        'quotes_per_day': quotes_per_day(columns),
+    }
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+
+def write_parquet(path, rows):
+    import pyarrow
+    import pyarrow.parquet
+
+    pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), path)
+
+def write_reports(reports, output_dir, output_format):
+    os.makedirs(output_dir, exist_ok=True)
+    writer = write_parquet if output_format == 'parquet' else write_csv
+    paths = []
+    for name in REPORTS:
+        path = os.path.join(output_dir, f'{name}.{output_format}')
+        writer(path, reports[name])
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--table', default=os.environ.get('DYNAMODB_TABLE', 'InsuranceQuoteRequestsV3'))
+    parser.add_argument('--segments', type=int, default=8, help='parallel scan segments')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='scanning processes')
+    parser.add_argument('--rcu', type=float, default=0,
+                        help='max read capacity units consumed per second (0 = unlimited)')
+    parser.add_argument('--bucket', type=float, default=50, help='premium histogram band width')
+    parser.add_argument('--format', choices=('csv', 'parquet'), default='csv')
+    parser.add_argument('--output-dir', default='analytics')
+    args = parser.parse_args()
+    if args.format == 'parquet':
+        # Fail before the scan rather than after it
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit("--format parquet needs pyarrow (pip install pyarrow)")
+
+    columns, stats, elapsed = scan_table(args.table, args.segments, args.workers, args.rcu)
+    reports = build_reports(columns, args.bucket)
+    paths = write_reports(reports, args.output_dir, args.format)
+
+    print(f"Scanned {stats['scanned']} items ({stats['pages']} pages, {stats['consumedRcu']:.0f} RCU) "
+          f"in {elapsed:.1f}s with {args.segments} segments: {len(columns['type'])} quotes, "
+          f"{stats['skipped']} non-quote items, {stats['invalid']} unreadable")
+    for row in reports['premium_by_type']:
+        print(f"  {row['insuranceType']:<5} quotes {row['quotes']:>9}  mean {row['meanPremium']:>8.2f}  "
+              f"p50 {row['p50Premium']:>6.0f}  p99 {row['p99Premium']:>6.0f}")
+    print("Wrote " + ", ".join(paths))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""Check rating.rate against the premium functions it replaced, and time both.
+
+BASELINE_RATERS below are verbatim copies of calculate_auto_premium,
+calculate_home_premium and calculate_life_premium as they stood before the
+rating module. The same code was pasted into calculatePremium.py, into
+submitQuote.calculate_premium and into each queue consumer. They stay frozen
+here so rule-table changes can be checked against the original behaviour.
+
+The parity check rates every combination of threshold-edge values for each
+type's fields with both implementations. The values cover each side of every
+threshold, mixed case and padding, missing fields (the defaults), numbers sent
+as JSON numbers, and values neither implementation can read. A combination
+passes when both give the same premium, or both raise. Unknown insurance types
+must raise ValueError from rating.rate. The script exits non-zero on any
+mismatch.
+
+The microbenchmark then rates --quotes random applicants in one process with
+the baseline functions, rating.rate and rating.rate_many, and reports quotes
+per second, which is per core.
+
+Usage:
+    python scripts/rating_parity.py --quotes 1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import rating  # noqa: E402
+
+def calculate_auto_premium(details):
+    base = 500
+    if details.get('vehicleType', '').lower() == 'suv':
+        base += 100
+    if int(details.get('year', 2020)) < 2020:
+        base += 75
+    if 'accident' in details.get('drivingHistory', '').lower():
+        base += 150
+    return base
+
+def calculate_home_premium(details):
+    base = 400
+    if int(details.get('squareFootage', 0)) > 2000:
+        base += 100
+    if int(details.get('yearBuilt', 2025)) < 2000:
+        base += 100
+    if details.get('securitySystem', '').lower() == 'no':
+        base += 75
+    return base
+
+def calculate_life_premium(details):
+    base = 300
+    age = int(details.get('age', 0))
+    if age > 50:
+        base += 100
+    if details.get('smoker', '').lower() == 'yes':
+        base += 150
+    if details.get('health', '').lower() == 'poor':
+        base += 200
+    return base
+
+BASELINE_RATERS = {
+    'auto': calculate_auto_premium,
+    'home': calculate_home_premium,
+    'life': calculate_life_premium,
+}
+
+# Marks a field left out of details, so the default applies
+MISSING = object()
+
+EDGE_VALUES = {
+    'auto': {
+        'vehicleType': ['suv', 'SUV', ' suv', 'sedan', '', 7, MISSING],
+        'year': ['2019', '2020', '2021', ' 2019 ', '02019', 2019, 2020, '2019.5', 'nineteen', MISSING],
+        'drivingHistory': ['accident', 'One ACCIDENT', 'accidents', 'acc', 'clean', '', None, MISSING],
+    },
+    'home': {
+        'squareFootage': ['1999', '2000', '2001', 2001, '-1', '2,400', MISSING],
+        'yearBuilt': ['1999', '2000', '2001', 1999, '', MISSING],
+        'securitySystem': ['no', 'NO', 'No ', 'yes', '', [], MISSING],
+    },
+    'life': {
+        'age': ['49', '50', '51', 51, 50.9, ' 51', 'fifty', MISSING],
+        'smoker': ['yes', 'YES', 'y', 'no', '', MISSING],
+        'health': ['poor', 'Poor', 'poorly', 'good', '', MISSING],
+    },
+}
+
+def outcome(rater, details):
+    try:
+        return rater(details)
+    except Exception:
+        return 'error'
+
+def edge_cases(insurance_type):
+    fields = EDGE_VALUES[insurance_type]
+    for values in itertools.product(*fields.values()):
+        yield {field: value for field, value in zip(fields, values) if value is not MISSING}
+
+def check_parity():
+    mismatches = []
+    cases = 0
+    for insurance_type, baseline in BASELINE_RATERS.items():
+        for details in edge_cases(insurance_type):
+            cases += 1
+            expected = outcome(baseline, details)
+            actual = outcome(lambda d: rating.rate(insurance_type, d), details)
+            if expected != actual:
+                mismatches.append((insurance_type, details, expected, actual))
+    for insurance_type in ('boat', 'vehicle', '', None):
+        cases += 1
+        try:
+            rating.rate(insurance_type, {})
+            mismatches.append((insurance_type, {}, 'ValueError', 'no error'))
+        except ValueError:
+            pass
+    return cases, mismatches
+
+def random_quotes(count, seed):
+    rng = random.Random(seed)
+    choices = {insurance_type: {field: [value for value in values if isinstance(value, str) and value.strip().isdigit()]
+                                or ['suv', 'sedan', 'accident', 'clean', 'no', 'yes', 'poor', 'good']
+                                for field, values in fields.items()}
+               for insurance_type, fields in EDGE_VALUES.items()}
+    types = sorted(choices)
+    quotes = []
+    for _ in range(count):
+        insurance_type = rng.choice(types)
+        quotes.append((insurance_type, {field: rng.choice(values)
+                                        for field, values in choices[insurance_type].items()}))
+    return quotes
+
+def benchmark(quotes):
+    results = {}
+
+    def timed(name, run):
+        started = time.perf_counter()
+        premiums = run()
+        elapsed = time.perf_counter() - started
+        results[name] = {'seconds': round(elapsed, 3), 'quotesPerSecond': round(len(quotes) / elapsed)}
+        return premiums
+
+    expected = timed('baseline', lambda: [BASELINE_RATERS[t](d) for t, d in quotes])
+    rate = rating.rate
+    if timed('rating.rate', lambda: [rate(t, d) for t, d in quotes]) != expected:
+        sys.exit("rating.rate disagrees with the baseline on the benchmark quotes")
+    if timed('rating.rate_many', lambda: rating.rate_many(quotes)) != expected:
+        sys.exit("rating.rate_many disagrees with the baseline on the benchmark quotes")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quotes', type=int, default=1_000_000, help='applicants to time (0 = parity only)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    cases, mismatches = check_parity()
+    for insurance_type, details, expected, actual in mismatches[:20]:
+        print(f"❌ {insurance_type} {details}: baseline {expected}, rating {actual}")
+    if mismatches:
+        sys.exit(f"{len(mismatches)} of {cases} cases differ")
+    print(f"✅ rating.rate matches the baseline functions on {cases} cases")
+
+    if args.quotes:
+        for name, result in benchmark(random_quotes(args.quotes, args.seed)).items():
+            print(f"{name:<17} {result['quotesPerSecond']:>10} quotes/s  ({result['seconds']}s)")
+
+if __name__ == '__main__':
+    main()
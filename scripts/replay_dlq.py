@@ -0,0 +1,191 @@
+"""Replay quote messages from a dead-letter queue into the quote table.
+
+Workers drain the DLQ in parallel, up to 10 messages per receive. Each message
+is decoded, dispatched and re-rated the way quoteWorker does it, through
+quoteConsumer's resolve_type and RATERS, with the current rating rules. The
+quote is then written with quoteConsumer.store_item's conditional put, so
+replaying never overwrites a quote that has already been stored, and replaying
+the same message twice is a no-op.
+
+Handling by outcome:
+- stored or already-present quotes are deleted from the DLQ;
+- messages that fail to decode or store are left there and become visible
+  again after the visibility timeout. Each message is handled at most once
+  per run.
+
+--rate caps writes per second across all workers, keeping the replay from
+competing with live traffic. Without --type each message is rated as its own
+insuranceType, as quoteWorker dispatches it. With --type every message is rated
+as that type; the queue's type is needed for pre-v1 messages that carry none.
+
+Usage:
+    python scripts/replay_dlq.py --queue-url <VehicleInsuranceDLQUrl> --workers 4 --rate 50
+    python scripts/replay_dlq.py --type home --queue-url <url> --dry-run
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import awsClients  # noqa: E402
+import quoteConsumer  # noqa: E402
+
+class RateLimiter:
+    """Token bucket shared by all workers."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class Replay:
+    def __init__(self, args):
+        self.args = args
+        self.sqs = awsClients.get_client('sqs')
+        self.limiter = RateLimiter(args.rate)
+        self.lock = threading.Lock()
+        self.remaining = args.max_messages
+        # Messages left in the DLQ come back after the visibility timeout; handle each once per run
+        self.seen = set()
+        self.counts = {'received': 0, 'stored': 0, 'duplicates': 0, 'invalid': 0, 'failed': 0}
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counts[name] += value
+
+    def claim(self, wanted):
+        # Share --max-messages between the workers
+        with self.lock:
+            if self.remaining is None:
+                return wanted
+            granted = min(wanted, self.remaining)
+            self.remaining -= granted
+            return granted
+
+    def release(self, unused):
+        with self.lock:
+            if self.remaining is not None:
+                self.remaining += unused
+
+    def replay_message(self, message):
+        try:
+            # Same shape as a Lambda SQS record, so old messages get stable quote ids
+            quote = quoteConsumer.parse_record({
+                'body': message['Body'],
+                'messageId': message['MessageId'],
+                'attributes': message.get('Attributes', {}),
+            })
+            insurance_type = self.args.type or quoteConsumer.resolve_type({}, quote)
+            # The consumer's own rater, so a replayed premium matches a live one
+            premium = quoteConsumer.RATERS[insurance_type](quote.details)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"❌ Cannot replay {message['MessageId']}: {e}")
+            self.count('invalid')
+            return False
+
+        item = quoteConsumer.build_item(quote, insurance_type, premium)
+        if self.args.dry_run:
+            print(f"Would store {item['email']} {item['quoteKey']} at premium {premium}")
+            return False
+
+        self.limiter.acquire()
+        try:
+            if quoteConsumer.store_item(item):
+                self.count('stored')
+            else:
+                self.count('duplicates')
+            return True
+        except Exception as e:
+            print(f"❌ Error storing {item['email']} {item['quoteKey']}: {e}")
+            self.count('failed')
+            return False
+
+    def worker(self):
+        idle_polls = 0
+        while idle_polls < self.args.idle_polls:
+            wanted = self.claim(10)
+            if not wanted:
+                return
+            response = self.sqs.receive_message(
+                QueueUrl=self.args.queue_url,
+                MaxNumberOfMessages=wanted,
+                WaitTimeSeconds=1,
+                VisibilityTimeout=self.args.visibility_timeout,
+                AttributeNames=['SentTimestamp'],
+            )
+            with self.lock:
+                messages = [message for message in response.get('Messages', [])
+                            if message['MessageId'] not in self.seen]
+                self.seen.update(message['MessageId'] for message in messages)
+            if len(messages) < wanted:
+                self.release(wanted - len(messages))
+            if not messages:
+                idle_polls += 1
+                continue
+            idle_polls = 0
+            self.count('received', len(messages))
+
+            done = [message for message in messages if self.replay_message(message)]
+            if done:
+                self.sqs.delete_message_batch(QueueUrl=self.args.queue_url, Entries=[
+                    {'Id': str(i), 'ReceiptHandle': message['ReceiptHandle']}
+                    for i, message in enumerate(done)
+                ])
+
+    def run(self):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.workers) as pool:
+            for future in [pool.submit(self.worker) for _ in range(self.args.workers)]:
+                future.result()
+        return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--type', choices=sorted(quoteConsumer.RATERS),
+                        help="rate every message as this type (default: each message's own type)")
+    parser.add_argument('--queue-url', required=True, help='dead-letter queue URL')
+    parser.add_argument('--table', default=quoteConsumer.TABLE_NAME)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=25, help='max writes per second (0 = unlimited)')
+    parser.add_argument('--max-messages', type=int, help='stop after receiving this many messages')
+    parser.add_argument('--visibility-timeout', type=int, default=60,
+                        help='seconds a received message stays hidden from other readers')
+    parser.add_argument('--idle-polls', type=int, default=3,
+                        help='empty receives before a worker decides the queue is drained')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='decode and re-rate without writing or deleting anything')
+    args = parser.parse_args()
+
+    quoteConsumer.TABLE_NAME = args.table
+    replay = Replay(args)
+    elapsed = replay.run()
+
+    counts = replay.counts
+    print(f"Received {counts['received']}  stored {counts['stored']}  "
+          f"already stored {counts['duplicates']}  invalid {counts['invalid']}  "
+          f"failed {counts['failed']}  in {elapsed:.1f}s")
+    if counts['invalid'] or counts['failed']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
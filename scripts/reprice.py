@@ -0,0 +1,282 @@
+"""What-if repricing of the stored book under a candidate rule set.
+
+Rates every stored quote under the current rating.RULES and under a candidate
+rule set, side by side, and reports per-type premium deltas and how the
+premium distribution shifts.
+
+The book is loaded once into columns. Each details field is dictionary
+encoded, as an int32 code per quote plus the field's distinct values. A rule
+is evaluated on the distinct values only, and the per-quote answer is a NumPy
+lookup by code. Both rule sets go through rating.surcharge_predicate, the same
+predicates production compiles, so the simulation cannot drift from what
+rate() charges. Before reporting, --verify quotes are also rated with
+rating.rate and must match.
+
+The candidate starts as a copy of rating.RULES:
+- --set TYPE.FIELD=AMOUNT changes a surcharge amount, e.g. life.smoker=200;
+- --set TYPE.base=AMOUNT changes a base premium;
+- --candidate rules.json replaces whole types ({"life": {"base": ..., "surcharges": [...]}}),
+  so thresholds, operators and new fields can be tried too.
+
+--book caches the loaded columns in an .npz file. Later runs reprice the same
+book without scanning the table again; --refresh rescans. --synthetic N prices
+N generated quotes instead of the table.
+
+Requires numpy.
+
+Usage:
+    python scripts/reprice.py --book book.npz --set life.smoker=200
+    python scripts/reprice.py --book book.npz --candidate candidate_rules.json --output reprice.json
+    python scripts/reprice.py --synthetic 2000000 --set auto.base=520
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import awsClients  # noqa: E402
+import quote_analytics  # noqa: E402
+import rating  # noqa: E402
+
+TYPES = quote_analytics.TYPES
+TYPE_CODES = quote_analytics.TYPE_CODES
+PERCENTILES = quote_analytics.PERCENTILES
+
+# Per-quote premium changes listed per type, largest share first
+TOP_DELTAS = 5
+
+# Stored quote -> (type code, stored premium, details), or None for unknown types
+def book_row(item):
+    code = TYPE_CODES.get(item['insuranceType']['S'])
+    if code is None:
+        return None
+    details = awsClients.from_attribute(item['details']) if 'details' in item else {}
+    return code, float(item['premiumAmount']['N']), details
+
+def merge_rows(parts):
+    return [row for part in parts for row in part]
+
+# Rows -> columns: type, premium, and per details field (codes, distinct values).
+# Code -1 means the quote has no such field.
+def encode_book(rows):
+    count = len(rows)
+    types = np.fromiter((row[0] for row in rows), dtype=np.int8, count=count)
+    premiums = np.fromiter((row[1] for row in rows), dtype=np.float64, count=count)
+    fields = {}
+    for index, (_, _, details) in enumerate(rows):
+        for field, value in details.items():
+            if field not in fields:
+                fields[field] = (np.full(count, -1, dtype=np.int32), [], {})
+            codes, values, lookup = fields[field]
+            # Values keep their type: rate() treats "2018" and 2018 differently
+            key = (type(value).__name__, json.dumps(value, sort_keys=True))
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(values)
+                values.append(value)
+            codes[index] = code
+    return {
+        'type': types,
+        'premium': premiums,
+        'fields': {field: (codes, values) for field, (codes, values, _) in fields.items()},
+    }
+
+def save_book(path, book):
+    arrays = {'type': book['type'], 'premium': book['premium']}
+    for field, (codes, _) in book['fields'].items():
+        arrays[f'codes:{field}'] = codes
+    values = {field: values for field, (_, values) in book['fields'].items()}
+    np.savez_compressed(path, values=np.array(json.dumps(values)), **arrays)
+
+def load_book(path):
+    with np.load(path) as data:
+        values = json.loads(str(data['values']))
+        return {
+            'type': data['type'],
+            'premium': data['premium'],
+            'fields': {field: (data[f'codes:{field}'], field_values) for field, field_values in values.items()},
+        }
+
+def synthetic_book(count, seed):
+    import analytics_scan_benchmark
+
+    items = analytics_scan_benchmark.synthetic_quotes(0, count, max(count // 10, 1), seed)
+    return encode_book([book_row(item) for item in items])
+
+# Premium of every quote under rules, plus which quotes the rules could read
+def price(book, rules):
+    count = len(book['type'])
+    premiums = np.zeros(count, dtype=np.float64)
+    valid = np.ones(count, dtype=bool)
+    for code, insurance_type in enumerate(TYPES):
+        mask = book['type'] == code
+        table = rules[insurance_type]
+        premiums[mask] = table['base']
+        for rule in table['surcharges']:
+            predicate = rating.surcharge_predicate(rule)
+            codes, values = book['fields'].get(rule['field'], (np.full(count, -1, dtype=np.int32), []))
+            # One answer per distinct value; the default goes last, where code -1 indexes
+            hits = np.zeros(len(values) + 1, dtype=bool)
+            unreadable = np.zeros(len(values) + 1, dtype=bool)
+            for position, value in enumerate(values + [rule['default']]):
+                try:
+                    hits[position] = predicate(value)
+                except (ValueError, TypeError, AttributeError):
+                    unreadable[position] = True
+            type_codes = codes[mask]
+            premiums[mask] += rule['amount'] * hits[type_codes]
+            valid[mask] &= ~unreadable[type_codes]
+    return premiums, valid
+
+def book_details(book, index):
+    return {field: values[codes[index]] for field, (codes, values) in book['fields'].items() if codes[index] >= 0}
+
+# Rate sample quotes one by one with rating.rate and compare with the columns
+def verify(book, premiums, valid, sample, seed):
+    indexes = np.flatnonzero(valid)
+    if len(indexes) > sample:
+        indexes = np.random.default_rng(seed).choice(indexes, sample, replace=False)
+    mismatches = []
+    for index in indexes:
+        insurance_type = TYPES[book['type'][index]]
+        expected = rating.rate(insurance_type, book_details(book, index))
+        if expected != premiums[index]:
+            mismatches.append((int(index), insurance_type, expected, float(premiums[index])))
+    return len(indexes), mismatches
+
+def parse_set(value, rules):
+    try:
+        target, amount = value.split('=', 1)
+        insurance_type, name = target.split('.', 1)
+        amount = int(amount)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"--set expects TYPE.FIELD=AMOUNT or TYPE.base=AMOUNT, got {value!r}")
+    if insurance_type not in rules:
+        raise argparse.ArgumentTypeError(f"Unknown insurance type in --set {value!r}")
+    if name == 'base':
+        rules[insurance_type]['base'] = amount
+        return
+    matching = [rule for rule in rules[insurance_type]['surcharges'] if rule['field'] == name]
+    if not matching:
+        raise argparse.ArgumentTypeError(f"{insurance_type} has no surcharge on {name!r}")
+    for rule in matching:
+        rule['amount'] = amount
+
+def candidate_rules(candidate_path, settings):
+    rules = copy.deepcopy(rating.RULES)
+    if candidate_path:
+        with open(candidate_path) as f:
+            for insurance_type, table in json.load(f).items():
+                if insurance_type not in rules:
+                    raise argparse.ArgumentTypeError(f"Unknown insurance type in {candidate_path}: {insurance_type}")
+                rules[insurance_type] = table
+    for value in settings:
+        parse_set(value, rules)
+    # Same validation production applies to its own table
+    rating.compile_rules(rules)
+    return rules
+
+def type_report(insurance_type, stored, current, candidate):
+    delta = candidate - current
+    changes, counts = np.unique(delta, return_counts=True)
+    order = np.argsort(-counts)[:TOP_DELTAS]
+    return {
+        'insuranceType': insurance_type,
+        'quotes': int(current.size),
+        'storedDiffersFromCurrent': int(np.count_nonzero(stored != current)),
+        'currentTotal': float(current.sum()),
+        'candidateTotal': float(candidate.sum()),
+        'deltaTotal': float(delta.sum()),
+        'deltaPercent': round(float(delta.sum() / current.sum() * 100), 2) if current.sum() else 0.0,
+        'currentMean': round(float(current.mean()), 2),
+        'candidateMean': round(float(candidate.mean()), 2),
+        'quotesChanged': int(np.count_nonzero(delta)),
+        'currentPercentiles': {f'p{p}': float(v) for p, v in zip(PERCENTILES, np.percentile(current, PERCENTILES))},
+        'candidatePercentiles': {f'p{p}': float(v) for p, v in zip(PERCENTILES, np.percentile(candidate, PERCENTILES))},
+        'deltaShares': [{'delta': float(changes[i]), 'quotes': int(counts[i]),
+                         'share': round(float(counts[i]) / current.size, 4)} for i in order],
+    }
+
+def reprice(book, rules):
+    current, current_valid = price(book, rating.RULES)
+    candidate, candidate_valid = price(book, rules)
+    valid = current_valid & candidate_valid
+    reports = []
+    for code, insurance_type in enumerate(TYPES):
+        mask = (book['type'] == code) & valid
+        if mask.any():
+            reports.append(type_report(insurance_type, book['premium'][mask], current[mask], candidate[mask]))
+    return reports, current, current_valid, int(np.count_nonzero(~valid))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--table', default=os.environ.get('DYNAMODB_TABLE', 'InsuranceQuoteRequestsV3'))
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--rcu', type=float, default=0, help='max read capacity units per second while scanning')
+    parser.add_argument('--book', help='.npz cache of the loaded book')
+    parser.add_argument('--refresh', action='store_true', help='rescan the table even if --book exists')
+    parser.add_argument('--synthetic', type=int, help='price this many generated quotes instead of the table')
+    parser.add_argument('--candidate', help='JSON file of replacement rule tables per type')
+    parser.add_argument('--set', action='append', default=[], metavar='TYPE.FIELD=AMOUNT')
+    parser.add_argument('--verify', type=int, default=1000, help='quotes checked against rating.rate')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the report as JSON')
+    args = parser.parse_args()
+
+    try:
+        rules = candidate_rules(args.candidate, args.set)
+    except (argparse.ArgumentTypeError, ValueError, KeyError) as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    if args.synthetic:
+        book = synthetic_book(args.synthetic, args.seed)
+        source = f'{args.synthetic} synthetic quotes'
+    elif args.book and os.path.exists(args.book) and not args.refresh:
+        book = load_book(args.book)
+        source = args.book
+    else:
+        rows, _, _ = quote_analytics.scan_table(args.table, args.segments, args.workers, args.rcu,
+                                                row_of=book_row, columns_of=list, merge=merge_rows)
+        book = encode_book(rows)
+        source = args.table
+        if args.book:
+            save_book(args.book, book)
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    reports, current, current_valid, unreadable = reprice(book, rules)
+    price_seconds = time.perf_counter() - started
+
+    checked, mismatches = verify(book, current, current_valid, args.verify, args.seed)
+    if mismatches:
+        for index, insurance_type, expected, got in mismatches[:10]:
+            print(f"quote {index} ({insurance_type}): rating.rate {expected}, columnar {got}")
+        sys.exit(f"{len(mismatches)} of {checked} verified quotes differ from rating.rate")
+
+    print(f"Loaded {len(book['type'])} quotes from {source} in {load_seconds:.1f}s; "
+          f"priced both rule sets in {price_seconds:.2f}s ({unreadable} unreadable, "
+          f"{checked} checked against rating.rate)")
+    for report in reports:
+        print(f"  {report['insuranceType']:<5} quotes {report['quotes']:>9}  mean {report['currentMean']:>8.2f} -> "
+              f"{report['candidateMean']:>8.2f}  total {report['deltaTotal']:>+14.0f} ({report['deltaPercent']:+.2f}%)  "
+              f"changed {report['quotesChanged']}")
+        print("        p50/p90/p99 " + '/'.join(f"{v:.0f}" for v in report['currentPercentiles'].values()) + " -> "
+              + '/'.join(f"{v:.0f}" for v in report['candidatePercentiles'].values()))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'source': source, 'candidateRules': rules, 'unreadable': unreadable,
+                       'loadSeconds': round(load_seconds, 2), 'priceSeconds': round(price_seconds, 3),
+                       'types': reports}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
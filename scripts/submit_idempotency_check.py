@@ -0,0 +1,214 @@
+"""Check submitQuote's duplicate lock under parallel submissions and failures, against moto.
+
+Runs each check on the sequential path and on the fan-out path
+(SUBMIT_FANOUT). It asserts on the handler responses, the SNS calls made and
+the lock items left in the table:
+- --submissions identical submissions sent in parallel: exactly one publish,
+  one "submitted" answer, and every other answer a duplicate;
+- a quote that cannot be rated ({"year": "nineteen"}): a 500, no publish, no
+  lock left behind, and the customer's corrected submission goes through
+  rather than being reported as a duplicate;
+- a failed SNS publish: a 500, the lock released, and the retry goes through;
+- fan-out only: with every pool worker busy, the reservation and the publish
+  time out in the queue. The answer is a 503, the queued work is cancelled
+  so nothing is reserved or published once the pool frees up, and the retry
+  goes through.
+The script exits non-zero if any check fails.
+
+moto applies each request on the calling thread without a per-item lock.
+DynamoDB serializes conditional writes on an item, so the table client here
+does the same around put_item and delete_item.
+
+Requires moto (pip install "moto[dynamodb,sns,sqs]").
+
+Usage:
+    python scripts/submit_idempotency_check.py --submissions 1000 --threads 64
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import loadtest  # noqa: E402
+
+REGION = 'us-east-1'
+
+class SerializedWrites:
+    """Wraps the DynamoDB client; one put_item or delete_item at a time."""
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def put_item(self, **kwargs):
+        with self._lock:
+            return self._client.put_item(**kwargs)
+
+    def delete_item(self, **kwargs):
+        with self._lock:
+            return self._client.delete_item(**kwargs)
+
+class CountingSns:
+    """Wraps the SNS client, counting publishes; fail makes them raise."""
+
+    def __init__(self, client):
+        self._client = client
+        self.publishes = 0
+        self.fail = False
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def publish(self, **kwargs):
+        with self._lock:
+            self.publishes += 1
+        if self.fail:
+            from botocore.exceptions import ClientError
+
+            raise ClientError({'Error': {'Code': 'InternalError', 'Message': 'injected'}}, 'Publish')
+        return self._client.publish(**kwargs)
+
+def submission(email, details=None):
+    return {'body': json.dumps({'name': 'Idempotency Check', 'email': email, 'insuranceType': 'auto',
+                                'details': details or {'vehicleType': 'sedan', 'year': '2021',
+                                                       'drivingHistory': 'clean'}})}
+
+def answer(response):
+    body = json.loads(response['body'])
+    if response['statusCode'] != 200:
+        return response['statusCode']
+    return 'duplicate' if body.get('duplicate') else 'submitted' if body.get('submitted') else 'other'
+
+def lock_held(dynamodb, email):
+    import idempotency
+
+    item = dynamodb.get_item(TableName=loadtest.TABLE_NAME, Key=idempotency.lock_key(f'{email}#auto'),
+                             ConsistentRead=True)
+    return 'Item' in item
+
+def wait_for_release(dynamodb, email, seconds=2):
+    # The fan-out path reserves on the pool and releases from a done-callback
+    # once the reservation lands, which can be after the handler returns
+    time.sleep(0.2)
+    deadline = time.monotonic() + seconds
+    while lock_held(dynamodb, email) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return not lock_held(dynamodb, email)
+
+def run_checks(args, sns):
+    import awsClients
+    import submitQuote
+
+    dynamodb = awsClients._clients['dynamodb']
+    results = []
+
+    def check(name, condition, detail):
+        results.append((name, bool(condition), detail))
+
+    for path, fanout in (('sequential', False), ('fan-out', True)):
+        submitQuote.FANOUT_ENABLED = fanout
+
+        email = f'parallel-{path}@check.local'
+        before = sns.publishes
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            answers = list(pool.map(lambda _: answer(submitQuote.lambda_handler(submission(email), None)),
+                                    range(args.submissions)))
+        counts = {value: answers.count(value) for value in set(answers)}
+        check(f'{path}: parallel identical submissions',
+              sns.publishes - before == 1 and counts.get('submitted') == 1
+              and counts.get('duplicate') == args.submissions - 1,
+              f"{sns.publishes - before} publish(es), answers {counts}")
+
+        email = f'unrateable-{path}@check.local'
+        before = sns.publishes
+        first = answer(submitQuote.lambda_handler(
+            submission(email, {'vehicleType': 'sedan', 'year': 'nineteen', 'drivingHistory': 'clean'}), None))
+        released = wait_for_release(dynamodb, email)
+        second = answer(submitQuote.lambda_handler(submission(email), None))
+        check(f'{path}: rating error then corrected submission',
+              first == 500 and released and second == 'submitted' and sns.publishes - before == 1,
+              f"answers {first}, {second}; lock {'released' if released else 'held'}, "
+              f"{sns.publishes - before} publish(es)")
+
+        email = f'publish-error-{path}@check.local'
+        sns.fail = True
+        first = answer(submitQuote.lambda_handler(submission(email), None))
+        sns.fail = False
+        released = not lock_held(dynamodb, email)
+        second = answer(submitQuote.lambda_handler(submission(email), None))
+        check(f'{path}: publish error then retry', first == 500 and released and second == 'submitted',
+              f"answers {first}, {second}; lock {'released' if released else 'held'}")
+
+    email = 'saturated-fan-out@check.local'
+    before = sns.publishes
+    executor = submitQuote.get_executor()
+    gate = threading.Event()
+    # Bounded, so a handler that waits on the queue fails the check instead of hanging
+    blockers = [executor.submit(gate.wait, 2) for _ in range(executor._max_workers)]
+    timeouts = submitQuote.DEDUPE_TIMEOUT_SECONDS, submitQuote.PUBLISH_TIMEOUT_SECONDS
+    submitQuote.DEDUPE_TIMEOUT_SECONDS = submitQuote.PUBLISH_TIMEOUT_SECONDS = 0.05
+    try:
+        first = answer(submitQuote.lambda_handler(submission(email), None))
+    finally:
+        submitQuote.DEDUPE_TIMEOUT_SECONDS, submitQuote.PUBLISH_TIMEOUT_SECONDS = timeouts
+        gate.set()
+    for blocker in blockers:
+        blocker.result()
+    # Anything left in the queue runs now
+    executor.submit(time.sleep, 0).result()
+    time.sleep(0.1)
+    late = sns.publishes - before
+    held = lock_held(dynamodb, email)
+    second = answer(submitQuote.lambda_handler(submission(email), None))
+    check('fan-out: saturated pool', first == 503 and late == 0 and not held and second == 'submitted',
+          f"answers {first}, {second}; {late} late publish(es), lock {'held' if held else 'not held'}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=1000, help='identical submissions sent in parallel')
+    parser.add_argument('--threads', type=int, default=64)
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', REGION)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+    os.environ['DYNAMODB_TABLE'] = loadtest.TABLE_NAME
+
+    from moto import mock_aws
+
+    # The handler prints one line per failed submission
+    stdout = sys.stdout
+    with mock_aws(), open(os.devnull, 'w') as quiet:
+        topic_arn, _, _ = loadtest.setup_stack(REGION)
+        os.environ['SNS_TOPIC_ARN'] = topic_arn
+        import awsClients
+
+        awsClients._clients['dynamodb'] = SerializedWrites(awsClients.get_client('dynamodb'))
+        sns = CountingSns(awsClients.get_client('sns'))
+        awsClients._clients['sns'] = sns
+        sys.stdout = quiet
+        try:
+            results = run_checks(args, sns)
+        finally:
+            sys.stdout = stdout
+
+    for name, passed, detail in results:
+        print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    failed = [name for name, passed, _ in results if not passed]
+    if failed:
+        sys.exit(f"{len(failed)} check(s) failed: {', '.join(failed)}")
+
+if __name__ == '__main__':
+    main()
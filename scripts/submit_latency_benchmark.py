@@ -0,0 +1,154 @@
+"""Compare submitQuote's sequential and fan-out paths with injected AWS latency.
+
+DynamoDB and SNS are replaced by in-process clients that sleep for a configured
+time per call, so the benchmark measures how the handler arranges its calls
+rather than the network. Each scenario runs the same requests through
+submit_sequentially and submit_concurrently and reports handler latency:
+- warm: typical in-region call latency, clients already built;
+- cold: adds the time to build the SNS client on the first request of a
+  container;
+- slow-dynamodb and slow-sns: one dependency is degraded, to show the
+  DEDUPE_TIMEOUT_SECONDS and PUBLISH_TIMEOUT_SECONDS bounds.
+
+Usage:
+    python scripts/submit_latency_benchmark.py --requests 200 --output submit_latency.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+
+# name -> (reserve ms, publish ms, SNS client build ms)
+SCENARIOS = {
+    'warm': (8, 15, 0),
+    'cold': (8, 15, 60),
+    'slow-dynamodb': (1500, 15, 0),
+    'slow-sns': (8, 3000, 0),
+}
+
+class DelayedDynamoDB:
+    def __init__(self, delay_ms, jitter):
+        self.delay_ms = delay_ms
+        self.jitter = jitter
+        self.keys = set()
+
+    def put_item(self, **kwargs):
+        time.sleep(self.delay_ms * random.uniform(1 - self.jitter, 1 + self.jitter) / 1000)
+        key = kwargs['Item']['email']['S']
+        if key in self.keys:
+            error = Exception('ConditionalCheckFailedException')
+            error.response = {'Error': {'Code': 'ConditionalCheckFailedException'}}
+            raise error
+        self.keys.add(key)
+        return {}
+
+    def delete_item(self, **kwargs):
+        self.keys.discard(kwargs['Key']['email']['S'])
+        return {}
+
+class DelayedSNS:
+    def __init__(self, delay_ms, jitter):
+        self.delay_ms = delay_ms
+        self.jitter = jitter
+
+    def publish(self, **kwargs):
+        time.sleep(self.delay_ms * random.uniform(1 - self.jitter, 1 + self.jitter) / 1000)
+        return {'MessageId': 'benchmark'}
+
+def make_body(n):
+    return {
+        'name': f'Bench {n}',
+        'email': f'user{n}@bench.local',
+        'insuranceType': ('auto', 'home', 'life')[n % 3],
+        'details': {'vehicleType': 'SUV', 'year': '2018', 'drivingHistory': 'clean',
+                    'squareFootage': '2400', 'yearBuilt': '1990', 'securitySystem': 'no',
+                    'age': '55', 'smoker': 'no', 'health': 'good'}
+    }
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        'p50': statistics.median(values),
+        'p95': values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))],
+        'p99': values[min(len(values) - 1, int(round(0.99 * (len(values) - 1))))],
+        'max': values[-1],
+    }
+
+def run_scenario(awsClients, path, reserve_ms, publish_ms, client_ms, requests, jitter):
+    dynamodb = DelayedDynamoDB(reserve_ms, jitter)
+    sns = DelayedSNS(publish_ms, jitter)
+    real_get_client = awsClients.get_client
+
+    def get_client(service_name):
+        if service_name == 'sns':
+            if 'sns' not in awsClients._clients:
+                time.sleep(client_ms / 1000)
+                awsClients._clients['sns'] = sns
+            return awsClients._clients['sns']
+        return dynamodb
+
+    awsClients.get_client = get_client
+    latencies = []
+    statuses = {}
+    try:
+        for n in range(requests):
+            if client_ms:
+                # Every request pays the client build, as on a fresh container
+                awsClients._clients.pop('sns', None)
+            body = make_body(n)
+            started = time.perf_counter()
+            response = path(body, body['insuranceType'], f"{body['email']}#{body['insuranceType']}")
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response['statusCode']] = statuses.get(response['statusCode'], 0) + 1
+    finally:
+        awsClients.get_client = real_get_client
+        awsClients._clients.pop('sns', None)
+    return dict(summarize(latencies), statuses=statuses)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario and path')
+    parser.add_argument('--slow-requests', type=int, default=5,
+                        help='requests for the degraded-dependency scenarios')
+    parser.add_argument('--jitter', type=float, default=0.2, help='+/- fraction of each delay')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    os.environ.setdefault('SNS_TOPIC_ARN', 'arn:aws:sns:us-east-1:000000000000:bench')
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+    sys.path.insert(0, LAMBDA_DIR)
+    import awsClients
+    import submitQuote
+
+    random.seed(1)
+    results = {
+        'dedupeTimeoutSeconds': submitQuote.DEDUPE_TIMEOUT_SECONDS,
+        'publishTimeoutSeconds': submitQuote.PUBLISH_TIMEOUT_SECONDS,
+        'scenarios': {}
+    }
+    for name, (reserve_ms, publish_ms, client_ms) in SCENARIOS.items():
+        requests = args.slow_requests if name.startswith('slow') else args.requests
+        scenario = {'reserveMs': reserve_ms, 'publishMs': publish_ms, 'snsClientMs': client_ms}
+        for label, path in (('sequential', submitQuote.submit_sequentially),
+                            ('fanout', submitQuote.submit_concurrently)):
+            scenario[label] = run_scenario(awsClients, path, reserve_ms, publish_ms,
+                                           client_ms, requests, args.jitter)
+        results['scenarios'][name] = scenario
+
+        sequential, fanout = scenario['sequential'], scenario['fanout']
+        print(f"{name:14} sequential p50 {sequential['p50']:8.1f} ms  p99 {sequential['p99']:8.1f} ms   "
+              f"fan-out p50 {fanout['p50']:8.1f} ms  p99 {fanout['p99']:8.1f} ms   "
+              f"statuses {sequential['statuses']} -> {fanout['statuses']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
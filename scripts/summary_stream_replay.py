@@ -0,0 +1,377 @@
+"""Replay the quote table's stream through quoteSummaryStream against moto, and compare dashboard read costs.
+
+The quote table gets a NEW_AND_OLD_IMAGES stream, as in template.yaml. Then:
+- --users users each get --quotes quotes of random types, stored by
+  quoteConsumer.process_batch;
+- --remove of the quotes are deleted, as TTL expiry would;
+- duplicate locks and admission rate counters are written alongside, so
+  the stream carries the same non-quote records as production.
+The stream is read back, passed through the event source's FilterCriteria
+(STREAM_FILTERS, as in template.yaml) and fed to
+quoteSummaryStream.lambda_handler in --batch-size batches. Failures are handled as the Lambda event source does:
+on batchItemFailures, delivery resumes from the reported sequence number.
+Faults are injected on the summary table's count transactions:
+- every --lost-every-th commits and then raises, like a response lost to a
+  timeout. The record is redelivered, and its applied#<eventID> marker
+  must stop it being counted twice;
+- every --throttle-every-th raises before writing.
+
+Checks:
+- each user's summary matches the table: totalCount, and latest#<type> is
+  the newest remaining quote of that type;
+- replaying the whole stream again, as a redelivery after a crash would,
+  changes no count or latest quote. lastUpdated may move: a replayed INSERT
+  of a since-removed quote moves latest#<type> forward, and its replayed
+  REMOVE moves it back;
+- the filter delivers every stored-quote record and nothing else, and no
+  summary item is created for a lock or counter.
+
+Read cost: for every user it compares what the dashboard read before the
+summary table with what it reads now. Before, it ran a Query of all the
+user's quotes on CreatedAtIndex, every page. Now it does one GetItem of the
+summary. Both are eventually consistent reads: half a read unit per 4 KB,
+rounded up per item for GetItem and per page for Query. The same
+comparison is then projected for --histories quotes per user from the
+measured entry sizes.
+
+Requires moto (pip install "moto[dynamodb,dynamodbstreams,sns,sqs]").
+
+Usage:
+    python scripts/summary_stream_replay.py --users 20 --quotes 20 --remove 0.1
+"""
+import argparse
+import math
+import os
+import random
+import sys
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import loadtest  # noqa: E402
+
+REGION = 'us-east-1'
+QUEUE_ARN = f'arn:aws:sqs:{REGION}:123456789012:vehicle-insurance-quotes'
+TYPES = ('auto', 'home', 'life')
+
+# FilterCriteria on QuoteSummaryStreamLambda's stream event source, as in template.yaml
+STREAM_FILTERS = [
+    {'eventName': ['INSERT'], 'dynamodb': {'NewImage': {'createdAt': {'S': [{'exists': True}]},
+                                                        'insuranceType': {'S': [{'exists': True}]}}}},
+    {'eventName': ['REMOVE'], 'dynamodb': {'OldImage': {'createdAt': {'S': [{'exists': True}]},
+                                                        'insuranceType': {'S': [{'exists': True}]}}}},
+]
+
+# Eventually consistent reads: half a read unit per 4 KB
+READ_UNIT_BYTES = 4096
+# A Query page stops at 1 MB
+QUERY_PAGE_BYTES = 1024 * 1024
+
+class FlakyTransactions:
+    """Wraps the DynamoDB client; some transact_write_items calls fail after or before writing."""
+
+    def __init__(self, client, lost_every, throttle_every):
+        self._client = client
+        self.lost_every = lost_every
+        self.throttle_every = throttle_every
+        self.calls = 0
+        self.lost = 0
+        self.throttled = 0
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def transact_write_items(self, **kwargs):
+        from botocore.exceptions import ClientError
+
+        self.calls += 1
+        if self.throttle_every and self.calls % self.throttle_every == 0:
+            self.throttled += 1
+            raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'injected'}},
+                              'TransactWriteItems')
+        response = self._client.transact_write_items(**kwargs)
+        if self.lost_every and self.calls % self.lost_every == 0:
+            self.lost += 1
+            raise ClientError({'Error': {'Code': 'RequestTimeout', 'Message': 'injected after commit'}},
+                              'TransactWriteItems')
+        return response
+
+def store_quotes(args, rng):
+    import quoteConsumer
+    import quoteMessage
+
+    records = []
+    for user in range(args.users):
+        for n in range(args.quotes):
+            insurance_type = rng.choice(TYPES)
+            details = {field: rng.choice(values)
+                       for field, values in loadtest.DETAIL_CHOICES[insurance_type].items()}
+            body = {'name': f'User {user}', 'email': f'user{user}@replay.local', 'insuranceType': insurance_type,
+                    'details': details}
+            created_at = f'2025-05-{1 + n // 1440:02d}T{n // 60 % 24:02d}:{n % 60:02d}:00'
+            records.append({'messageId': f'msg-{user}-{n}', 'eventSource': 'aws:sqs', 'eventSourceARN': QUEUE_ARN,
+                            'attributes': {'SentTimestamp': '1746093600000'},
+                            'body': quoteMessage.encode(body, f'quote-{user}-{n}', created_at)})
+    for start in range(0, len(records), 100):
+        response = quoteConsumer.process_batch({'Records': records[start:start + 100]})
+        if response['batchItemFailures']:
+            sys.exit(f"{len(response['batchItemFailures'])} quotes were not stored")
+
+def write_noise(args, dynamodb):
+    import admission
+    import idempotency
+
+    admission.ENABLED = True
+    for user in range(args.users):
+        for _ in range(3):
+            admission.check({'requestContext': {'http': {'sourceIp': f'10.0.0.{user}'}}},
+                            {'email': f'user{user}@replay.local'})
+
+    for user in range(args.users):
+        composite_key = f'user{user}@replay.local#auto'
+        idempotency.reserve(dynamodb, loadtest.TABLE_NAME, composite_key)
+        idempotency.release(dynamodb, loadtest.TABLE_NAME, composite_key)
+
+def scan(dynamodb, table_name):
+    items = []
+    params = {'TableName': table_name}
+    while True:
+        response = dynamodb.scan(**params)
+        items.extend(response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            return items
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def remove_quotes(args, dynamodb, rng):
+    quotes = [item for item in scan(dynamodb, loadtest.TABLE_NAME) if 'createdAt' in item]
+    for item in rng.sample(quotes, int(len(quotes) * args.remove)):
+        dynamodb.delete_item(TableName=loadtest.TABLE_NAME, Key={'email': item['email'], 'quoteKey': item['quoteKey']})
+
+def read_stream(stream_arn):
+    import boto3
+
+    streams = boto3.client('dynamodbstreams', region_name=REGION)
+    records = []
+    for shard in streams.describe_stream(StreamArn=stream_arn)['StreamDescription']['Shards']:
+        iterator = streams.get_shard_iterator(StreamArn=stream_arn, ShardId=shard['ShardId'],
+                                              ShardIteratorType='TRIM_HORIZON')['ShardIterator']
+        while iterator:
+            response = streams.get_records(ShardIterator=iterator, Limit=1000)
+            if not response['Records']:
+                break
+            records.extend(response['Records'])
+            iterator = response.get('NextShardIterator')
+    return records
+
+_MISSING = object()
+
+# The subset of Lambda's filter pattern syntax template.yaml uses: nested
+# fields, lists of allowed values, and {"exists": bool}
+def matches(pattern, value):
+    if isinstance(pattern, dict):
+        return isinstance(value, dict) and all(
+            matches(rule, value.get(field, _MISSING)) for field, rule in pattern.items())
+    for allowed in pattern:
+        if isinstance(allowed, dict) and 'exists' in allowed:
+            if allowed['exists'] == (value is not _MISSING):
+                return True
+        elif allowed == value:
+            return True
+    return False
+
+def filtered(records):
+    return [record for record in records if any(matches(pattern, record) for pattern in STREAM_FILTERS)]
+
+# Deliver like the Lambda event source: resume from the first reported failure.
+# Returns the invocations, and how many of them reported a failure.
+def replay(handler, records, batch_size, max_invocations):
+    position = invocations = retries = 0
+    while position < len(records):
+        if invocations == max_invocations:
+            sys.exit(f"Stream not drained after {max_invocations} invocations")
+        batch = records[position:position + batch_size]
+        failures = handler({'Records': batch}, None)['batchItemFailures']
+        invocations += 1
+        if not failures:
+            position += len(batch)
+            continue
+        sequence = failures[0]['itemIdentifier']
+        failed_at = next(n for n, record in enumerate(batch) if record['dynamodb']['SequenceNumber'] == sequence)
+        position += failed_at
+        retries += 1
+    return invocations, retries
+
+def expected_summaries(quote_items):
+    expected = {}
+    for item in quote_items:
+        summary = expected.setdefault(item['email']['S'], {'totalCount': 0, 'latest': {}})
+        summary['totalCount'] += 1
+        insurance_type = item['insuranceType']['S']
+        created_at = item['createdAt']['S']
+        if created_at > summary['latest'].get(insurance_type, ''):
+            summary['latest'][insurance_type] = created_at
+    return expected
+
+def actual_summaries(summary_items):
+    import quoteSummaryStream
+
+    actual = {}
+    for item in summary_items:
+        email = item['email']['S']
+        if email.startswith(quoteSummaryStream.APPLIED_PREFIX):
+            continue
+        latest = {name[len(quoteSummaryStream.LATEST_PREFIX):]: value['M']['createdAt']['S']
+                  for name, value in item.items() if name.startswith(quoteSummaryStream.LATEST_PREFIX)}
+        actual[email] = {'totalCount': int(item.get('totalCount', {'N': '0'})['N']), 'latest': latest}
+    return actual
+
+def without_timestamp(item):
+    return {name: value for name, value in (item or {}).items() if name != 'lastUpdated'}
+
+def read_costs(dynamodb, emails):
+    import getUserQuotes
+
+    query_units = summary_units = query_bytes = summary_bytes = pages = quotes = 0
+    for email in emails:
+        params = {'TableName': loadtest.TABLE_NAME, 'IndexName': getUserQuotes.CREATED_AT_INDEX,
+                  'KeyConditionExpression': 'email = :email', 'ScanIndexForward': False,
+                  'ExpressionAttributeValues': {':email': {'S': email}}}
+        while True:
+            response = dynamodb.query(**params)
+            size = sum(loadtest.item_size(item) for item in response['Items'])
+            quotes += len(response['Items'])
+            query_bytes += size
+            query_units += max(1, math.ceil(size / READ_UNIT_BYTES)) * 0.5
+            pages += 1
+            if 'LastEvaluatedKey' not in response:
+                break
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        item = dynamodb.get_item(TableName=loadtest.SUMMARY_TABLE_NAME, Key={'email': {'S': email}}).get('Item', {})
+        size = loadtest.item_size(item)
+        summary_bytes += size
+        summary_units += max(1, math.ceil(size / READ_UNIT_BYTES)) * 0.5
+    users = len(emails)
+    return {'query': {'readUnits': query_units / users, 'bytes': query_bytes / users, 'calls': pages / users},
+            'summary': {'readUnits': summary_units / users, 'bytes': summary_bytes / users, 'calls': 1},
+            'quotes': quotes / users}
+
+# The same comparison for longer histories, from the measured sizes: the query
+# grows with every stored quote (1 MB per page), the summary stays one item
+def projected_costs(costs, histories):
+    entry_bytes = costs['query']['bytes'] / costs['quotes']
+    rows = []
+    for history in histories:
+        size = entry_bytes * history
+        pages = max(1, math.ceil(size / QUERY_PAGE_BYTES))
+        rows.append((history, max(pages, math.ceil(size / READ_UNIT_BYTES)) * 0.5, size, pages))
+    return rows
+
+def run_checks(args):
+    import boto3
+
+    import awsClients
+    import quoteSummaryStream
+
+    rng = random.Random(args.seed)
+    dynamodb = awsClients.get_client('dynamodb')
+    stream_arn = boto3.client('dynamodb', region_name=REGION).update_table(
+        TableName=loadtest.TABLE_NAME,
+        StreamSpecification={'StreamEnabled': True, 'StreamViewType': 'NEW_AND_OLD_IMAGES'}
+    )['TableDescription']['LatestStreamArn']
+
+    store_quotes(args, rng)
+    write_noise(args, dynamodb)
+    remove_quotes(args, dynamodb, rng)
+    streamed = read_stream(stream_arn)
+    quote_records = [record for record in streamed
+                     if quoteSummaryStream.is_stored_quote(record['dynamodb'].get('NewImage')
+                                                           or record['dynamodb'].get('OldImage'))]
+    records = filtered(streamed)
+
+    flaky = FlakyTransactions(dynamodb, args.lost_every, args.throttle_every)
+    awsClients._clients['dynamodb'] = flaky
+    invocations, retries = replay(quoteSummaryStream.lambda_handler, records, args.batch_size,
+                                      max_invocations=len(records) * 2)
+    awsClients._clients['dynamodb'] = dynamodb
+
+    results = []
+
+    def check(name, condition, detail):
+        results.append((name, bool(condition), detail))
+
+    quote_items = [item for item in scan(dynamodb, loadtest.TABLE_NAME) if 'createdAt' in item]
+    expected = expected_summaries(quote_items)
+    summary_items = scan(dynamodb, loadtest.SUMMARY_TABLE_NAME)
+    actual = actual_summaries(summary_items)
+    wrong = [email for email in expected if actual.get(email) != expected[email]]
+    check('summaries match the table', not wrong and flaky.lost and flaky.throttled,
+          f"{len(expected) - len(wrong)}/{len(expected)} users; {len(records)} records "
+          f"in {invocations} invocations, {retries} resumed after {flaky.lost} lost responses "
+          f"and {flaky.throttled} throttles")
+
+    before = {item['email']['S']: item for item in summary_items}
+    replay(quoteSummaryStream.lambda_handler, records, args.batch_size, max_invocations=len(records))
+    after = {item['email']['S']: item for item in scan(dynamodb, loadtest.SUMMARY_TABLE_NAME)}
+    changed = [email for email in before if without_timestamp(after.get(email)) != without_timestamp(before[email])]
+    check('full redelivery', not changed and after.keys() == before.keys(),
+          f"{len(changed)} summaries changed after replaying {len(records)} records again")
+
+    stray = [email for email in actual if not email.endswith('@replay.local')]
+    extra = [record['dynamodb']['Keys']['email']['S'] for record in records if record not in quote_records]
+    check('stream filter', records == quote_records and not stray,
+          f"{len(records)} of {len(streamed)} records delivered, "
+          f"{len(streamed) - len(records)} lock and counter records filtered out"
+          + (f"; delivered {extra[:5]}" if extra else '') + (f"; summary items for {stray[:5]}" if stray else ''))
+
+    costs = read_costs(dynamodb, sorted(expected))
+    return results, costs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--quotes', type=int, default=20, help='quotes stored per user')
+    parser.add_argument('--remove', type=float, default=0.1, help='fraction of quotes deleted afterwards')
+    parser.add_argument('--batch-size', type=int, default=100, help='stream records per invocation')
+    parser.add_argument('--lost-every', type=int, default=13, help='every Nth count transaction commits, then fails')
+    parser.add_argument('--throttle-every', type=int, default=29, help='every Nth count transaction fails')
+    parser.add_argument('--histories', type=lambda text: [int(value) for value in text.split(',')],
+                        default=[10, 100, 1000, 10000], help='history sizes for the projected read cost')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', REGION)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+    os.environ['DYNAMODB_TABLE'] = loadtest.TABLE_NAME
+    os.environ['SUMMARY_TABLE'] = loadtest.SUMMARY_TABLE_NAME
+
+    from moto import mock_aws
+
+    # The stream handler prints one line per failed record
+    stdout = sys.stdout
+    with mock_aws(), open(os.devnull, 'w') as quiet:
+        loadtest.setup_stack(REGION)
+        loadtest.setup_summary_table(REGION)
+        sys.stdout = quiet
+        try:
+            results, costs = run_checks(args)
+        finally:
+            sys.stdout = stdout
+
+    for name, passed, detail in results:
+        print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    print(f"Per dashboard load, {costs['quotes']:.0f} quotes per user:")
+    for name in ('query', 'summary'):
+        cost = costs[name]
+        print(f"  {name:<8} {cost['readUnits']:8.2f} read units  {cost['bytes']:11,.0f} bytes  "
+              f"{cost['calls']:4.1f} calls")
+    print(f"Projected from the measured sizes (summary stays {costs['summary']['readUnits']:.2f} read units):")
+    for history, units, size, pages in projected_costs(costs, args.histories):
+        print(f"  {history:>6} quotes  query {units:8.2f} read units  {size:11,.0f} bytes  {pages} page(s)")
+    failed = [name for name, passed, _ in results if not passed]
+    if failed:
+        sys.exit(f"{len(failed)} check(s) failed: {', '.join(failed)}")
+
+if __name__ == '__main__':
+    main()
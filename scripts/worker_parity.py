@@ -0,0 +1,189 @@
+"""Check that quoteWorker stores exactly what the pre-consolidation per-type consumers stored.
+
+Builds SQS batches for each of the three queues, covering:
+- v1 messages with and without a fixed quote id;
+- pre-v1 bodies, both bare and inside an SNS envelope, including bodies
+  without an insuranceType;
+- "vehicle" quotes, which the auto subscription filter admits;
+- details in the old DynamoDB-style shape;
+- malformed messages;
+- redelivery of a whole batch.
+
+Every batch runs through the queue's handler in scripts/legacy_quote_consumer.py,
+a frozen copy of autoQuoteLambda, homeQuoteLambda, LifeQuoteLambda and their
+shared process_batch from before quoteWorker, against one table, and through
+quoteWorker against another. The batch responses and the stored items must
+be identical.
+The checks run in-process against moto (pip install "moto[dynamodb]"), and the
+script exits non-zero on any difference.
+
+Usage:
+    python scripts/worker_parity.py --quotes 200 --seed 1
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+import loadtest  # noqa: E402
+
+REGION = 'us-east-1'
+LEGACY_TABLE = 'ParityLegacyQuotes'
+WORKER_TABLE = 'ParityWorkerQuotes'
+
+# queue name -> (legacy_quote_consumer handler, insurance types published to it)
+QUEUES = {
+    'vehicle-insurance-quotes': ('auto_handler', ['auto', 'vehicle']),
+    'home-insurance-quotes': ('home_handler', ['home']),
+    'life-insurance-quotes': ('life_handler', ['life']),
+}
+
+def queue_arn(queue_name):
+    return f'arn:aws:sqs:{REGION}:123456789012:{queue_name}'
+
+def details_for(insurance_type, rng):
+    choices = loadtest.DETAIL_CHOICES['auto' if insurance_type == 'vehicle' else insurance_type]
+    return {field: rng.choice(values) for field, values in choices.items()}
+
+def message_body(n, insurance_type, rng):
+    import quoteMessage
+
+    body = {'name': f'Parity {n}', 'email': f'user{n % 50}@parity.local', 'insuranceType': insurance_type,
+            'details': details_for(insurance_type, rng)}
+    shape = rng.choice(('v1-fixed', 'v1', 'pre-v1', 'pre-v1-envelope', 'pre-v1-untyped', 'dynamodb-details'))
+    if shape == 'v1-fixed':
+        return quoteMessage.encode(body, f'quote-{n}', f'2025-03-{n % 28 + 1:02d}T10:00:{n % 60:02d}')
+    if shape == 'v1':
+        return quoteMessage.encode(body)
+    if shape == 'pre-v1-untyped':
+        del body['insuranceType']
+        return json.dumps(body)
+    if shape == 'dynamodb-details':
+        body['details'] = {field: {'S': value} for field, value in body['details'].items()}
+        return json.dumps(body)
+    if shape == 'pre-v1-envelope':
+        return json.dumps({'Type': 'Notification', 'Message': json.dumps(body)})
+    return json.dumps(body)
+
+MALFORMED_BODIES = ['not json', json.dumps({'v': 1, 't': 'auto', 'd': 'nope'}), json.dumps({'v': 9}), '[]']
+
+def build_batches(quotes, rng):
+    batches = []
+    sent = int(time.time() * 1000)
+    n = 0
+    for queue_name, (_, types) in QUEUES.items():
+        records = []
+        for _ in range(quotes):
+            records.append({
+                'messageId': f'msg-{n}',
+                'body': message_body(n, rng.choice(types), rng),
+                'attributes': {'SentTimestamp': str(sent + n)},
+                'eventSource': 'aws:sqs',
+                'eventSourceARN': queue_arn(queue_name),
+            })
+            n += 1
+        for body in MALFORMED_BODIES:
+            records.append({'messageId': f'msg-{n}', 'body': body, 'attributes': {'SentTimestamp': str(sent + n)},
+                            'eventSource': 'aws:sqs', 'eventSourceARN': queue_arn(queue_name)})
+            n += 1
+        rng.shuffle(records)
+        for start in range(0, len(records), 10):
+            batches.append((queue_name, {'Records': records[start:start + 10]}))
+    # Redeliver a few whole batches
+    batches.extend(rng.sample(batches, min(3, len(batches))))
+    return batches
+
+def create_table(dynamodb, name):
+    dynamodb.create_table(
+        TableName=name, BillingMode='PAY_PER_REQUEST',
+        AttributeDefinitions=[{'AttributeName': 'email', 'AttributeType': 'S'},
+                              {'AttributeName': 'quoteKey', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'email', 'KeyType': 'HASH'},
+                   {'AttributeName': 'quoteKey', 'KeyType': 'RANGE'}])
+
+def scan_items(dynamodb, name):
+    items = {}
+    params = {'TableName': name}
+    while True:
+        response = dynamodb.scan(**params)
+        for item in response['Items']:
+            items[(item['email']['S'], item['quoteKey']['S'])] = item
+        if 'LastEvaluatedKey' not in response:
+            return items
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def run(args):
+    os.environ.setdefault('AWS_DEFAULT_REGION', REGION)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ.setdefault('METRICS_SAMPLE_RATE', '0')
+
+    from moto import mock_aws
+
+    with mock_aws():
+        import awsClients
+        import legacy_quote_consumer
+        import quoteConsumer
+        import quoteWorker
+
+        dynamodb = awsClients.get_client('dynamodb')
+        create_table(dynamodb, LEGACY_TABLE)
+        create_table(dynamodb, WORKER_TABLE)
+        legacy_quote_consumer.TABLE_NAME = LEGACY_TABLE
+        quoteConsumer.TABLE_NAME = WORKER_TABLE
+        legacy = {queue_name: getattr(legacy_quote_consumer, handler) for queue_name, (handler, _) in QUEUES.items()}
+
+        batches = build_batches(args.quotes, random.Random(args.seed))
+        response_mismatches = []
+        for queue_name, event in batches:
+            expected = legacy[queue_name](event, None)
+            actual = quoteWorker.lambda_handler(event, None)
+            if expected != actual:
+                response_mismatches.append((queue_name, expected, actual))
+
+        legacy_items = scan_items(dynamodb, LEGACY_TABLE)
+        worker_items = scan_items(dynamodb, WORKER_TABLE)
+
+    item_mismatches = sorted(key for key in legacy_items.keys() | worker_items.keys()
+                             if legacy_items.get(key) != worker_items.get(key))
+    return {
+        'batches': len(batches),
+        'records': sum(len(event['Records']) for _, event in batches),
+        'storedItems': len(legacy_items),
+        'responseMismatches': response_mismatches,
+        'itemMismatches': [{'key': key, 'legacy': legacy_items.get(key), 'worker': worker_items.get(key)}
+                           for key in item_mismatches],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quotes', type=int, default=200, help='quotes per queue')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    # The handlers print one line per duplicate and malformed record
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as quiet:
+        sys.stdout = quiet
+        try:
+            results = run(args)
+        finally:
+            sys.stdout = stdout
+
+    print(f"{results['batches']} batches, {results['records']} records, {results['storedItems']} stored items")
+    for queue_name, expected, actual in results['responseMismatches'][:10]:
+        print(f"❌ {queue_name}: legacy {expected} worker {actual}")
+    for mismatch in results['itemMismatches'][:10]:
+        print(f"❌ {mismatch['key']}: legacy {mismatch['legacy']} worker {mismatch['worker']}")
+    if results['responseMismatches'] or results['itemMismatches']:
+        sys.exit(f"{len(results['responseMismatches'])} response and {len(results['itemMismatches'])} "
+                 "item differences")
+    print("✅ quoteWorker matches the legacy handlers")
+
+if __name__ == '__main__':
+    main()